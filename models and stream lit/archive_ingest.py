@@ -0,0 +1,382 @@
+"""Refresh the mission datasets from the NASA Exoplanet Archive TAP service.
+
+The bundled ``*_clean.csv`` files are frozen snapshots. This ingest rebuilds
+them from the archive's ``cumulative`` (Kepler), ``k2pandc`` (K2) and ``toi``
+(TESS) tables:
+
+- every table is split into pages by right ascension, so pages are
+  independent queries. Pages from all missions are fetched concurrently by
+  asyncio tasks sharing a pool of keep-alive HTTP connections, one blocking
+  request per pooled connection at a time.
+- failed requests, 429s and 5xx responses are retried with exponential
+  backoff, honouring ``Retry-After``.
+- each response is cached on disk under a hash of the TAP URL and ADQL query
+  with its ``ETag`` and ``Last-Modified`` headers. A cached page younger than
+  ``max_age`` is reused without a request; an older one is revalidated with
+  a conditional request, and a 304 reuses it.
+- the pages are concatenated and cleaned column-wise the way the training
+  notebook did: archive columns are renamed to the dataset schema, numbers
+  coerced, rows without a disposition dropped and, for the missions whose
+  snapshots were saved filled, nulls filled with the column mean if
+  |skew| < 1 or the median otherwise.
+
+The result has the same columns as the bundled snapshot and is checked
+against the model's features before it is written. ``--tap-url`` points
+the ingest at any TAP-compatible server, such as a local stand-in for
+testing.
+
+Usage:
+    python archive_ingest.py                              # refresh every mission into refreshed/
+    python archive_ingest.py --missions TESS --replace    # overwrite the bundled TESS snapshot
+    python archive_ingest.py --tap-url http://127.0.0.1:8765/TAP/sync --max-age 0
+"""
+import argparse
+import asyncio
+import hashlib
+import http.client
+import io
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import METRICS
+from preprocessing import IMPUTATION_STRATEGIES
+from scoring import BASE_DIR, build_feature_matrix, get_dataset_path
+
+TAP_URL = "https://exoplanetarchive.ipac.caltech.edu/TAP/sync"
+INGEST_CACHE_DIR = BASE_DIR / ".ingest_cache"
+OUTPUT_DIR = BASE_DIR / "refreshed"
+
+# Concurrent requests, and pooled connections, to the TAP server
+DEFAULT_CONNECTIONS = 6
+
+# Right ascension slices each table is split into; a last page holds rows without ra
+RA_PAGES = 12
+
+# Cached pages younger than this many seconds are reused without a request
+CACHE_MAX_AGE = 24 * 3600
+
+MAX_RETRIES = 4
+RETRY_BACKOFF = 0.5
+REQUEST_TIMEOUT = 120
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Archive table and archive column -> dataset column for every mission, in
+# the column order of the bundled snapshots
+MISSIONS = {
+    "Kepler": {
+        'model': "Kepler Model",
+        'table': "cumulative",
+        'fill_missing': True,
+        'columns': {
+            'koi_period': 'orbital_period', 'koi_duration': 'transit_duration', 'koi_depth': 'transit_depth',
+            'koi_ror': 'koi_ror', 'koi_prad': 'planet_radius', 'koi_sma': 'koi_sma', 'koi_incl': 'inclination',
+            'koi_teq': 'equilibrium_temp', 'koi_insol': 'insolation', 'koi_srho': 'koi_srho',
+            'koi_steff': 'stellar_temp', 'koi_slogg': 'stellar_logg', 'koi_srad': 'stellar_radius',
+            'koi_smass': 'stellar_mass', 'koi_disposition': 'disposition'
+        }
+    },
+    "K2": {
+        'model': "K2 Model",
+        'table': "k2pandc",
+        'fill_missing': True,
+        'columns': {
+            'pl_orbper': 'orbital_period', 'pl_trandur': 'transit_duration', 'pl_trandep': 'transit_depth',
+            'pl_rade': 'planet_radius', 'pl_radj': 'planet_radiuJ', 'pl_masse': 'pl_masse', 'pl_massj': 'pl_massj',
+            'pl_insol': 'insolation', 'pl_eqt': 'equilibrium_temp', 'pl_orbeccen': 'pl_orbeccen',
+            'pl_orbincl': 'inclination', 'st_teff': 'stellar_temp', 'st_rad': 'stellar_radius',
+            'st_mass': 'stellar_mass', 'st_met': 'st_met', 'st_logg': 'stellar_logg',
+            'discoverymethod': 'discoverymethod', 'disposition': 'disposition'
+        }
+    },
+    "TESS": {
+        'model': "TESS Model",
+        'table': "toi",
+        # The TESS snapshot keeps its gaps; the notebook filled them after loading
+        'fill_missing': False,
+        'columns': {
+            'pl_pnum': 'pl_pnum', 'tfopwg_disp': 'disposition', 'pl_tranmid': 'pl_tranmid',
+            'pl_orbper': 'orbital_period', 'pl_trandurh': 'transit_duration', 'pl_trandep': 'transit_depth',
+            'pl_rade': 'planet_radius', 'pl_insol': 'insolation', 'pl_eqt': 'equilibrium_temp',
+            'st_tmag': 'st_tmag', 'st_dist': 'st_dist', 'st_teff': 'stellar_temp', 'st_logg': 'stellar_logg',
+            'st_rad': 'stellar_radius'
+        }
+    }
+}
+
+# Dataset columns holding text rather than numbers
+TEXT_COLUMNS = {'disposition', 'discoverymethod'}
+
+
+def page_queries(mission, pages=RA_PAGES):
+    """Return the ADQL queries that together select every row of a mission's table"""
+    spec = MISSIONS[mission]
+    select = f"SELECT {','.join(spec['columns'])} FROM {spec['table']}"
+    edges = np.linspace(0.0, 360.0, pages + 1)
+    queries = [
+        f"{select} WHERE ra >= {low:g} AND ra {'<=' if i == pages - 1 else '<'} {high:g}"
+        for i, (low, high) in enumerate(zip(edges[:-1], edges[1:]))
+    ]
+    return queries + [f"{select} WHERE ra IS NULL"]
+
+
+def cache_key(tap_url, query):
+    """Return the cache key of a TAP query"""
+    return hashlib.sha256(json.dumps({'url': tap_url, 'query': query, 'format': 'csv'}).encode('utf-8')).hexdigest()
+
+
+class QueryCache:
+    """On-disk TAP responses keyed by query, with the validators needed for conditional requests"""
+
+    def __init__(self, cache_dir=INGEST_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+
+    def get(self, key):
+        """Return (body, metadata) for a cached response, or None"""
+        body_path, meta_path = self.cache_dir / f"{key}.csv", self.cache_dir / f"{key}.json"
+        if not body_path.exists() or not meta_path.exists():
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        return body_path.read_bytes(), meta
+
+    def put(self, key, body, meta):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for path, content in ((self.cache_dir / f"{key}.csv", body),
+                              (self.cache_dir / f"{key}.json", json.dumps(meta).encode('utf-8'))):
+            tmp_path = path.with_name(path.name + ".tmp")
+            tmp_path.write_bytes(content)
+            tmp_path.replace(path)
+
+    def touch(self, key, meta):
+        """Record that a cached response was revalidated"""
+        meta = dict(meta, fetched_at=time.time())
+        tmp_path = self.cache_dir / f"{key}.json.tmp"
+        tmp_path.write_text(json.dumps(meta))
+        tmp_path.replace(self.cache_dir / f"{key}.json")
+
+
+class TapError(RuntimeError):
+    """A TAP query that failed after every retry"""
+
+
+class TapClient:
+    """Concurrent TAP queries over a fixed pool of keep-alive connections, with retries and caching.
+
+    Use as ``async with TapClient(...) as client: text = await client.query(adql)``.
+    """
+
+    def __init__(self, tap_url=TAP_URL, connections=DEFAULT_CONNECTIONS, cache=None, max_age=CACHE_MAX_AGE,
+                 retries=MAX_RETRIES, backoff=RETRY_BACKOFF, timeout=REQUEST_TIMEOUT):
+        self.tap_url = tap_url
+        self.connections = connections
+        self.cache = cache if cache is not None else QueryCache()
+        self.max_age = max_age
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.stats = {'cache': 0, 'not_modified': 0, 'network': 0, 'retries': 0, 'bytes': 0}
+
+        parts = urlsplit(tap_url)
+        self._connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self._host, self._port, self._path = parts.hostname, parts.port, parts.path or "/"
+        self._pool = None
+        self._executor = None
+
+    async def __aenter__(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.connections, thread_name_prefix="tap")
+        self._pool = asyncio.Queue()
+        for _ in range(self.connections):
+            self._pool.put_nowait(self._connect())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+        self._executor.shutdown(wait=True)
+
+    def _connect(self):
+        return self._connection_class(self._host, self._port, timeout=self.timeout)
+
+    @staticmethod
+    def _send(connection, path, headers):
+        """Blocking GET on a pooled connection; returns (status, headers, body)"""
+        connection.request('GET', path, headers=headers)
+        response = connection.getresponse()
+        body = response.read()
+        if response.getheader('Connection', '').lower() == 'close':
+            connection.close()
+        return response.status, {key.lower(): value for key, value in response.getheaders()}, body
+
+    def _retry_delay(self, attempt, headers=None):
+        retry_after = (headers or {}).get('retry-after')
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                try:
+                    return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+        return self.backoff * 2 ** attempt * (1 + random.random() * 0.25)
+
+    async def query(self, adql):
+        """Return the CSV text of an ADQL query, from the cache when it is still valid"""
+        key = cache_key(self.tap_url, adql)
+        cached = self.cache.get(key)
+        if cached is not None and time.time() - cached[1].get('fetched_at', 0) < self.max_age:
+            self.stats['cache'] += 1
+            return cached[0].decode('utf-8')
+
+        path = f"{self._path}?{urlencode({'query': adql, 'format': 'csv'})}"
+        headers = {'Accept': 'text/csv', 'Accept-Encoding': 'identity'}
+        if cached is not None:
+            if cached[1].get('etag'):
+                headers['If-None-Match'] = cached[1]['etag']
+            if cached[1].get('last_modified'):
+                headers['If-Modified-Since'] = cached[1]['last_modified']
+
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.retries + 1):
+            connection = await self._pool.get()
+            try:
+                with METRICS.timer('stage_seconds', stage='tap_query'):
+                    status, response_headers, body = await loop.run_in_executor(
+                        self._executor, self._send, connection, path, headers
+                    )
+            except (OSError, http.client.HTTPException) as e:
+                # A dropped keep-alive connection is replaced before the retry
+                connection.close()
+                connection = self._connect()
+                error, response_headers = e, None
+            else:
+                if status == 304 and cached is not None:
+                    self.cache.touch(key, cached[1])
+                    self.stats['not_modified'] += 1
+                    return cached[0].decode('utf-8')
+                if status == 200:
+                    self.cache.put(key, body, {
+                        'query': adql,
+                        'etag': response_headers.get('etag'),
+                        'last_modified': response_headers.get('last-modified'),
+                        'fetched_at': time.time()
+                    })
+                    self.stats['network'] += 1
+                    self.stats['bytes'] += len(body)
+                    return body.decode('utf-8')
+                error = TapError(f"HTTP {status}: {body[:200].decode('utf-8', 'replace')}")
+                if status not in RETRY_STATUSES:
+                    raise error
+            finally:
+                self._pool.put_nowait(connection)
+            if attempt < self.retries:
+                self.stats['retries'] += 1
+                await asyncio.sleep(self._retry_delay(attempt, response_headers))
+        raise TapError(f"TAP query failed after {self.retries + 1} attempts: {error}")
+
+
+def _read_page(text, columns):
+    """Parse one page's CSV, keeping the requested archive columns"""
+    if not text.strip():
+        return pd.DataFrame(columns=list(columns))
+    page = pd.read_csv(io.StringIO(text), dtype={column: str for column in columns if columns[column] in TEXT_COLUMNS})
+    missing = set(columns) - set(page.columns)
+    if missing:
+        raise TapError(f"TAP response is missing columns {sorted(missing)}")
+    return page[list(columns)]
+
+
+def clean(mission, raw):
+    """Apply the notebook's cleaning steps to a mission's raw archive rows, column-wise"""
+    spec = MISSIONS[mission]
+    df = raw.rename(columns=spec['columns'])[list(spec['columns'].values())]
+    text = [column for column in df.columns if column in TEXT_COLUMNS]
+    numeric = [column for column in df.columns if column not in TEXT_COLUMNS]
+
+    df[numeric] = df[numeric].apply(pd.to_numeric, errors='coerce')
+    df[text] = df[text].apply(lambda column: column.astype('string').str.strip().replace('', pd.NA))
+    df = df[df['disposition'].notna()]
+
+    if spec['fill_missing']:
+        strategy = IMPUTATION_STRATEGIES.get(spec['model'], 'median')
+        fill = df[numeric].median()
+        if strategy == 'skew':
+            fill = df[numeric].mean().where(df[numeric].skew().abs() < 1, fill)
+        df[numeric] = df[numeric].fillna(fill)
+        modes = df[text].mode()
+        if len(modes):
+            df[text] = df[text].fillna(modes.iloc[0])
+    return df.reset_index(drop=True)
+
+
+async def fetch_mission(client, mission, pages=RA_PAGES):
+    """Fetch every page of a mission's table concurrently and return the cleaned dataset"""
+    columns = MISSIONS[mission]['columns']
+    texts = await asyncio.gather(*(client.query(query) for query in page_queries(mission, pages)))
+    raw = pd.concat([_read_page(text, columns) for text in texts], ignore_index=True)
+    return clean(mission, raw)
+
+
+async def ingest(missions=None, tap_url=TAP_URL, connections=DEFAULT_CONNECTIONS, cache_dir=INGEST_CACHE_DIR,
+                 max_age=CACHE_MAX_AGE, pages=RA_PAGES):
+    """Fetch and clean several missions at once; returns ({mission: DataFrame}, client stats)"""
+    missions = list(missions or MISSIONS)
+    async with TapClient(tap_url, connections, QueryCache(cache_dir), max_age) as client:
+        frames = await asyncio.gather(*(fetch_mission(client, mission, pages) for mission in missions))
+    return dict(zip(missions, frames)), client.stats
+
+
+def write_dataset(mission, df, output_dir=OUTPUT_DIR, replace=False):
+    """Check a cleaned dataset against its model's features and write it; returns the path"""
+    model_name = MISSIONS[mission]['model']
+    bundled = get_dataset_path(model_name)
+    missing = set(pd.read_csv(bundled, nrows=0).columns) - set(df.columns) if bundled.exists() else set()
+    if missing:
+        raise ValueError(f"{mission} dataset is missing columns {sorted(missing)}")
+    build_feature_matrix(model_name, df)
+
+    path = bundled if replace else Path(output_dir) / bundled.name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    df.to_csv(tmp_path, index=False)
+    tmp_path.replace(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the mission datasets from the NASA Exoplanet Archive")
+    parser.add_argument('--missions', nargs='+', choices=list(MISSIONS), default=list(MISSIONS))
+    parser.add_argument('--tap-url', default=TAP_URL, help="TAP sync endpoint")
+    parser.add_argument('--connections', type=int, default=DEFAULT_CONNECTIONS, help="Concurrent pooled connections")
+    parser.add_argument('--pages', type=int, default=RA_PAGES, help="Right ascension pages per table")
+    parser.add_argument('--max-age', type=float, default=CACHE_MAX_AGE,
+                        help="Seconds a cached page is reused without revalidating it")
+    parser.add_argument('--output-dir', default=str(OUTPUT_DIR))
+    parser.add_argument('--replace', action='store_true', help="Overwrite the bundled snapshots")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        datasets, stats = asyncio.run(ingest(args.missions, args.tap_url, args.connections,
+                                             max_age=args.max_age, pages=args.pages))
+    except TapError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+    seconds = time.perf_counter() - start
+    print(f"✅ {stats['network']} pages fetched ({stats['bytes'] / 2**20:.1f} MB), {stats['not_modified']} not modified, "
+          f"{stats['cache']} from cache, {stats['retries']} retries in {seconds:.1f}s")
+    for mission, df in datasets.items():
+        path = write_dataset(mission, df, args.output_dir, args.replace)
+        counts = ", ".join(f"{label} {count:,}" for label, count in df['disposition'].value_counts().items())
+        print(f"✅ {mission}: {len(df):,} rows -> {path} ({counts})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""Reproducible benchmarks for the model inference and data-loading hot paths.
+
+Each model is benchmarked in its own fresh interpreter, so cold load times
+include importing its ML library and peak RSS is that model's alone:
+
+- load: cold (fresh process), warm (unpickle again) and registry lookup
+- single-row latency p50/p95/p99, calling predict_proba directly and through
+  the BatchScheduler path the app's predict_with_model uses
+- batch throughput in rows per second for several batch sizes
+- peak RSS
+
+Every bundled dataset is also loaded from CSV and from the columnar cache.
+Rows are drawn from each model's dataset with a fixed seed.
+
+Results are written as JSON with one flat metric per key, and can be compared
+against a saved baseline; the comparison exits non-zero on any regression
+beyond the tolerance so it can gate a deploy.
+
+Usage:
+    python benchmark.py                               # write benchmark_results.json
+    python benchmark.py --save-baseline               # also save the run as the baseline
+    python benchmark.py --compare benchmark_baseline.json --tolerance 0.25
+    python benchmark.py --compare-only benchmark_results.json  # compare an existing run
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from scoring import BASE_DIR, MODEL_PATHS, DATASET_PATHS, get_model_path, get_dataset_path, get_feature_mapping
+
+RESULTS_PATH = BASE_DIR / "benchmark_results.json"
+BASELINE_PATH = BASE_DIR / "benchmark_baseline.json"
+
+BATCH_SIZES = [1, 16, 256, 4096]
+LATENCY_SAMPLES = 500
+WARMUP_CALLS = 20
+LOAD_REPEATS = 3
+DATASET_REPEATS = 5
+MIN_THROUGHPUT_SECONDS = 0.5
+SEED = 42
+
+# Allowed relative slowdown before a metric counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+# Unit suffix of a metric name -> whether lower values are better
+_UNITS = {'_ms': True, '_us': True, '_mb': True, '_rows_per_s': False}
+
+
+def _peak_rss_mb():
+    """Return this process's peak resident set size in MB, or None where it can't be read"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+
+def _median_seconds(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def _percentiles_ms(samples):
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000, [50, 95, 99])
+    return {'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99)}
+
+
+def _benchmark_rows(model_name, rng, n_rows=4096):
+    """Return a float64 matrix of rows from the model's dataset (defaults if it is missing)"""
+    from dataset_store import load_model_dataset
+    from scoring import build_feature_matrix
+
+    if get_dataset_path(model_name).exists():
+        matrix = build_feature_matrix(model_name, load_model_dataset(model_name))
+    else:
+        matrix = np.asarray(get_feature_mapping(model_name)['defaults'], dtype=np.float64).reshape(1, -1)
+    return np.ascontiguousarray(matrix[rng.integers(len(matrix), size=n_rows)])
+
+
+def benchmark_model(model_name):
+    """Benchmark one model in the current process; run it in a fresh interpreter for cold numbers"""
+    from micro_batcher import BatchScheduler
+    from model_registry import ModelRegistry
+
+    rng = np.random.default_rng(SEED)
+    path = get_model_path(model_name)
+    metrics = {}
+
+    registry = ModelRegistry({model_name: path})
+    start = time.perf_counter()
+    model = registry.get(model_name)
+    metrics['load_cold_ms'] = (time.perf_counter() - start) * 1000
+
+    import joblib
+    metrics['load_warm_ms'] = _median_seconds(lambda: joblib.load(path), LOAD_REPEATS) * 1000
+    metrics['lookup_us'] = _median_seconds(lambda: registry.get(model_name), 1000) * 1e6
+
+    rows = _benchmark_rows(model_name, rng)
+    for i in range(WARMUP_CALLS):
+        model.predict_proba(rows[i:i + 1])
+
+    samples = []
+    for i in range(LATENCY_SAMPLES):
+        row = rows[i % len(rows)].reshape(1, -1)
+        start = time.perf_counter()
+        model.predict_proba(row)
+        samples.append(time.perf_counter() - start)
+    metrics.update({f"single_direct_{k}": v for k, v in _percentiles_ms(samples).items()})
+
+    scheduler = BatchScheduler(registry)
+    for i in range(WARMUP_CALLS):
+        scheduler.predict(model_name, rows[i])
+    samples = []
+    for i in range(LATENCY_SAMPLES):
+        row = rows[i % len(rows)]
+        start = time.perf_counter()
+        scheduler.predict(model_name, row)
+        samples.append(time.perf_counter() - start)
+    scheduler.close()
+    metrics.update({f"single_scheduled_{k}": v for k, v in _percentiles_ms(samples).items()})
+
+    for batch_size in BATCH_SIZES:
+        batch = rows[:batch_size] if batch_size <= len(rows) else rows[rng.integers(len(rows), size=batch_size)]
+        model.predict_proba(batch)
+        scored, start = 0, time.perf_counter()
+        while True:
+            model.predict_proba(batch)
+            scored += batch_size
+            elapsed = time.perf_counter() - start
+            if elapsed >= MIN_THROUGHPUT_SECONDS and scored >= 3 * batch_size:
+                break
+        metrics[f"batch_{batch_size}_rows_per_s"] = scored / elapsed
+
+    metrics['peak_rss_mb'] = _peak_rss_mb()
+    return metrics
+
+
+def _read_all(df):
+    return [np.array(df[column]) for column in df.columns]
+
+
+def benchmark_datasets():
+    """Time loading each bundled dataset from CSV and from the columnar cache"""
+    import pandas as pd
+    from dataset_store import load_dataset
+
+    metrics = {}
+    for csv_path in sorted(set(DATASET_PATHS.values())):
+        path = BASE_DIR / csv_path
+        if not path.exists():
+            continue
+        name = path.name
+        load_dataset(path)  # make sure the cache exists before timing it
+        metrics[f"{name}/csv_ms"] = _median_seconds(lambda: pd.read_csv(path), DATASET_REPEATS) * 1000
+        metrics[f"{name}/cache_ms"] = _median_seconds(lambda: load_dataset(path), DATASET_REPEATS) * 1000
+        # Memory maps are read lazily, so also time touching every value
+        metrics[f"{name}/cache_full_read_ms"] = _median_seconds(lambda: _read_all(load_dataset(path)), DATASET_REPEATS) * 1000
+    return metrics
+
+
+def _run_in_subprocess(model_name):
+    result = subprocess.run(
+        [sys.executable, __file__, '--worker', model_name],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _environment():
+    versions = {}
+    for module in ['numpy', 'pandas', 'sklearn', 'lightgbm', 'xgboost']:
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            versions[module] = None
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'commit': commit,
+        'versions': versions
+    }
+
+
+def run_benchmarks(model_names=None):
+    """Run the whole suite and return the results document"""
+    metrics = {}
+    for model_name in model_names or MODEL_PATHS:
+        if not get_model_path(model_name).exists():
+            print(f"⚠️  {model_name}: model file not found, skipping", file=sys.stderr)
+            continue
+        print(f"⏱️  Benchmarking {model_name}...", file=sys.stderr)
+        for key, value in _run_in_subprocess(model_name).items():
+            metrics[f"{model_name}/{key}"] = value
+    print("⏱️  Benchmarking dataset loads...", file=sys.stderr)
+    metrics.update({f"datasets/{key}": value for key, value in benchmark_datasets().items()})
+    return {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': _environment(),
+        'metrics': metrics
+    }
+
+
+def lower_is_better(metric):
+    """Return True/False for a metric's direction, or None if its unit isn't known"""
+    for suffix, lower in _UNITS.items():
+        if metric.endswith(suffix):
+            return lower
+    return None
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Return one row per shared metric with its change and whether it regressed"""
+    rows = []
+    for metric, value in results['metrics'].items():
+        base = baseline['metrics'].get(metric)
+        lower = lower_is_better(metric)
+        if value is None or base is None or lower is None or base == 0:
+            continue
+        change = (value - base) / base
+        regressed = change > tolerance if lower else change < -tolerance
+        rows.append({'metric': metric, 'baseline': base, 'current': value, 'change': change, 'regressed': regressed})
+    return rows
+
+
+def print_comparison(rows, tolerance):
+    print(f"{'Metric':<56} {'Baseline':>12} {'Current':>12} {'Change':>8}")
+    for row in rows:
+        flag = "  ❌" if row['regressed'] else ""
+        print(f"{row['metric']:<56} {row['baseline']:>12.3f} {row['current']:>12.3f} {row['change']:>+8.1%}{flag}")
+    regressions = [row for row in rows if row['regressed']]
+    if regressions:
+        print(f"❌ {len(regressions)} metric(s) regressed by more than {tolerance:.0%}")
+    else:
+        print(f"✅ No regressions beyond {tolerance:.0%}")
+    return not regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark model inference and dataset loading")
+    parser.add_argument('--models', nargs='+', choices=list(MODEL_PATHS), help="Models to benchmark (default: all)")
+    parser.add_argument('--output', type=Path, default=RESULTS_PATH, help="Where to write the results JSON")
+    parser.add_argument('--save-baseline', action='store_true', help=f"Also write the results to {BASELINE_PATH.name}")
+    parser.add_argument('--compare', type=Path, help="Baseline JSON to compare the results against")
+    parser.add_argument('--compare-only', type=Path, help="Compare this existing results JSON instead of running")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Relative change allowed before a metric counts as a regression")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(benchmark_model(args.worker)))
+        return
+
+    # Check before spending minutes on a run that can't be compared
+    baseline_path = args.compare or (BASELINE_PATH if args.compare_only else None)
+    saving_it = args.save_baseline and baseline_path is not None and baseline_path.resolve() == BASELINE_PATH.resolve()
+    if baseline_path and not baseline_path.exists() and not saving_it:
+        print(f"❌ Baseline {baseline_path} not found. Record one on this machine first with "
+              f"python benchmark.py --save-baseline")
+        sys.exit(1)
+
+    if args.compare_only:
+        with open(args.compare_only) as f:
+            results = json.load(f)
+    else:
+        results = run_benchmarks(args.models)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Wrote {len(results['metrics'])} metrics to {args.output}")
+        if args.save_baseline:
+            with open(BASELINE_PATH, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"✅ Saved baseline to {BASELINE_PATH}")
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        ignored = ('commit',)
+        current_env = {k: v for k, v in results['environment'].items() if k not in ignored}
+        baseline_env = {k: v for k, v in baseline['environment'].items() if k not in ignored}
+        if current_env != baseline_env:
+            print("⚠️  Baseline was recorded in a different environment; timings may not be comparable")
+        if not print_comparison(compare(results, baseline, args.tolerance), args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""Precomputed, fixed-size chart data for the bundled datasets.
+
+Plotting a catalog straight from its DataFrame sends every row to the
+browser on every rerun. This module reduces each dataset once to the
+aggregates its charts need:
+
+- row counts per disposition
+- per-disposition histograms of a few physical columns, on log10 bins for
+  heavy-tailed ones
+- a 2D density grid of orbital period against planet radius
+- a level-of-detail scatter sample: points are snapped to a
+  SCATTER_GRID x SCATTER_GRID grid and one point is kept per occupied cell
+  and disposition, weighted by how many rows it stands for. Sparse outliers
+  survive while dense regions are thinned, and the sample never exceeds
+  MAX_SCATTER_POINTS whatever the catalog size.
+
+Aggregates are cached on disk as JSON keyed by the dataset's content hash,
+so they are computed once per dataset version.
+
+Usage:
+    python chart_aggregates.py         # build aggregates for every bundled dataset
+"""
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import file_hash, load_model_dataset
+from scoring import BASE_DIR, DATASET_PATHS, DISPOSITION_ALIASES, TARGET_COLUMNS, get_dataset_path
+
+AGGREGATE_CACHE_DIR = BASE_DIR / ".aggregate_cache"
+
+# Bump when the aggregate layout changes so old caches are ignored
+FORMAT_VERSION = 1
+
+HISTOGRAM_BINS = 40
+DENSITY_BINS = 50
+SCATTER_GRID = 64
+MAX_SCATTER_POINTS = 3000
+
+# Share of rows cut from each end of a linear column's range, so a few
+# extreme values don't squeeze every other row into one bin
+CLIP_QUANTILE = 0.005
+
+# Charted columns per dataset: (column, title, log10 scale)
+CHART_COLUMNS = {
+    "104-Input Kepler": [
+        ('koi_period', "Orbital Period (days)", True),
+        ('koi_prad', "Planet Radius (Earth radii)", True),
+        ('koi_insol', "Insolation (Earth flux)", True),
+        ('koi_steff', "Stellar Temperature (K)", False)
+    ],
+    **{
+        model_name: [
+            ('orbital_period', "Orbital Period (days)", True),
+            ('planet_radius', "Planet Radius (Earth radii)", True),
+            ('insolation', "Insolation (Earth flux)", True),
+            ('stellar_temp', "Stellar Temperature (K)", False)
+        ]
+        for model_name in ("Kepler Model", "TESS Model", "K2 Model")
+    }
+}
+
+
+def aggregate_path(model_name, cache_dir=AGGREGATE_CACHE_DIR):
+    """Return the cache file for a dataset's current content"""
+    dataset_path = get_dataset_path(model_name)
+    return Path(cache_dir) / f"{dataset_path.stem}-v{FORMAT_VERSION}-{file_hash(dataset_path)[:16]}.json"
+
+
+def _scaled(values, log):
+    """Return values on the chart's scale, NaN where a log10 column is not positive"""
+    values = np.asarray(values, dtype=np.float64)
+    if not log:
+        return values
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(values > 0, np.log10(values), np.nan)
+
+
+def _edges(scaled, bins, clip=False):
+    """Return evenly spaced bin edges over the values' range, optionally cut at CLIP_QUANTILE"""
+    finite = scaled[np.isfinite(scaled)]
+    if not len(finite):
+        return np.linspace(0.0, 1.0, bins + 1)
+    low, high = np.quantile(finite, [CLIP_QUANTILE, 1 - CLIP_QUANTILE]) if clip else (finite.min(), finite.max())
+    if high <= low:
+        low, high = low - 0.5, high + 0.5
+    return np.linspace(low, high, bins + 1)
+
+
+def _bin(scaled, edges):
+    """Return each value's bin, with out-of-range values folded into the end bins and NaN as -1"""
+    bins = np.clip(np.searchsorted(edges, scaled, side='right') - 1, 0, len(edges) - 2)
+    return np.where(np.isfinite(scaled), bins, -1)
+
+
+def _unscaled(edges, log):
+    return (10 ** edges if log else edges).tolist()
+
+
+def level_of_detail(x, y, labels, grid=SCATTER_GRID, max_points=MAX_SCATTER_POINTS, seed=0):
+    """Return the row positions kept for a scatter plot and how many rows each one stands for.
+
+    ``x`` and ``y`` are on the chart's scale. One randomly chosen row is kept
+    per occupied grid cell and label.
+    """
+    valid = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    if not len(valid):
+        return valid, valid
+    rng = np.random.default_rng(seed)
+    valid = rng.permutation(valid)
+    cells_x = _bin(x[valid], _edges(x[valid], grid))
+    cells_y = _bin(y[valid], _edges(y[valid], grid))
+    _, codes = np.unique(labels[valid], return_inverse=True)
+    keys = (codes.astype(np.int64) * grid + cells_x) * grid + cells_y
+    _, first, weights = np.unique(keys, return_index=True, return_counts=True)
+    kept = valid[first]
+    if len(kept) > max_points:
+        chosen = np.sort(rng.choice(len(kept), max_points, replace=False))
+        kept, weights = kept[chosen], weights[chosen]
+    return kept, weights
+
+
+def build_aggregates(model_name, df):
+    """Reduce a dataset to the fixed-size data behind its charts"""
+    labels = df[TARGET_COLUMNS[model_name]].astype(str).replace(DISPOSITION_ALIASES).to_numpy()
+    dispositions = sorted(set(labels))
+    counts = pd.Series(labels).value_counts()
+    columns = CHART_COLUMNS[model_name]
+
+    histograms = {}
+    scaled_columns = {}
+    for column, title, log in columns:
+        scaled = _scaled(pd.to_numeric(df[column], errors='coerce'), log)
+        scaled_columns[column] = scaled
+        edges = _edges(scaled, HISTOGRAM_BINS, clip=not log)
+        bins = _bin(scaled, edges)
+        histograms[column] = {
+            'title': title,
+            'log': log,
+            'edges': _unscaled(edges, log),
+            'counts': {
+                label: np.bincount(bins[(labels == label) & (bins >= 0)], minlength=HISTOGRAM_BINS).tolist()
+                for label in dispositions
+            },
+            'missing': int(np.sum(bins < 0))
+        }
+
+    (x_column, x_title, x_log), (y_column, y_title, y_log) = columns[0], columns[1]
+    x, y = scaled_columns[x_column], scaled_columns[y_column]
+    x_edges, y_edges = _edges(x, DENSITY_BINS, clip=not x_log), _edges(y, DENSITY_BINS, clip=not y_log)
+    x_bins, y_bins = _bin(x, x_edges), _bin(y, y_edges)
+    both = (x_bins >= 0) & (y_bins >= 0)
+    density = np.zeros((DENSITY_BINS, DENSITY_BINS), dtype=np.int64)
+    np.add.at(density, (y_bins[both], x_bins[both]), 1)
+
+    kept, weights = level_of_detail(x, y, labels)
+    raw_x = pd.to_numeric(df[x_column], errors='coerce').to_numpy(dtype=np.float64)
+    raw_y = pd.to_numeric(df[y_column], errors='coerce').to_numpy(dtype=np.float64)
+    return {
+        'model': model_name,
+        'rows': int(len(df)),
+        'dispositions': {label: int(counts[label]) for label in dispositions},
+        'histograms': histograms,
+        'density': {
+            'x': x_column, 'y': y_column, 'x_title': x_title, 'y_title': y_title,
+            'x_log': x_log, 'y_log': y_log,
+            'x_edges': _unscaled(x_edges, x_log), 'y_edges': _unscaled(y_edges, y_log),
+            'counts': density.tolist()
+        },
+        'scatter': {
+            'x': raw_x[kept].tolist(),
+            'y': raw_y[kept].tolist(),
+            'disposition': labels[kept].tolist(),
+            'weight': weights.tolist(),
+            'rows': int(both.sum())
+        }
+    }
+
+
+def load_aggregates(model_name, cache_dir=AGGREGATE_CACHE_DIR):
+    """Return a dataset's aggregates, computing and caching them if its content changed"""
+    cache_file = aggregate_path(model_name, cache_dir)
+    if cache_file.exists():
+        with open(cache_file) as f:
+            return json.load(f)
+
+    columns = [column for column, _, _ in CHART_COLUMNS[model_name]] + [TARGET_COLUMNS[model_name]]
+    result = build_aggregates(model_name, load_model_dataset(model_name, columns=columns))
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_file.with_suffix('.tmp')
+    with open(tmp_file, 'w') as f:
+        json.dump(result, f)
+    tmp_file.replace(cache_file)
+    return result
+
+
+def main():
+    for model_name in DATASET_PATHS:
+        if not get_dataset_path(model_name).exists():
+            print(f"⚠️  {model_name}: dataset not found, skipping")
+            continue
+        start = time.perf_counter()
+        result = load_aggregates(model_name)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        size_kb = aggregate_path(model_name).stat().st_size / 1024
+        print(f"✅ {model_name}: {result['rows']:,} rows -> {len(result['scatter']['x']):,} scatter points, "
+              f"{size_kb:.0f} KB ({elapsed_ms:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
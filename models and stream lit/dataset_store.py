@@ -0,0 +1,166 @@
+"""Columnar binary cache for the mission datasets with memory-mapped loading.
+
+Each CSV is converted once into a directory holding one ``.npy`` file per
+column, keyed by a hash of the CSV content. Later loads memory-map those
+files, so the parsed data lives in the shared page cache instead of every
+process holding its own copy, and callers can read only the columns they
+need. String columns are stored as categorical codes plus their categories.
+
+Usage:
+    python dataset_store.py            # convert every bundled dataset
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from scoring import BASE_DIR, DATASET_PATHS
+
+CACHE_DIR = BASE_DIR / ".dataset_cache"
+
+# Bump when the on-disk layout changes so old caches are ignored
+FORMAT_VERSION = 1
+
+_hash_lock = threading.Lock()
+_hash_memo = {}
+
+
+def file_hash(path):
+    """Return the SHA-256 of a file's content, memoized on (size, mtime)"""
+    path = Path(path)
+    stat = path.stat()
+    memo_key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    with _hash_lock:
+        cached = _hash_memo.get(memo_key)
+    if cached is not None:
+        return cached
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    content_hash = digest.hexdigest()
+    with _hash_lock:
+        _hash_memo[memo_key] = content_hash
+    return content_hash
+
+
+def cache_path(csv_path, cache_dir=CACHE_DIR):
+    """Return the cache directory for a CSV's current content"""
+    csv_path = Path(csv_path)
+    return Path(cache_dir) / f"{csv_path.stem}-v{FORMAT_VERSION}-{file_hash(csv_path)[:16]}"
+
+
+def _write_columns(df, target_dir):
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        file_name = f"{i:04d}.npy"
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            np.save(target_dir / file_name, np.ascontiguousarray(series.to_numpy()))
+            columns.append({'name': name, 'kind': 'numeric', 'file': file_name})
+        else:
+            codes, categories = pd.factorize(series.astype(object), sort=True)
+            np.save(target_dir / file_name, codes.astype(np.int32))
+            columns.append({
+                'name': name, 'kind': 'categorical', 'file': file_name,
+                'categories': [str(c) for c in categories]
+            })
+    return columns
+
+
+def convert(csv_path, cache_dir=CACHE_DIR):
+    """Convert a CSV into the columnar cache if needed and return its directory"""
+    target_dir = cache_path(csv_path, cache_dir)
+    if (target_dir / "meta.json").exists():
+        return target_dir
+
+    df = pd.read_csv(csv_path)
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    # Build in a scratch directory and rename so readers never see a partial cache
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f".{target_dir.name}-", dir=cache_dir))
+    try:
+        os.chmod(tmp_dir, 0o755)
+        meta = {
+            'source': Path(csv_path).name,
+            'sha256': file_hash(csv_path),
+            'format_version': FORMAT_VERSION,
+            'rows': len(df),
+            'columns': _write_columns(df, tmp_dir)
+        }
+        with open(tmp_dir / "meta.json", 'w') as f:
+            json.dump(meta, f)
+        try:
+            os.rename(tmp_dir, target_dir)
+        except OSError:
+            # Another process finished the same conversion first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    # Drop caches of older versions of this file
+    for stale in Path(cache_dir).glob(f"{Path(csv_path).stem}-v*"):
+        if stale != target_dir and stale.is_dir():
+            shutil.rmtree(stale, ignore_errors=True)
+    return target_dir
+
+
+def read_meta(csv_path, cache_dir=CACHE_DIR):
+    """Return the cache metadata for a CSV, converting it first if needed"""
+    with open(convert(csv_path, cache_dir) / "meta.json") as f:
+        return json.load(f)
+
+
+def load_dataset(csv_path, columns=None, cache_dir=CACHE_DIR):
+    """Load a CSV through the columnar cache.
+
+    Numeric columns are read-only memory maps over the cached ``.npy`` files
+    and are not copied into the returned DataFrame. Pass ``columns`` to read
+    only a subset, in the given order.
+    """
+    target_dir = convert(csv_path, cache_dir)
+    with open(target_dir / "meta.json") as f:
+        meta = json.load(f)
+
+    by_name = {column['name']: column for column in meta['columns']}
+    if columns is None:
+        columns = [column['name'] for column in meta['columns']]
+    missing = [name for name in columns if name not in by_name]
+    if missing:
+        raise KeyError(f"Columns not in {meta['source']}: {missing}")
+
+    data = {}
+    for name in columns:
+        column = by_name[name]
+        values = np.load(target_dir / column['file'], mmap_mode='r')
+        if column['kind'] == 'categorical':
+            data[name] = pd.Categorical.from_codes(np.asarray(values), categories=column['categories'])
+        else:
+            data[name] = values
+    return pd.DataFrame(data, columns=columns, copy=False)
+
+
+def load_model_dataset(model_name, columns=None, cache_dir=CACHE_DIR):
+    """Load the bundled dataset for a model through the columnar cache"""
+    return load_dataset(BASE_DIR / DATASET_PATHS[model_name], columns=columns, cache_dir=cache_dir)
+
+
+def main():
+    for model_name, relative_path in DATASET_PATHS.items():
+        csv_path = BASE_DIR / relative_path
+        if not csv_path.exists():
+            print(f"⚠️  {model_name}: {relative_path} not found, skipping")
+            continue
+        meta = read_meta(csv_path)
+        print(f"✅ {model_name}: {meta['rows']:,} rows x {len(meta['columns'])} columns -> {cache_path(csv_path)}")
+
+
+if __name__ == "__main__":
+    main()
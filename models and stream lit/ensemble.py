@@ -0,0 +1,272 @@
+"""Multi-model ensemble scoring across the Kepler, K2, TESS and 104-input models.
+
+One set of common inputs is projected into every model's feature space and
+all models are scored concurrently on a thread pool (the boosters release the
+GIL while predicting), so with a core per model the ensemble costs about one
+model's latency rather than the sum. Each model's probabilities
+are temperature-scaled on its held-out split, mapped onto the dispositions
+the missions share (Confirmed / Candidate / False Positive) and averaged,
+weighted by how many of the model's features the inputs actually supplied.
+
+Fitted temperatures are cached on disk next to the evaluations, under the
+same key (model file, dataset and preprocessing).
+
+Usage:
+    from ensemble import EnsemblePredictor
+    ensemble = EnsemblePredictor(ModelRegistry())
+    result = ensemble.predict({'orbital_period': 9.49, 'planet_radius': 2.3})
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from dataset_store import load_model_dataset
+from evaluation import EVALUATION_CACHE_DIR, evaluation_key, holdout_indices
+from scoring import (
+    TARGET_COLUMNS, get_feature_mapping, build_input_vector, build_feature_matrix,
+    predict_proba_batch, class_names, encode_targets
+)
+
+# Dispositions shared by every mission, in the order combined probabilities are reported
+ENSEMBLE_CLASSES = ["Confirmed", "Candidate", "False Positive"]
+
+# Each model's disposition names mapped onto the shared dispositions
+DISPOSITION_GROUPS = {
+    "CONFIRMED": "Confirmed",
+    "CANDIDATE": "Candidate",
+    "FALSE POSITIVE": "False Positive",
+    "REFUTED": "False Positive",
+    "Confirmed Planet": "Confirmed",
+    "Known Planet": "Confirmed",
+    "Active Planet Candidate": "Candidate",
+    "Planet Candidate": "Candidate",
+    "False Alarm": "False Positive",
+    "False Positive": "False Positive"
+}
+
+# Mission feature names and the 104-input Kepler column holding the same quantity
+FEATURE_ALIASES = [
+    ('orbital_period', 'koi_period'),
+    ('transit_duration', 'koi_duration'),
+    ('transit_depth', 'koi_depth'),
+    ('planet_radius', 'koi_prad'),
+    ('inclination', 'koi_incl'),
+    ('equilibrium_temp', 'koi_teq'),
+    ('insolation', 'koi_insol'),
+    ('stellar_temp', 'koi_steff'),
+    ('stellar_logg', 'koi_slogg'),
+    ('stellar_radius', 'koi_srad'),
+    ('stellar_mass', 'koi_smass'),
+    ('st_met', 'koi_smet')
+]
+
+_SYNONYMS = {}
+for _names in FEATURE_ALIASES:
+    for _name in _names:
+        _SYNONYMS[_name] = [other for other in _names if other != _name]
+
+# Search bounds for the fitted temperature
+MIN_TEMPERATURE = 0.05
+MAX_TEMPERATURE = 20.0
+
+
+def project_inputs(model_name, inputs):
+    """Return the subset of ``inputs`` for the model's features, resolving aliases.
+
+    Features the inputs don't provide are left out so build_input_vector
+    fills them with the model's defaults.
+    """
+    projected = {}
+    for feature in get_feature_mapping(model_name)['features']:
+        for name in [feature] + _SYNONYMS.get(feature, []):
+            if name in inputs:
+                projected[feature] = inputs[name]
+                break
+    return projected
+
+
+def disposition_matrix(model_name, classes):
+    """Return a (n_classes, len(ENSEMBLE_CLASSES)) 0/1 matrix grouping model classes"""
+    matrix = np.zeros((len(classes), len(ENSEMBLE_CLASSES)))
+    for i, name in enumerate(class_names(model_name, classes)):
+        matrix[i, ENSEMBLE_CLASSES.index(DISPOSITION_GROUPS[name])] = 1.0
+    return matrix
+
+
+def apply_temperature(probabilities, temperature):
+    """Rescale probability rows as if their logits were divided by ``temperature``"""
+    logits = np.log(np.clip(probabilities, 1e-12, 1.0)) / temperature
+    logits -= logits.max(axis=1, keepdims=True)
+    scaled = np.exp(logits)
+    return scaled / scaled.sum(axis=1, keepdims=True)
+
+
+def _log_loss(probabilities, y_index):
+    return float(-np.mean(np.log(np.clip(probabilities[np.arange(len(y_index)), y_index], 1e-12, 1.0))))
+
+
+def fit_temperature(probabilities, y_index, iterations=60):
+    """Fit the temperature minimizing log loss by golden-section search over log T"""
+    low, high = np.log(MIN_TEMPERATURE), np.log(MAX_TEMPERATURE)
+    ratio = (np.sqrt(5) - 1) / 2
+
+    def loss(log_t):
+        return _log_loss(apply_temperature(probabilities, np.exp(log_t)), y_index)
+
+    a, b = high - ratio * (high - low), low + ratio * (high - low)
+    loss_a, loss_b = loss(a), loss(b)
+    for _ in range(iterations):
+        if loss_a < loss_b:
+            high, b, loss_b = b, a, loss_a
+            a = high - ratio * (high - low)
+            loss_a = loss(a)
+        else:
+            low, a, loss_a = a, b, loss_b
+            b = low + ratio * (high - low)
+            loss_b = loss(b)
+    return float(np.exp((low + high) / 2))
+
+
+def calibrate_model(model, model_name, data):
+    """Fit a model's temperature on the held-out split of ``data``"""
+    y_true = encode_targets(model_name, data[TARGET_COLUMNS[model_name]])
+    holdout = holdout_indices(y_true)
+    probabilities = predict_proba_batch(model, build_feature_matrix(model_name, data.iloc[holdout]))
+    y_index = np.searchsorted(np.asarray(model.classes_), y_true[holdout])
+
+    temperature = fit_temperature(probabilities, y_index)
+    return {
+        'model': model_name,
+        'temperature': temperature,
+        'rows': int(len(holdout)),
+        'log_loss_before': _log_loss(probabilities, y_index),
+        'log_loss_after': _log_loss(apply_temperature(probabilities, temperature), y_index)
+    }
+
+
+def cached_calibration(model_name, model, cache_dir=EVALUATION_CACHE_DIR):
+    """Return a model's calibration, fitting and caching it if the files changed"""
+    cache_file = Path(cache_dir) / f"{evaluation_key(model_name)}-calibration.json"
+    if cache_file.exists():
+        with open(cache_file) as f:
+            return json.load(f)
+
+    result = calibrate_model(model, model_name, load_model_dataset(model_name))
+
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_file.with_suffix('.tmp')
+    with open(tmp_file, 'w') as f:
+        json.dump(result, f)
+    tmp_file.replace(cache_file)
+    return result
+
+
+class EnsemblePredictor:
+    """Score one set of inputs with every registry model concurrently and combine them.
+
+    With a BatchScheduler, each model's row joins that model's micro-batches
+    like any other single-row prediction. ``workers`` defaults to one per
+    model up to the core count; with a single worker models are scored
+    inline, since thread hand-offs only add latency on one core.
+    """
+
+    def __init__(self, registry, model_names=None, workers=None, scheduler=None, calibrate=True):
+        self.registry = registry
+        self.model_names = list(model_names or registry.model_names)
+        self.workers = workers or min(len(self.model_names), os.cpu_count() or 1)
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ensemble") if self.workers > 1 else None
+        self.scheduler = scheduler
+        self.calibrate = calibrate
+        self._temperatures = {}
+        # One lock per model, so concurrent first requests calibrate each model once
+        self._temperature_locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _temperature(self, model_name, model):
+        """Return (temperature, calibrated) for a model; 1.0 if its dataset is unavailable"""
+        if not self.calibrate:
+            return 1.0, False
+        try:
+            key = evaluation_key(model_name)
+            if key not in self._temperatures:
+                with self._locks_lock:
+                    lock = self._temperature_locks.setdefault(model_name, threading.Lock())
+                with lock:
+                    if key not in self._temperatures:
+                        self._temperatures[key] = cached_calibration(model_name, model)['temperature']
+            return self._temperatures[key], True
+        except Exception:
+            return 1.0, False
+
+    def _score_model(self, model_name, inputs):
+        start = time.perf_counter()
+        model = self.registry.get(model_name)
+        features = project_inputs(model_name, inputs)
+        row = build_input_vector(model_name, features)
+        if self.scheduler is not None:
+            probabilities = self.scheduler.predict(model_name, row[0])
+        else:
+            probabilities = model.predict_proba(row)[0]
+
+        temperature, calibrated = self._temperature(model_name, model)
+        calibrated_probabilities = apply_temperature(np.asarray(probabilities).reshape(1, -1), temperature)[0]
+        combined = calibrated_probabilities @ disposition_matrix(model_name, model.classes_)
+        n_features = len(get_feature_mapping(model_name)['features'])
+        return {
+            'model': model_name,
+            'label': class_names(model_name, model.classes_)[int(np.argmax(probabilities))],
+            'probabilities': dict(zip(ENSEMBLE_CLASSES, combined.tolist())),
+            'temperature': temperature,
+            'calibrated': calibrated,
+            'coverage': len(features) / n_features if n_features else 0.0,
+            'latency_ms': (time.perf_counter() - start) * 1000
+        }
+
+    def predict(self, inputs, model_names=None):
+        """Score ``inputs`` with every model and return the combined and per-model results"""
+        start = time.perf_counter()
+        names = list(model_names or self.model_names)
+        if self.pool is not None:
+            futures = {name: self.pool.submit(self._score_model, name, inputs) for name in names}
+            outcomes = {name: future.exception() or future.result() for name, future in futures.items()}
+        else:
+            outcomes = {}
+            for name in names:
+                try:
+                    outcomes[name] = self._score_model(name, inputs)
+                except Exception as e:
+                    outcomes[name] = e
+
+        results = [outcome for outcome in outcomes.values() if not isinstance(outcome, Exception)]
+        errors = {name: str(outcome) for name, outcome in outcomes.items() if isinstance(outcome, Exception)}
+        if not results:
+            raise RuntimeError(f"No model could score the inputs: {errors}")
+
+        # Models fed mostly defaults say little about these inputs, so weight by coverage
+        weights = np.array([r['coverage'] for r in results])
+        if weights.sum() == 0:
+            weights = np.ones(len(results))
+        weights = weights / weights.sum()
+        for result, weight in zip(results, weights):
+            result['weight'] = float(weight)
+
+        matrix = np.array([[r['probabilities'][c] for c in ENSEMBLE_CLASSES] for r in results])
+        combined = weights @ matrix
+        best = int(np.argmax(combined))
+        return {
+            'prediction': ENSEMBLE_CLASSES[best],
+            'confidence': float(combined[best] * 100),
+            'probabilities': dict(zip(ENSEMBLE_CLASSES, combined.tolist())),
+            'models': results,
+            'errors': errors,
+            'latency_ms': (time.perf_counter() - start) * 1000
+        }
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
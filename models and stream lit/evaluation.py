@@ -0,0 +1,165 @@
+"""Whole-dataset evaluation of the bundled models with cached results.
+
+Each model is scored over every row of its dataset in vectorized chunks and
+compared against the recorded disposition. Metrics are reported on the full
+dataset and on the held-out split the training notebooks used
+(``train_test_split(test_size=0.3, stratify=y, random_state=42)``), since the
+full dataset includes the rows the model was trained on.
+
+Results are cached on disk keyed by the model file hash, the dataset hash
+and the fitted preprocessing, so they are recomputed automatically whenever
+any of them changes.
+scikit-learn and joblib are imported only when an evaluation actually runs,
+so reading a cached result stays cheap.
+
+Usage:
+    python evaluation.py               # evaluate every bundled model
+"""
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import file_hash, load_model_dataset
+from scoring import (
+    BASE_DIR, MODEL_PATHS, SUMMARY_PATHS, TARGET_COLUMNS, DEFAULT_CHUNK_SIZE, get_dataset_path,
+    get_model_path, build_feature_matrix, predict_proba_batch, class_names, encode_targets
+)
+
+EVALUATION_CACHE_DIR = BASE_DIR / ".evaluation_cache"
+
+# Held-out split used by the training notebooks
+TEST_SIZE = 0.3
+SPLIT_RANDOM_STATE = 42
+
+
+def compute_metrics(y_true, probabilities, classes, names):
+    """Return accuracy, one-vs-rest AUC, confusion matrix and per-class breakdown"""
+    from sklearn.metrics import confusion_matrix, roc_auc_score
+
+    classes = np.asarray(classes)
+    y_pred = classes[np.argmax(probabilities, axis=1)]
+    matrix = confusion_matrix(y_true, y_pred, labels=classes)
+
+    try:
+        auc = float(roc_auc_score(y_true, probabilities, multi_class='ovr', labels=classes))
+    except ValueError:
+        # Undefined when a class is absent from y_true
+        auc = None
+
+    per_class = []
+    for i, name in enumerate(names):
+        support = int(matrix[i].sum())
+        predicted = int(matrix[:, i].sum())
+        correct = int(matrix[i, i])
+        per_class.append({
+            'disposition': name,
+            'support': support,
+            'predicted': predicted,
+            'recall': correct / support if support else None,
+            'precision': correct / predicted if predicted else None
+        })
+
+    return {
+        'rows': int(len(y_true)),
+        'accuracy': float(np.mean(y_pred == y_true)) if len(y_true) else None,
+        'auc': auc,
+        'confusion_matrix': matrix.tolist(),
+        'per_class': per_class
+    }
+
+
+def holdout_indices(y_true):
+    """Return the row positions of the notebooks' held-out split among labelled rows"""
+    from sklearn.model_selection import train_test_split
+
+    labelled = np.flatnonzero(y_true >= 0)
+    _, holdout = train_test_split(
+        labelled, test_size=TEST_SIZE, stratify=y_true[labelled], random_state=SPLIT_RANDOM_STATE
+    )
+    return holdout
+
+
+def evaluate_model(model, model_name, data, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Score every row of ``data`` and return metrics for the full set and the held-out split"""
+    start = time.perf_counter()
+    y_true = encode_targets(model_name, data[TARGET_COLUMNS[model_name]])
+    labelled = np.flatnonzero(y_true >= 0)
+
+    probabilities = predict_proba_batch(model, build_feature_matrix(model_name, data), chunk_size)
+    names = class_names(model_name, model.classes_)
+    holdout = holdout_indices(y_true)
+
+    return {
+        'model': model_name,
+        'classes': names,
+        'full': compute_metrics(y_true[labelled], probabilities[labelled], model.classes_, names),
+        'holdout': compute_metrics(y_true[holdout], probabilities[holdout], model.classes_, names),
+        'seconds': time.perf_counter() - start
+    }
+
+
+def reported_metrics(model_name):
+    """Return the best model's test metrics recorded in the notebook results summary"""
+    summary_path = BASE_DIR / SUMMARY_PATHS[model_name]
+    if not summary_path.exists():
+        return None
+    summary = pd.read_csv(summary_path, usecols=['model', 'test_auc', 'test_accuracy'])
+    best = summary.sort_values('test_auc', ascending=False).iloc[0]
+    return {'algorithm': best['model'], 'accuracy': float(best['test_accuracy']), 'auc': float(best['test_auc'])}
+
+
+def evaluation_key(model_name):
+    """Return the cache key for a model's current model, dataset and preprocessing"""
+    from preprocessing import get_preprocessor
+
+    model_hash = file_hash(get_model_path(model_name))
+    dataset_hash = file_hash(get_dataset_path(model_name))
+    slug = model_name.lower().replace(' ', '_').replace('-', '_')
+    return f"{slug}-{model_hash[:16]}-{dataset_hash[:16]}-{get_preprocessor(model_name).fingerprint()}"
+
+
+def load_cached_evaluation(model_name, cache_dir=EVALUATION_CACHE_DIR):
+    """Return the cached evaluation for the current model and dataset files, or None"""
+    cache_file = Path(cache_dir) / f"{evaluation_key(model_name)}.json"
+    if not cache_file.exists():
+        return None
+    with open(cache_file) as f:
+        return json.load(f)
+
+
+def cached_evaluation(model_name, model=None, cache_dir=EVALUATION_CACHE_DIR):
+    """Return the evaluation for a model, computing and caching it if the files changed"""
+    cached = load_cached_evaluation(model_name, cache_dir)
+    if cached is not None:
+        return cached
+
+    if model is None:
+        import joblib
+        model = joblib.load(get_model_path(model_name))
+    result = evaluate_model(model, model_name, load_model_dataset(model_name))
+
+    cache_file = Path(cache_dir) / f"{evaluation_key(model_name)}.json"
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_file.with_suffix('.tmp')
+    with open(tmp_file, 'w') as f:
+        json.dump(result, f)
+    tmp_file.replace(cache_file)
+    return result
+
+
+def main():
+    for model_name in MODEL_PATHS:
+        if not get_dataset_path(model_name).exists():
+            print(f"⚠️  {model_name}: dataset not found, skipping")
+            continue
+        result = cached_evaluation(model_name)
+        holdout, full = result['holdout'], result['full']
+        print(f"✅ {model_name}: held-out accuracy {holdout['accuracy']:.3f} AUC {holdout['auc']:.3f} | "
+              f"full dataset accuracy {full['accuracy']:.3f} AUC {full['auc']:.3f} ({full['rows']:,} rows)")
+
+
+if __name__ == "__main__":
+    main()
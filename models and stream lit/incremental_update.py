@@ -0,0 +1,357 @@
+"""Incremental updates of the boosted models when rows are appended to their datasets.
+
+Every row a model has seen is recorded in a sidecar next to the model
+(``best_model_k2.rows.npz`` beside ``best_model_k2.pkl``) as a 64-bit digest
+of its raw features and disposition, split into the rows it trained on and
+the rows it was validated on. When a dataset grows, the rows whose digest
+isn't recorded are the delta:
+
+- each new row joins the training or held-out side by its digest, so the
+  split is stable however many rows arrive later
+- LightGBM and XGBoost models keep their trees and continue boosting, at a
+  reduced learning rate and with capped leaf outputs, on the new training
+  rows plus a stratified replay of rows they were trained on, so every
+  class stays represented
+- the updated model replaces ``best_model_*.pkl`` only if its AUC on the
+  held-out rows (the original split plus the new held-out rows) is not
+  lower than the current model's
+
+``--check`` rehearses the whole flow on a scratch copy fitted without the
+last rows of each dataset and fails if any update is rejected.
+
+A model without a sidecar, or whose file changed since the sidecar was
+written, is assumed to have been trained on the dataset as it is now (or on
+its first ``--baseline-rows`` rows) with the notebooks' split.
+
+Usage:
+    python incremental_update.py                          # update every model with new rows
+    python incremental_update.py --models "TESS Model" --dry-run
+    python incremental_update.py --models "K2 Model" --baseline-rows 4004
+    python incremental_update.py --check                  # simulate an update on held-back rows
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from dataset_store import file_hash, load_dataset
+from evaluation import TEST_SIZE, SPLIT_RANDOM_STATE, holdout_indices
+from precompute_scores import row_digests
+from preprocessing import load_preprocessor, preprocessor_path, raw_feature_matrix
+from scoring import MODEL_PATHS, TARGET_COLUMNS, get_dataset_path, get_model_path, encode_targets
+from train_pipeline import preprocess
+
+ROWS_SUFFIX = ".rows.npz"
+FORMAT_VERSION = 1
+
+# Boosting rounds added per update
+DELTA_ROUNDS = 50
+
+# Learning rate of the added rounds relative to the model's own; smaller steps keep a
+# few hundred new rows from overwriting what the existing trees learned
+DELTA_LEARNING_RATE_SCALE = 0.3
+
+# Limits on the added rounds' leaves, in the scikit-learn parameter names LightGBM and
+# XGBoost share: max_delta_step caps each leaf's output and min_child_weight
+# (LightGBM's min_sum_hessian_in_leaf) its summed hessian. Without them a rare class
+# such as K2's 22 REFUTED rows gets leaves that move its logits by tens per round
+DELTA_LEAF_LIMITS = {'max_delta_step': 1.0, 'min_child_weight': 1.0}
+
+# Fewest previously trained rows replayed alongside the new ones
+MIN_REPLAY_ROWS = 2000
+
+# Allowed drop in held-out AUC before an update is rejected
+DEFAULT_TOLERANCE = 0.0
+
+# Share of each dataset's last rows --check holds back and replays as appended rows
+CHECK_NEW_SHARE = 0.1
+
+
+def rows_path(model_path):
+    """Return the training-rows sidecar path for a model file"""
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.stem + ROWS_SUFFIX)
+
+
+def row_keys(model_name, data):
+    """Return a digest of each row's raw features and encoded disposition"""
+    raw = raw_feature_matrix(model_name, data)
+    y = encode_targets(model_name, data[TARGET_COLUMNS[model_name]])
+    return row_digests(np.column_stack([raw, y]))
+
+
+def is_new_holdout(keys):
+    """Return which new rows are held out, chosen by digest so the split never changes"""
+    return (keys % 1000) < int(TEST_SIZE * 1000)
+
+
+class TrainingRows:
+    """Digests of the rows a model was trained and validated on"""
+
+    def __init__(self, train_digests, holdout_digests, model_hash):
+        self.train_digests = np.asarray(train_digests, dtype=np.uint64)
+        self.holdout_digests = np.asarray(holdout_digests, dtype=np.uint64)
+        self.model_hash = model_hash
+
+    def __len__(self):
+        return len(self.train_digests) + len(self.holdout_digests)
+
+    @classmethod
+    def baseline(cls, keys, y, model_hash):
+        """Record rows as split by the training notebooks"""
+        holdout = holdout_indices(y)
+        train = np.setdiff1d(np.flatnonzero(y >= 0), holdout)
+        return cls(keys[train], keys[holdout], model_hash)
+
+    def save(self, path):
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                train_digests=self.train_digests,
+                holdout_digests=self.holdout_digests,
+                model_hash=np.array(self.model_hash),
+                format_version=np.array(FORMAT_VERSION)
+            )
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data['format_version']) != FORMAT_VERSION:
+                raise ValueError(f"{path} has format version {int(data['format_version'])}, expected {FORMAT_VERSION}")
+            return cls(data['train_digests'], data['holdout_digests'], str(data['model_hash']))
+
+
+def continue_boosting(model, X, y, rounds=DELTA_ROUNDS):
+    """Return a copy of a LightGBM or XGBoost classifier boosted ``rounds`` more rounds on (X, y)"""
+    from sklearn.base import clone
+
+    kind = type(model).__name__
+    params = model.get_params()
+    updated = clone(model).set_params(
+        n_estimators=rounds, learning_rate=params['learning_rate'] * DELTA_LEARNING_RATE_SCALE, **DELTA_LEAF_LIMITS
+    )
+    if kind == 'LGBMClassifier':
+        updated.set_params(verbose=-1).fit(X, y, init_model=model.booster_)
+    elif kind == 'XGBClassifier':
+        booster = model.get_booster()
+        if booster.feature_names:
+            # Boosters fitted on a DataFrame only accept more rows with the same column names
+            import pandas as pd
+            X = pd.DataFrame(X, columns=booster.feature_names)
+        updated.fit(X, y, xgb_model=booster)
+    else:
+        raise ValueError(f"{kind} cannot continue training; retrain it with train_pipeline.py")
+    restored = {name: params[name] for name in DELTA_LEAF_LIMITS if name in params}
+    return updated.set_params(n_estimators=params['n_estimators'] + rounds, learning_rate=params['learning_rate'],
+                              **restored)
+
+
+def _replay(positions, y, size):
+    """Return a stratified sample of ``size`` row positions"""
+    from sklearn.model_selection import train_test_split
+
+    if size >= len(positions):
+        return positions
+    sample, _ = train_test_split(positions, train_size=size, stratify=y[positions], random_state=SPLIT_RANDOM_STATE)
+    return sample
+
+
+def _scores(model, X, y):
+    from sklearn.metrics import accuracy_score, roc_auc_score
+
+    probabilities = model.predict_proba(X)
+    return (
+        float(roc_auc_score(y, probabilities, multi_class='ovr', labels=model.classes_)),
+        float(accuracy_score(y, model.classes_[np.argmax(probabilities, axis=1)]))
+    )
+
+
+def update_model(model_name, model_path=None, dataset_path=None, rounds=DELTA_ROUNDS,
+                 tolerance=DEFAULT_TOLERANCE, dry_run=False, baseline_rows=None):
+    """Continue training a model on its dataset's new rows and promote it if held-out AUC holds.
+
+    Returns a summary with a ``status`` of 'up to date', 'promoted',
+    'rejected' or 'dry run'.
+    """
+    import joblib
+
+    start = time.perf_counter()
+    model_path = Path(model_path or get_model_path(model_name))
+    dataset_path = Path(dataset_path or get_dataset_path(model_name))
+    data = load_dataset(dataset_path)
+    keys = row_keys(model_name, data)
+    # Keep the model's own fill values so the new rows are prepared exactly like the old ones
+    X, y, preprocessor = preprocess(model_name, data, load_preprocessor(model_path))
+
+    sidecar = rows_path(model_path)
+    model_hash = file_hash(model_path)
+    known = TrainingRows.load(sidecar) if sidecar.exists() else None
+    result = {'model': model_name, 'baseline': known is None or known.model_hash != model_hash}
+    if result['baseline']:
+        n = len(keys) if baseline_rows is None else baseline_rows
+        known = TrainingRows.baseline(keys[:n], y[:n], model_hash)
+        # A dry run keeps the baseline in memory and leaves the files next to the model untouched
+        if not dry_run:
+            known.save(sidecar)
+
+    labelled = y >= 0
+    new = np.flatnonzero(labelled & ~np.isin(keys, np.concatenate([known.train_digests, known.holdout_digests])))
+    held_out = is_new_holdout(keys[new])
+    new_train, new_holdout = new[~held_out], new[held_out]
+    result.update({'new_rows': int(len(new)), 'known_rows': len(known)})
+    if not len(new_train):
+        result.update({'status': 'up to date', 'seconds': time.perf_counter() - start})
+        return result
+
+    old_train = np.flatnonzero(labelled & np.isin(keys, known.train_digests))
+    validation = np.concatenate([np.flatnonzero(labelled & np.isin(keys, known.holdout_digests)), new_holdout])
+    fit_rows = np.concatenate([new_train, _replay(old_train, y, max(len(new_train), MIN_REPLAY_ROWS))])
+
+    model = joblib.load(model_path)
+    missing = set(model.classes_.tolist()) - set(y[fit_rows].tolist())
+    if missing:
+        raise ValueError(f"No training rows for classes {sorted(missing)}; retrain {model_name} with train_pipeline.py")
+    updated = continue_boosting(model, X[fit_rows], y[fit_rows], rounds)
+
+    auc_before, accuracy_before = _scores(model, X[validation], y[validation])
+    auc_after, accuracy_after = _scores(updated, X[validation], y[validation])
+    result.update({
+        'train_rows': int(len(fit_rows)),
+        'validation_rows': int(len(validation)),
+        'auc_before': auc_before,
+        'auc_after': auc_after,
+        'accuracy_before': accuracy_before,
+        'accuracy_after': accuracy_after
+    })
+
+    if auc_after < auc_before - tolerance:
+        result['status'] = 'rejected'
+    elif dry_run:
+        result['status'] = 'dry run'
+    else:
+        tmp_path = model_path.with_name(model_path.name + ".tmp")
+        joblib.dump(updated, tmp_path)
+        tmp_path.replace(model_path)
+        preprocessor.model_hash = file_hash(model_path)
+        preprocessor.save(preprocessor_path(model_path))
+        TrainingRows(
+            np.concatenate([known.train_digests, keys[new_train]]),
+            np.concatenate([known.holdout_digests, keys[new_holdout]]),
+            file_hash(model_path)
+        ).save(sidecar)
+        _refresh_compiled(updated, model_path, X)
+        result['status'] = 'promoted'
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def _refresh_compiled(model, model_path, X):
+    """Re-export the model's compiled and quantized artifacts if it has them, so they don't go stale.
+
+    ``X`` is checked for quantized parity; a model that fails it keeps its old
+    artifact, which the quantized engine then refuses as stale.
+    """
+    from quantized_model import build_quantized, quantized_path, save_quantized
+    from tree_compiler import compile_model, compiled_path
+
+    path = compiled_path(model_path)
+    compiled = compile_model(model) if path.exists() or quantized_path(model_path).exists() else None
+    if path.exists():
+        compiled.save(path)
+    if quantized_path(model_path).exists():
+        try:
+            quantized = build_quantized(model, X, compiled)[0]
+        except ValueError:
+            return
+        save_quantized(quantized, quantized_path(model_path), source_hash=file_hash(model_path))
+
+
+def check_update(model_name, new_share=CHECK_NEW_SHARE, rounds=DELTA_ROUNDS, tolerance=DEFAULT_TOLERANCE):
+    """Simulate an update end to end without touching the bundled files.
+
+    A fresh copy of the model is fitted on the notebook split of the dataset's
+    first rows, then updated with the last ``new_share`` of them as if they
+    had been appended. Returns the update_model summary; a 'rejected' status
+    means the added rounds made held-out predictions worse.
+    """
+    import joblib
+    from sklearn.base import clone
+
+    model_path, dataset_path = get_model_path(model_name), get_dataset_path(model_name)
+    data = load_dataset(dataset_path)
+    n = len(data) - int(len(data) * new_share)
+    X, y, _ = preprocess(model_name, data, load_preprocessor(model_path))
+    train = np.setdiff1d(np.flatnonzero(y[:n] >= 0), holdout_indices(y[:n]))
+
+    model = joblib.load(model_path)
+    if type(model).__name__ not in ('LGBMClassifier', 'XGBClassifier'):
+        raise ValueError(f"{type(model).__name__} cannot continue training; retrain it with train_pipeline.py")
+    fresh = clone(model)
+    X_train = X[train]
+    if type(model).__name__ == 'LGBMClassifier':
+        fresh.set_params(verbose=-1)
+    elif type(model).__name__ == 'XGBClassifier' and model.get_booster().feature_names:
+        import pandas as pd
+        X_train = pd.DataFrame(X_train, columns=model.get_booster().feature_names)
+    fresh.fit(X_train, y[train])
+
+    with tempfile.TemporaryDirectory() as scratch:
+        scratch_model = Path(scratch) / model_path.name
+        joblib.dump(fresh, scratch_model)
+        if preprocessor_path(model_path).exists():
+            shutil.copy(preprocessor_path(model_path), preprocessor_path(scratch_model))
+        return update_model(model_name, scratch_model, dataset_path, rounds=rounds, tolerance=tolerance,
+                            baseline_rows=n)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Continue training the boosted models on appended dataset rows")
+    parser.add_argument('--models', nargs='+', choices=list(MODEL_PATHS), help="Models to update (default: all)")
+    parser.add_argument('--rounds', type=int, default=DELTA_ROUNDS, help="Boosting rounds to add")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed drop in held-out AUC before the update is rejected")
+    parser.add_argument('--dry-run', action='store_true', help="Validate the update without replacing the model")
+    parser.add_argument('--baseline-rows', type=int,
+                        help="Without a sidecar, treat only the first N dataset rows as already trained on")
+    parser.add_argument('--check', action='store_true',
+                        help="Fit a scratch copy on the first rows, update it with the rest and fail if it is rejected")
+    args = parser.parse_args()
+
+    failed = False
+    for model_name in args.models or MODEL_PATHS:
+        if not get_dataset_path(model_name).exists():
+            print(f"⚠️  {model_name}: dataset not found, skipping")
+            continue
+        try:
+            if args.check:
+                result = check_update(model_name, rounds=args.rounds, tolerance=args.tolerance)
+                failed = failed or result['status'] == 'rejected'
+            else:
+                result = update_model(model_name, rounds=args.rounds, tolerance=args.tolerance,
+                                      dry_run=args.dry_run, baseline_rows=args.baseline_rows)
+        except ValueError as e:
+            print(f"⚠️  {model_name}: {e}")
+            continue
+
+        if result['baseline'] and not args.check:
+            print(f"✅ {model_name}: recorded {result['known_rows']:,} rows as already trained on")
+        if result['status'] == 'up to date':
+            print(f"✅ {model_name}: no new training rows")
+            continue
+        icon = "⚠️ " if result['status'] == 'rejected' else "✅"
+        print(f"{icon} {model_name}: {result['status']} - {result['new_rows']:,} new rows, held-out AUC "
+              f"{result['auc_before']:.4f} -> {result['auc_after']:.4f}, accuracy "
+              f"{result['accuracy_before']:.4f} -> {result['accuracy_after']:.4f} ({result['seconds']:.1f}s)")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+"""Lightweight HTTP/JSON inference server for the exoplanet models.
+
+Runs next to the Streamlit app with only the standard library plus the model
+dependencies, so the React frontend and load tests can reach the models
+directly. Models are preloaded into a process-wide ModelRegistry. Concurrent
+single-row requests are coalesced per model by a micro-batching scheduler and
+batch requests run on a thread pool sized to the available cores.
+
+Endpoints:
+    GET  /health          liveness and model residency
+    GET  /models          model names, features and load statistics
+    GET  /metrics         stage latencies and counters in the Prometheus text format
+    GET  /metrics.json    the same metrics as JSON
+    POST /predict         {"model": "...", "inputs": {feature: value}}
+    POST /predict/batch   {"model": "...", "rows": [{feature: value}, ...]}
+    POST /predict/ensemble {"inputs": {feature: value}, "models": [...] (optional)}
+
+With ``--engine compiled`` the server scores with the NumPy tree tables
+written by tree_compiler.py and never imports xgboost or lightgbm.
+``--engine quantized`` memory-maps the compact artifacts written by
+quantized_model.py instead, so several server processes share one copy.
+
+Usage:
+    python inference_server.py --host 127.0.0.1 --port 8000 --batch-window-ms 2 --max-batch-size 64
+    python inference_server.py --engine compiled
+    python inference_server.py --engine quantized
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import file_hash
+from ensemble import EnsemblePredictor, project_inputs
+from instrumentation import METRICS
+from micro_batcher import BatchScheduler, DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache
+from quantized_model import is_current, load_current_quantized, quantized_path
+from tree_compiler import CompiledEnsemble, compiled_path
+from scoring import (
+    MODEL_PATHS, get_model_path, get_feature_mapping, build_input_vector, build_feature_matrix,
+    predict_proba_batch, class_names
+)
+
+# Largest request body accepted, in bytes
+MAX_BODY_BYTES = 32 * 2**20
+
+
+class InferenceError(Exception):
+    """An error reported to the client with an HTTP status code"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class InferenceService:
+    """Score requests against registry models on a bounded worker pool.
+
+    With batching enabled, single-row requests are coalesced by a
+    BatchScheduler instead of each calling the model on its own. Repeated
+    single-row requests are answered from a PredictionCache.
+    """
+
+    def __init__(self, registry=None, workers=None, batching=True,
+                 max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.registry = registry or ModelRegistry()
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        self.scheduler = BatchScheduler(self.registry, max_batch_size, max_wait_ms) if batching else None
+        self.cache = PredictionCache()
+        METRICS.add_collector('prediction_cache', self.cache.stats)
+        self.ensemble = EnsemblePredictor(self.registry, workers=self.workers, scheduler=self.scheduler)
+
+    def _model(self, model_name):
+        if not get_feature_mapping(model_name)['features']:
+            raise InferenceError(f"Model {model_name} not found", status=404)
+        model = self.registry.get(model_name)
+        if not hasattr(model, 'predict_proba'):
+            raise InferenceError(f"{model_name} does not provide class probabilities", status=500)
+        return model
+
+    @staticmethod
+    def _input_vector(model_name, inputs):
+        """Build a model's input vector, reporting unusable feature values as a client error"""
+        try:
+            return build_input_vector(model_name, inputs)
+        except (ValueError, TypeError) as e:
+            raise InferenceError(f"Invalid inputs for {model_name}: {e}")
+
+    def _records(self, model_name, model, probabilities):
+        names = class_names(model_name, model.classes_)
+        best = np.argmax(probabilities, axis=1)
+        return [
+            {
+                'prediction': int(model.classes_[b]),
+                'label': names[b],
+                'confidence': float(row[b] * 100),
+                'probabilities': dict(zip(names, row.tolist()))
+            }
+            for b, row in zip(best, probabilities)
+        ]
+
+    def _predict_batch(self, model_name, rows):
+        model = self._model(model_name)
+        with METRICS.timer('stage_seconds', stage='feature_matrix', model=model_name):
+            matrix = build_feature_matrix(model_name, pd.DataFrame.from_records(rows))
+        with METRICS.timer('stage_seconds', stage='predict_proba_batch', model=model_name):
+            probabilities = predict_proba_batch(model, matrix)
+        return self._records(model_name, model, probabilities)
+
+    def predict(self, model_name, inputs):
+        """Score one dict of feature values"""
+        model = self._model(model_name)
+        with METRICS.timer('stage_seconds', stage='feature_vector', model=model_name):
+            vector = self._input_vector(model_name, inputs)[0]
+
+        def compute():
+            with METRICS.timer('stage_seconds', stage='predict_proba', model=model_name):
+                if self.scheduler is None:
+                    return self.pool.submit(model.predict_proba, vector.reshape(1, -1)).result()[0]
+                return self.scheduler.predict(model_name, vector)
+
+        model_hash = file_hash(self.registry.get_entry(model_name).path)
+        probabilities = self.cache.get_or_compute(model_hash, vector, compute)
+        return self._records(model_name, model, probabilities.reshape(1, -1))[0]
+
+    def predict_batch(self, model_name, rows):
+        """Score a list of feature dicts in one vectorized call"""
+        return self.pool.submit(self._predict_batch, model_name, rows).result()
+
+    def predict_ensemble(self, inputs, model_names=None):
+        """Score one dict of feature values with several models and combine them"""
+        unknown = [name for name in model_names or [] if name not in self.registry.model_names]
+        if unknown:
+            raise InferenceError(f"Unknown models: {unknown}", status=404)
+        for model_name in model_names or self.registry.model_names:
+            self._input_vector(model_name, project_inputs(model_name, inputs))
+        return self.ensemble.predict(inputs, model_names)
+
+    def shutdown(self):
+        self.ensemble.shutdown()
+        if self.scheduler is not None:
+            self.scheduler.close()
+        self.pool.shutdown(wait=True)
+
+
+class InferenceRequestHandler(BaseHTTPRequestHandler):
+    """Route JSON requests to the server's InferenceService"""
+
+    server_version = "ExoplanetInference/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_text(self, status, text, content_type):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _content_length(self):
+        try:
+            return int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            self.close_connection = True
+            raise InferenceError("Invalid Content-Length header")
+
+    def _discard_body(self):
+        """Consume an unread request body so it isn't parsed as the next keep-alive request"""
+        if self._body_read:
+            return
+        self._body_read = True
+        try:
+            length = self._content_length()
+        except InferenceError:
+            return
+        if length > MAX_BODY_BYTES:
+            # Too large to be worth reading; end the connection instead
+            self.close_connection = True
+        elif length > 0:
+            self.rfile.read(length)
+
+    def _read_json(self, require_model=True):
+        length = self._content_length()
+        if length <= 0:
+            raise InferenceError("Request body is empty")
+        if length > MAX_BODY_BYTES:
+            raise InferenceError("Request body too large", status=413)
+        self._body_read = True
+        try:
+            payload = json.loads(self.rfile.read(length))
+        except json.JSONDecodeError as e:
+            raise InferenceError(f"Invalid JSON: {e}")
+        if not isinstance(payload, dict):
+            raise InferenceError("Request body must be an object")
+        if require_model and 'model' not in payload:
+            raise InferenceError("Request body must be an object with a 'model' field")
+        return payload
+
+    def do_OPTIONS(self):
+        self._body_read = False
+        self._discard_body()
+        self.send_response(204)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        service = self.server.service
+        self._body_read = False
+        self._discard_body()
+        if self.path == '/health':
+            self._send_json(200, {
+                'status': 'ok',
+                'workers': service.workers,
+                'models_loaded': {name: service.registry.is_loaded(name) for name in service.registry.model_names},
+                'batching': service.scheduler.stats() if service.scheduler is not None else None,
+                'prediction_cache': service.cache.stats()
+            })
+        elif self.path == '/models':
+            stats = {row['model']: row for row in service.registry.stats()}
+            self._send_json(200, {
+                'models': [
+                    {'name': name, 'features': get_feature_mapping(name)['features'], 'stats': stats.get(name)}
+                    for name in service.registry.model_names
+                ]
+            })
+        elif self.path == '/metrics':
+            self._send_text(200, METRICS.to_prometheus(), 'text/plain; version=0.0.4; charset=utf-8')
+        elif self.path == '/metrics.json':
+            self._send_json(200, METRICS.snapshot())
+        else:
+            self._send_json(404, {'error': f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        service = self.server.service
+        start = time.perf_counter()
+        self._body_read = False
+        try:
+            if self.path == '/predict':
+                payload = self._read_json()
+                inputs = payload.get('inputs', {})
+                if not isinstance(inputs, dict):
+                    raise InferenceError("'inputs' must be an object of feature values")
+                result = service.predict(payload['model'], inputs)
+            elif self.path == '/predict/batch':
+                payload = self._read_json()
+                rows = payload.get('rows', [])
+                if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+                    raise InferenceError("'rows' must be a list of feature objects")
+                result = {'count': len(rows), 'predictions': service.predict_batch(payload['model'], rows) if rows else []}
+            elif self.path == '/predict/ensemble':
+                payload = self._read_json(require_model=False)
+                inputs = payload.get('inputs', {})
+                model_names = payload.get('models')
+                if not isinstance(inputs, dict):
+                    raise InferenceError("'inputs' must be an object of feature values")
+                if model_names is not None and not isinstance(model_names, list):
+                    raise InferenceError("'models' must be a list of model names")
+                result = service.predict_ensemble(inputs, model_names)
+            else:
+                raise InferenceError(f"Unknown path {self.path}", status=404)
+        except InferenceError as e:
+            METRICS.observe('request_seconds', time.perf_counter() - start, path=self.path, status=e.status)
+            self._discard_body()
+            self._send_json(e.status, {'error': str(e)})
+            return
+        except Exception as e:
+            METRICS.observe('request_seconds', time.perf_counter() - start, path=self.path, status=500)
+            self._discard_body()
+            self._send_json(500, {'error': f"Prediction error: {str(e)}"})
+            return
+
+        if 'model' in payload:
+            result['model'] = payload['model']
+        latency = time.perf_counter() - start
+        METRICS.observe('request_seconds', latency, path=self.path, status=200)
+        result['latency_ms'] = latency * 1000
+        self._send_json(200, result)
+
+
+class InferenceHTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP server that owns an InferenceService"""
+
+    daemon_threads = True
+
+    def __init__(self, address, service, verbose=False):
+        super().__init__(address, InferenceRequestHandler)
+        self.service = service
+        self.verbose = verbose
+
+
+def compiled_registry():
+    """Return a ModelRegistry serving the compiled tree tables of every model"""
+    paths = {name: compiled_path(get_model_path(name)) for name in MODEL_PATHS}
+    missing = [str(path) for path in paths.values() if not path.exists()]
+    if missing:
+        raise FileNotFoundError(f"Compiled models not found: {missing}. Run python tree_compiler.py first")
+    return ModelRegistry(paths, loader=CompiledEnsemble.load)
+
+
+def quantized_registry():
+    """Return a ModelRegistry serving the memory-mapped quantized artifacts of every model.
+
+    The registry tracks the model files themselves, so a retrained or
+    promoted model is reloaded and refused if its artifact wasn't rebuilt.
+    """
+    paths = {name: quantized_path(get_model_path(name)) for name in MODEL_PATHS}
+    missing = [str(path) for path in paths.values() if not path.exists()]
+    if missing:
+        raise FileNotFoundError(f"Quantized models not found: {missing}. Run python quantized_model.py first")
+    stale = [path.name for name, path in paths.items() if not is_current(get_model_path(name))]
+    if stale:
+        raise ValueError(f"Quantized models built from older model files: {stale}. Run python quantized_model.py")
+    return ModelRegistry(loader=load_current_quantized)
+
+
+def create_server(host="127.0.0.1", port=8000, workers=None, registry=None, preload=True, verbose=False,
+                  batching=True, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                  engine="native"):
+    """Build an InferenceHTTPServer, optionally preloading every model first"""
+    if registry is None and engine == "compiled":
+        registry = compiled_registry()
+    elif registry is None and engine == "quantized":
+        registry = quantized_registry()
+    service = InferenceService(registry=registry, workers=workers, batching=batching,
+                               max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    if preload:
+        service.registry.preload()
+    return InferenceHTTPServer((host, port), service, verbose=verbose)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exoplanet model inference server")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=None, help="Scoring threads (default: CPU count)")
+    parser.add_argument('--batch-window-ms', type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help="Longest time a single-row request waits for others to batch with")
+    parser.add_argument('--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help="Rows scored together before the window closes")
+    parser.add_argument('--no-batching', action='store_true', help="Score every single-row request on its own")
+    parser.add_argument('--engine', choices=["native", "compiled", "quantized"], default="native",
+                        help="Score with the original libraries, the compiled NumPy tree tables "
+                             "or the memory-mapped quantized artifacts")
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, workers=args.workers, verbose=args.verbose,
+                           batching=not args.no_batching, max_batch_size=args.max_batch_size,
+                           max_wait_ms=args.batch_window_ms, engine=args.engine)
+    print(f"🪐 Inference server listening on http://{args.host}:{server.server_address[1]} "
+          f"with {server.service.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
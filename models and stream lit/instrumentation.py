@@ -0,0 +1,225 @@
+"""Lightweight timing and counter instrumentation for the app's hot paths.
+
+Every timed stage (model load, dataset load, feature vector assembly,
+predict_proba, chart rendering, ...) is recorded in a process-wide Metrics
+object under a name and optional labels:
+
+- a cumulative histogram with fixed latency buckets, exported in the
+  Prometheus text format or as JSON
+- a bounded window of the most recent samples, for rolling latency
+  histograms and percentiles in the app's performance tab
+
+Counters record discrete events such as precomputed-score hits, and
+collectors expose the statistics other components already keep (the
+prediction cache's hits and misses, for instance) as gauges at export time.
+Recording a sample costs about a microsecond.
+
+Usage:
+    from instrumentation import METRICS
+
+    with METRICS.timer('stage_seconds', stage='predict_proba', model=model_name):
+        probabilities = model.predict_proba(X)
+    METRICS.increment('events_total', event='precomputed_hit')
+    METRICS.add_collector('prediction_cache', cache.stats)
+    text = METRICS.to_prometheus()
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Prefix of every exported metric name
+NAMESPACE = "astrovision"
+
+# Upper bounds, in seconds, of the cumulative latency buckets
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Most recent samples kept per series for rolling views
+ROLLING_SAMPLES = 2048
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    escaped = [(key, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for key, value in pairs]
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+class _Histogram:
+    """Cumulative bucket counts plus a bounded window of recent (timestamp, seconds) samples"""
+
+    def __init__(self):
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=ROLLING_SAMPLES)
+
+    def observe(self, seconds, timestamp):
+        self.bucket_counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.recent.append((timestamp, seconds))
+
+
+class Metrics:
+    """Thread-safe registry of latency histograms, counters and gauge collectors"""
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = {}
+
+    def observe(self, name, seconds, **labels):
+        """Record one duration in seconds"""
+        key = (name, _label_key(labels))
+        timestamp = self._clock()
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram()
+            histogram.observe(seconds, timestamp)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time the body of a ``with`` block, including when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def increment(self, name, value=1, **labels):
+        """Add ``value`` to a counter"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def add_collector(self, name, collect):
+        """Export the numeric values of ``collect()``, a dict, as gauges named ``<name>_<key>``"""
+        with self._lock:
+            self._collectors[name] = collect
+
+    def reset(self):
+        """Drop every recorded sample and counter; collectors are kept"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def _gauges(self):
+        with self._lock:
+            collectors = list(self._collectors.items())
+        gauges = []
+        for name, collect in collectors:
+            try:
+                values = collect()
+            except Exception:
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    gauges.append((f"{name}_{key}", value))
+        return gauges
+
+    def recent(self, name, window_seconds=None, **labels):
+        """Return each series' recent durations in seconds, keyed by its labels dict as a tuple.
+
+        Labels given here filter the series; ``window_seconds`` keeps only
+        samples recorded within that many seconds.
+        """
+        wanted = set(_label_key(labels))
+        cutoff = None if window_seconds is None else self._clock() - window_seconds
+        with self._lock:
+            series = {
+                pairs: list(histogram.recent) for (metric, pairs), histogram in self._histograms.items()
+                if metric == name and wanted <= set(pairs)
+            }
+        return {
+            pairs: np.array([seconds for timestamp, seconds in samples if cutoff is None or timestamp >= cutoff])
+            for pairs, samples in series.items()
+        }
+
+    def counters(self, name):
+        """Return a counter's values keyed by their labels as a tuple of pairs"""
+        with self._lock:
+            return {pairs: value for (metric, pairs), value in self._counters.items() if metric == name}
+
+    def snapshot(self):
+        """Return every histogram, counter and gauge as a JSON-serializable dict"""
+        with self._lock:
+            histograms = [
+                {
+                    'name': name,
+                    'labels': dict(pairs),
+                    'count': histogram.count,
+                    'sum_seconds': histogram.total,
+                    'buckets': dict(zip([str(bound) for bound in LATENCY_BUCKETS] + ['+Inf'],
+                                        np.cumsum(histogram.bucket_counts).tolist())),
+                    'recent': summarize([seconds for _, seconds in histogram.recent])
+                }
+                for (name, pairs), histogram in sorted(self._histograms.items())
+            ]
+            counters = [
+                {'name': name, 'labels': dict(pairs), 'value': value}
+                for (name, pairs), value in sorted(self._counters.items())
+            ]
+        return {
+            'timestamp': self._clock(),
+            'histograms': histograms,
+            'counters': counters,
+            'gauges': dict(self._gauges())
+        }
+
+    def to_prometheus(self):
+        """Return every metric in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            for name in sorted({name for (name, _), _ in histograms}):
+                lines.append(f"# TYPE {NAMESPACE}_{name} histogram")
+                for (metric, pairs), histogram in histograms:
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(list(LATENCY_BUCKETS) + ['+Inf'], histogram.bucket_counts):
+                        cumulative += count
+                        lines.append(f"{NAMESPACE}_{name}_bucket{_format_labels(pairs + (('le', str(bound)),))} {cumulative}")
+                    lines.append(f"{NAMESPACE}_{name}_sum{_format_labels(pairs)} {histogram.total!r}")
+                    lines.append(f"{NAMESPACE}_{name}_count{_format_labels(pairs)} {histogram.count}")
+            for name in sorted({name for (name, _), _ in counters}):
+                lines.append(f"# TYPE {NAMESPACE}_{name} counter")
+                lines.extend(
+                    f"{NAMESPACE}_{name}{_format_labels(pairs)} {value}"
+                    for (metric, pairs), value in counters if metric == name
+                )
+        for name, value in self._gauges():
+            lines.append(f"# TYPE {NAMESPACE}_{name} gauge")
+            lines.append(f"{NAMESPACE}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def summarize(samples):
+    """Return the count, mean and p50/p95/p99 in milliseconds of durations in seconds"""
+    samples = np.asarray(samples, dtype=np.float64)
+    if not len(samples):
+        return {'count': 0, 'mean_ms': None, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+    return {
+        'count': int(len(samples)),
+        'mean_ms': float(samples.mean() * 1000),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99)
+    }
+
+
+# Process-wide metrics shared by the app, the inference server and their helpers
+METRICS = Metrics()
@@ -0,0 +1,169 @@
+"""Dynamic micro-batching of concurrent single-row prediction requests.
+
+Tree ensembles spend most of a 1-row predict_proba call in per-call overhead.
+A MicroBatcher collects pending rows for one model until either
+``max_batch_size`` rows are queued or ``max_wait_ms`` has passed since the
+first one arrived, scores them as one matrix and hands each caller its own
+row of probabilities. The wait window bounds the extra latency per request.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from scoring import get_feature_mapping
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 2.0
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Coalesce single-row requests for one scoring function into batches"""
+
+    def __init__(self, score_fn, n_features, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS, name="batcher"):
+        """``score_fn`` maps an (n, n_features) float64 matrix to an (n, k) probability matrix"""
+        self.score_fn = score_fn
+        self.n_features = n_features
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.SimpleQueue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._rows = 0
+        self._largest_batch = 0
+        self._closed = False
+        # Held across the closed check and the put so no row is queued behind _STOP
+        self._close_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        """Queue one feature row and return a Future resolving to its probabilities"""
+        row = np.asarray(row, dtype=np.float64).reshape(-1)
+        if row.shape[0] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {row.shape[0]}")
+        future = Future()
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._queue.put((row, future))
+        return future
+
+    def predict(self, row, timeout=None):
+        """Score one feature row, waiting for the batch it lands in"""
+        return self.submit(row).result(timeout)
+
+    def _collect(self):
+        item = self._queue.get()
+        if item is _STOP:
+            return None
+        batch = [item]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            # Drop requests whose callers cancelled while they were queued
+            pending = [(row, future) for row, future in batch if future.set_running_or_notify_cancel()]
+            if not pending:
+                continue
+            rows, futures = zip(*pending)
+            try:
+                probabilities = self.score_fn(np.vstack(rows))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, row_probabilities in zip(futures, probabilities):
+                future.set_result(row_probabilities)
+            with self._stats_lock:
+                self._batches += 1
+                self._rows += len(futures)
+                self._largest_batch = max(self._largest_batch, len(futures))
+
+    def stats(self):
+        """Return the number of batches and rows scored so far"""
+        with self._stats_lock:
+            return {
+                'batches': self._batches,
+                'rows': self._rows,
+                'mean_batch_size': self._rows / self._batches if self._batches else 0.0,
+                'largest_batch': self._largest_batch
+            }
+
+    def close(self):
+        """Stop the worker thread once queued requests have been scored"""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+
+
+class BatchScheduler:
+    """One MicroBatcher per model, scoring against live models from a ModelRegistry"""
+
+    def __init__(self, registry, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.registry = registry
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._batchers = {}
+        self._lock = threading.Lock()
+
+    def _batcher(self, model_name):
+        batcher = self._batchers.get(model_name)
+        if batcher is not None:
+            return batcher
+        with self._lock:
+            batcher = self._batchers.get(model_name)
+            if batcher is None:
+                n_features = len(get_feature_mapping(model_name)['features'])
+                if not n_features:
+                    raise KeyError(f"Model {model_name} not found")
+                # Look the model up per batch so registry reloads are picked up
+                batcher = MicroBatcher(
+                    lambda matrix, name=model_name: self.registry.get(name).predict_proba(matrix),
+                    n_features,
+                    max_batch_size=self.max_batch_size,
+                    max_wait_ms=self.max_wait_ms,
+                    name=f"batcher-{model_name}"
+                )
+                self._batchers[model_name] = batcher
+            return batcher
+
+    def submit(self, model_name, row):
+        """Queue one row for ``model_name`` and return a Future of its probabilities"""
+        return self._batcher(model_name).submit(row)
+
+    def predict(self, model_name, row, timeout=None):
+        """Score one row for ``model_name`` as part of a coalesced batch"""
+        return self._batcher(model_name).predict(row, timeout)
+
+    def stats(self):
+        """Return batching statistics per model"""
+        return {name: batcher.stats() for name, batcher in self._batchers.items()}
+
+    def close(self):
+        for batcher in self._batchers.values():
+            batcher.close()
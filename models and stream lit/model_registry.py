@@ -0,0 +1,149 @@
+"""Process-wide registry that keeps the bundled models resident as live objects.
+
+Models are loaded once per process (with joblib by default) and handed out by reference,
+so repeated lookups never deserialize the pickle again. A model is reloaded
+transparently when its file's modification time changes. joblib, and the
+ML library each pickle needs, is imported on the first load rather than
+when this module is imported.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from scoring import MODEL_PATHS, get_model_path
+
+
+def _current_rss_bytes():
+    """Return the resident set size of this process, or None if unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _joblib_load(path):
+    """Default loader; defers importing joblib until a model is first needed"""
+    import joblib
+    return joblib.load(path)
+
+
+@dataclass
+class ModelEntry:
+    """A loaded model together with its load statistics"""
+    name: str
+    path: Path
+    model: object
+    mtime: float
+    file_size: int
+    load_seconds: float
+    rss_delta_bytes: int = None
+    loaded_at: float = 0.0
+    reloads: int = 0
+
+
+class ModelRegistry:
+    """Load each model once per process and share it between all callers"""
+
+    def __init__(self, model_paths=None, loader=_joblib_load):
+        """``model_paths`` maps model names to files; defaults to the bundled models.
+
+        ``loader`` turns a file path into a model, e.g. CompiledEnsemble.load
+        for compiled ``.trees.npz`` artifacts.
+        """
+        if model_paths is None:
+            model_paths = {name: get_model_path(name) for name in MODEL_PATHS}
+        self._paths = {name: Path(path) for name, path in model_paths.items()}
+        self._loader = loader
+        self._entries = {}
+        self._locks = {name: threading.Lock() for name in self._paths}
+        self._preload_thread = None
+
+    @property
+    def model_names(self):
+        return list(self._paths)
+
+    def get(self, model_name):
+        """Return the live model for ``model_name``, loading or refreshing it if needed"""
+        return self.get_entry(model_name).model
+
+    def get_entry(self, model_name):
+        """Return the ModelEntry for ``model_name``, loading or refreshing it if needed"""
+        if model_name not in self._paths:
+            raise KeyError(f"Model {model_name} not found")
+
+        path = self._paths[model_name]
+        mtime = path.stat().st_mtime
+        entry = self._entries.get(model_name)
+        if entry is not None and entry.mtime == mtime:
+            return entry
+
+        # Only one thread loads a given model; the others wait and reuse it
+        with self._locks[model_name]:
+            entry = self._entries.get(model_name)
+            if entry is not None and entry.mtime == path.stat().st_mtime:
+                return entry
+            new_entry = self._load(model_name, path)
+            if entry is not None:
+                new_entry.reloads = entry.reloads + 1
+            self._entries[model_name] = new_entry
+            return new_entry
+
+    def _load(self, model_name, path):
+        stat = path.stat()
+        rss_before = _current_rss_bytes()
+        start = time.perf_counter()
+        model = self._loader(path)
+        load_seconds = time.perf_counter() - start
+        rss_after = _current_rss_bytes()
+        rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+        return ModelEntry(
+            name=model_name,
+            path=path,
+            model=model,
+            mtime=stat.st_mtime,
+            file_size=stat.st_size,
+            load_seconds=load_seconds,
+            rss_delta_bytes=rss_delta,
+            loaded_at=time.time()
+        )
+
+    def is_loaded(self, model_name):
+        return model_name in self._entries
+
+    def preload(self, model_names=None):
+        """Load the given models (all by default), skipping any that fail"""
+        errors = {}
+        for name in model_names or self.model_names:
+            try:
+                self.get_entry(name)
+            except Exception as e:
+                errors[name] = str(e)
+        return errors
+
+    def preload_async(self, model_names=None):
+        """Start loading models in a background daemon thread and return it"""
+        if self._preload_thread is None or not self._preload_thread.is_alive():
+            self._preload_thread = threading.Thread(
+                target=self.preload, args=(model_names,), name="model-preload", daemon=True
+            )
+            self._preload_thread.start()
+        return self._preload_thread
+
+    def stats(self):
+        """Return per-model load statistics as a list of dicts"""
+        rows = []
+        for name in self.model_names:
+            entry = self._entries.get(name)
+            rows.append({
+                'model': name,
+                'loaded': entry is not None,
+                'load_ms': round(entry.load_seconds * 1000, 1) if entry else None,
+                'rss_delta_mb': round(entry.rss_delta_bytes / 2**20, 1) if entry and entry.rss_delta_bytes is not None else None,
+                'file_size_mb': round(entry.file_size / 2**20, 2) if entry else None,
+                'reloads': entry.reloads if entry else 0,
+                'loaded_at': time.strftime('%H:%M:%S', time.localtime(entry.loaded_at)) if entry else None
+            })
+        return rows
@@ -0,0 +1,156 @@
+"""Offline scores for every row of the bundled datasets.
+
+The bundled datasets never change between deploys, so each model scores its
+whole dataset once and the labels and probabilities are stored in a compact
+sidecar next to the model (``best_model_kepler.scores.npz`` beside
+``best_model_kepler.pkl``). Each row is indexed by a 64-bit digest of its
+canonical feature vector, so the app answers a prediction for any bundled
+sample with a dictionary lookup instead of a model call.
+
+A sidecar records the model and dataset hashes and the preprocessing it was
+built with, and is ignored once any of them changes.
+
+Usage:
+    python precompute_scores.py        # build sidecars for every bundled model
+"""
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+from dataset_store import file_hash, load_model_dataset
+from prediction_cache import canonical_values
+from preprocessing import get_preprocessor
+from scoring import MODEL_PATHS, get_dataset_path, get_model_path, build_feature_matrix, predict_proba_batch
+
+SCORES_SUFFIX = ".scores.npz"
+FORMAT_VERSION = 2
+
+
+def scores_path(model_path):
+    """Return the sidecar path for a model file"""
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.stem + SCORES_SUFFIX)
+
+
+def row_digests(matrix):
+    """Return a uint64 digest of each row's canonical float64 bytes"""
+    rows = canonical_values(matrix)
+    digests = np.empty(len(rows), dtype=np.uint64)
+    for i, row in enumerate(rows):
+        digests[i] = int.from_bytes(hashlib.blake2b(row.tobytes(), digest_size=8).digest(), 'little')
+    return digests
+
+
+class PrecomputedScores:
+    """Stored probabilities for every row of a model's dataset, looked up by feature vector"""
+
+    def __init__(self, probabilities, predictions, classes, digests, model_hash, dataset_hash, preprocessing):
+        self.probabilities = probabilities
+        self.predictions = predictions
+        self.classes = classes
+        self.digests = digests
+        self.model_hash = model_hash
+        self.dataset_hash = dataset_hash
+        self.preprocessing = preprocessing
+        self._rows = {int(digest): i for i, digest in enumerate(digests)}
+
+    def __len__(self):
+        return len(self.probabilities)
+
+    def find(self, vector):
+        """Return the dataset row position holding this feature vector, or None"""
+        return self._rows.get(int(row_digests(np.asarray(vector).reshape(1, -1))[0]))
+
+    def lookup(self, vector):
+        """Return the stored probabilities for this feature vector, or None if it isn't a bundled row"""
+        row = self.find(vector)
+        return None if row is None else self.probabilities[row].astype(np.float64)
+
+    def is_current(self, model_path, dataset_path, preprocessing):
+        """Return whether the sidecar was built from these exact model and dataset files and preprocessing"""
+        return (
+            self.model_hash == file_hash(model_path) and self.dataset_hash == file_hash(dataset_path)
+            and self.preprocessing == preprocessing
+        )
+
+    def save(self, path):
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                probabilities=self.probabilities,
+                predictions=self.predictions,
+                classes=self.classes,
+                digests=self.digests,
+                model_hash=np.array(self.model_hash),
+                dataset_hash=np.array(self.dataset_hash),
+                preprocessing=np.array(self.preprocessing),
+                format_version=np.array(FORMAT_VERSION)
+            )
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data['format_version']) != FORMAT_VERSION:
+                raise ValueError(f"{path} has format version {int(data['format_version'])}, expected {FORMAT_VERSION}")
+            return cls(
+                probabilities=data['probabilities'],
+                predictions=data['predictions'],
+                classes=data['classes'],
+                digests=data['digests'],
+                model_hash=str(data['model_hash']),
+                dataset_hash=str(data['dataset_hash']),
+                preprocessing=str(data['preprocessing'])
+            )
+
+
+def precompute(model, model_name):
+    """Score every row of a model's bundled dataset"""
+    matrix = build_feature_matrix(model_name, load_model_dataset(model_name))
+    probabilities = predict_proba_batch(model, matrix)
+    return PrecomputedScores(
+        probabilities=probabilities.astype(np.float32),
+        predictions=np.argmax(probabilities, axis=1).astype(np.int8),
+        classes=np.asarray(model.classes_),
+        digests=row_digests(matrix),
+        model_hash=file_hash(get_model_path(model_name)),
+        dataset_hash=file_hash(get_dataset_path(model_name)),
+        preprocessing=get_preprocessor(model_name).fingerprint()
+    )
+
+
+def load_current_scores(model_name):
+    """Return the model's sidecar if it matches the current model and dataset files, else None"""
+    model_path, dataset_path = get_model_path(model_name), get_dataset_path(model_name)
+    path = scores_path(model_path)
+    if not path.exists() or not dataset_path.exists():
+        return None
+    try:
+        scores = PrecomputedScores.load(path)
+    except (KeyError, ValueError):
+        return None  # written by an older format; rerun precompute_scores.py
+    return scores if scores.is_current(model_path, dataset_path, get_preprocessor(model_name).fingerprint()) else None
+
+
+def main():
+    import joblib
+
+    for model_name in MODEL_PATHS:
+        model_path, dataset_path = get_model_path(model_name), get_dataset_path(model_name)
+        if not dataset_path.exists():
+            print(f"⚠️  {model_name}: dataset not found, skipping")
+            continue
+        if load_current_scores(model_name) is not None:
+            print(f"✅ {model_name}: scores are up to date")
+            continue
+        scores = precompute(joblib.load(model_path), model_name)
+        path = scores_path(model_path)
+        scores.save(path)
+        print(f"✅ {model_name}: {len(scores):,} rows -> {path.name} ({path.stat().st_size / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Bounded LRU/TTL cache of single-row prediction probabilities.
+
+Entries are keyed by the model file hash plus the canonical bytes of the
+float64 feature vector, so a retrained model never serves stale results and
+replaying the same sample or form values is a dictionary lookup instead of a
+model call.
+
+Usage:
+    cache = PredictionCache(max_entries=4096, ttl_seconds=3600)
+    probabilities = cache.get_or_compute(model_hash, vector, lambda: model.predict_proba(vector[None])[0])
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_TTL_SECONDS = 3600.0
+
+
+def canonical_values(values):
+    """Return ``values`` as contiguous float64 with -0.0 and every NaN payload normalized"""
+    values = np.ascontiguousarray(values, dtype=np.float64) + 0.0
+    values[np.isnan(values)] = np.nan
+    return values
+
+
+def canonical_key(model_hash, vector):
+    """Return a hashable key for a model version and feature vector.
+
+    -0.0 and 0.0, and every NaN payload, map to the same bytes.
+    """
+    return model_hash, canonical_values(vector).ravel().tobytes()
+
+
+class PredictionCache:
+    """Thread-safe least-recently-used cache whose entries also expire after a TTL"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, model_hash, vector):
+        """Return the cached probabilities for this model and vector, or None"""
+        key = canonical_key(model_hash, vector)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._clock() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                self._expirations += 1
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, model_hash, vector, probabilities):
+        """Store probabilities for this model and vector, evicting the least recently used"""
+        key = canonical_key(model_hash, vector)
+        value = np.array(probabilities, dtype=np.float64)
+        value.setflags(write=False)
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return value
+
+    def get_or_compute(self, model_hash, vector, compute):
+        """Return cached probabilities, calling ``compute()`` and caching its result on a miss"""
+        cached = self.get(model_hash, vector)
+        if cached is not None:
+            return cached
+        return self.put(model_hash, vector, compute())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters, the hit rate and the current size"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else None,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'ttl_seconds': self.ttl_seconds
+            }
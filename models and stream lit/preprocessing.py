@@ -0,0 +1,252 @@
+"""Fitted preprocessing shared by training, the app and batch scoring.
+
+The training notebooks prepared each dataset before fitting: TESS
+dispositions were expanded and numeric nulls filled with the column mean if
+|skew| < 1 or the median otherwise, the 104-input set had its nulls filled
+with medians, and string columns were label-encoded. A Preprocessor records
+the fitted result of those steps for one model (fill value per feature and
+the category codes) and applies it to a whole matrix in one vectorized pass,
+so a DataFrame, a form's inputs and a training set all go through the same
+transform.
+
+Each preprocessor is saved as JSON next to its model
+(``best_model_tess.preprocess.json`` beside ``best_model_tess.pkl``) with the
+hash of the model file it belongs to, and is ignored once the model changes.
+A model without a current sidecar is fitted in memory on its bundled
+dataset, or falls back to the hard-coded feature defaults if that is missing.
+
+Usage:
+    python preprocessing.py            # fit and save a preprocessor next to every bundled model
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from scoring import (
+    MODEL_PATHS, CATEGORICAL_ENCODINGS, get_feature_mapping, get_dataset_path, get_model_path
+)
+
+PREPROCESSOR_SUFFIX = ".preprocess.json"
+FORMAT_VERSION = 1
+
+# How each training notebook filled missing numeric cells
+IMPUTATION_STRATEGIES = {
+    "Kepler Model": "skew",
+    "104-Input Kepler": "median",
+    "TESS Model": "skew",
+    "K2 Model": "skew"
+}
+
+_lock = threading.Lock()
+_loaded = {}
+_watched = {}
+
+
+def fill_value(column, strategy):
+    """Return a column's fill value: its median, or with 'skew' its mean if |skew| < 1"""
+    column = pd.to_numeric(column, errors='coerce')
+    if column.notna().sum() == 0:
+        return 0.0
+    if strategy == 'skew' and abs(column.skew()) < 1:
+        return float(column.mean())
+    return float(column.median())
+
+
+def preprocessor_path(model_path):
+    """Return the preprocessor sidecar path for a model file"""
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.stem + PREPROCESSOR_SUFFIX)
+
+
+class Preprocessor:
+    """Fill values and category codes for one model's features"""
+
+    def __init__(self, model_name, features, fill_values, categories, strategy=None, model_hash=None):
+        self.model_name = model_name
+        self.features = list(features)
+        self.fill_values = np.asarray(fill_values, dtype=np.float64)
+        self.categories = {feature: dict(codes) for feature, codes in categories.items()}
+        self.strategy = strategy
+        self.model_hash = model_hash
+        self._index = {feature: j for j, feature in enumerate(self.features)}
+
+    @classmethod
+    def fit(cls, model_name, data):
+        """Fit fill values and category codes on a model's raw training data"""
+        features = get_feature_mapping(model_name)['features']
+        if not features:
+            raise ValueError(f"No feature mapping found for {model_name}")
+        strategy = IMPUTATION_STRATEGIES.get(model_name, 'median')
+
+        # LabelEncoder order: sorted distinct values
+        categories = {}
+        for feature in features:
+            if feature in data.columns and not pd.api.types.is_numeric_dtype(data[feature]):
+                values = sorted(data[feature].dropna().astype(str).unique())
+                categories[feature] = {value: i for i, value in enumerate(values)}
+
+        preprocessor = cls(model_name, features, np.zeros(len(features)), categories, strategy)
+        raw = preprocessor.raw_matrix(data)
+        preprocessor.fill_values = np.array([
+            fill_value(pd.Series(raw[:, j]), strategy) for j in range(len(features))
+        ])
+        return preprocessor
+
+    @classmethod
+    def defaults(cls, model_name):
+        """Return the unfitted fallback: hard-coded defaults, label codes and no imputation statistics"""
+        feature_mapping = get_feature_mapping(model_name)
+        if not feature_mapping['features']:
+            raise ValueError(f"No feature mapping found for {model_name}")
+        return cls(model_name, feature_mapping['features'], feature_mapping['defaults'], CATEGORICAL_ENCODINGS)
+
+    def raw_matrix(self, data):
+        """Encode ``data`` onto the features without filling anything; absent columns are all NaN"""
+        matrix = np.full((len(data), len(self.features)), np.nan)
+        numeric, numeric_positions = [], []
+        for j, feature in enumerate(self.features):
+            if feature not in data.columns:
+                continue
+            column = data[feature]
+            if pd.api.types.is_numeric_dtype(column):
+                numeric.append(feature)
+                numeric_positions.append(j)
+            elif feature in self.categories:
+                matrix[:, j] = column.astype(object).map(self.categories[feature]).to_numpy(dtype=np.float64, na_value=np.nan)
+            else:
+                matrix[:, j] = pd.to_numeric(column, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        if numeric:
+            matrix[:, numeric_positions] = data[numeric].to_numpy(dtype=np.float64, na_value=np.nan)
+        return matrix
+
+    def fill(self, matrix):
+        """Replace every NaN in a raw matrix with its feature's fill value, in place"""
+        missing = np.isnan(matrix)
+        if missing.any():
+            matrix[missing] = np.broadcast_to(self.fill_values, matrix.shape)[missing]
+        return matrix
+
+    def transform(self, data):
+        """Return the model-ready float64 matrix for a DataFrame"""
+        return self.fill(self.raw_matrix(data))
+
+    def transform_inputs(self, inputs):
+        """Return the model-ready 1xN matrix for a dict of feature values; missing features are filled"""
+        values = [inputs.get(feature) for feature in self.features]
+        for feature, codes in self.categories.items():
+            j = self._index[feature]
+            if isinstance(values[j], str):
+                values[j] = codes.get(values[j])
+        row = np.array(values, dtype=np.float64)  # None becomes NaN
+        return np.where(np.isnan(row), self.fill_values, row).reshape(1, -1)
+
+    def to_dict(self):
+        return {
+            'format_version': FORMAT_VERSION,
+            'model': self.model_name,
+            'model_hash': self.model_hash,
+            'strategy': self.strategy,
+            'features': self.features,
+            'fill_values': self.fill_values.tolist(),
+            'categories': self.categories
+        }
+
+    def fingerprint(self):
+        """Return a short hash of the fitted values, for cache keys"""
+        fitted = {k: v for k, v in self.to_dict().items() if k != 'model_hash'}
+        return hashlib.sha256(json.dumps(fitted, sort_keys=True).encode()).hexdigest()[:16]
+
+    def save(self, path):
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            fitted = json.load(f)
+        if fitted['format_version'] != FORMAT_VERSION:
+            raise ValueError(f"{path} has format version {fitted['format_version']}, expected {FORMAT_VERSION}")
+        return cls(
+            fitted['model'], fitted['features'], fitted['fill_values'], fitted['categories'],
+            fitted['strategy'], fitted['model_hash']
+        )
+
+
+def load_preprocessor(model_path):
+    """Return the preprocessor saved next to a model file if it belongs to that exact file, else None"""
+    from dataset_store import file_hash
+
+    path = preprocessor_path(model_path)
+    if not path.exists():
+        return None
+    preprocessor = Preprocessor.load(path)
+    return preprocessor if preprocessor.model_hash == file_hash(model_path) else None
+
+
+def _resolve(model_name):
+    model_path = get_model_path(model_name)
+    if model_path is not None and model_path.exists():
+        preprocessor = load_preprocessor(model_path)
+        if preprocessor is not None:
+            return preprocessor
+    dataset_path = get_dataset_path(model_name)
+    if dataset_path is not None and dataset_path.exists():
+        from dataset_store import load_model_dataset
+        return Preprocessor.fit(model_name, load_model_dataset(model_name))
+    return Preprocessor.defaults(model_name)
+
+
+def _stamp(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def get_preprocessor(model_name):
+    """Return the preprocessor for a bundled model, reloaded whenever its model or sidecar file changes"""
+    paths = _watched.get(model_name)
+    if paths is None:
+        model_path = get_model_path(model_name)
+        paths = (str(model_path), str(preprocessor_path(model_path))) if model_path is not None else ()
+        _watched[model_name] = paths
+    key = (model_name, *[_stamp(path) for path in paths])
+    with _lock:
+        preprocessor = _loaded.get(key)
+    if preprocessor is None:
+        preprocessor = _resolve(model_name)
+        with _lock:
+            _loaded[key] = preprocessor
+    return preprocessor
+
+
+def raw_feature_matrix(model_name, data):
+    """Encode ``data`` onto a model's features with no filling, using the training label codes"""
+    return Preprocessor.defaults(model_name).raw_matrix(data)
+
+
+def main():
+    from dataset_store import file_hash, load_model_dataset
+
+    for model_name in MODEL_PATHS:
+        model_path = get_model_path(model_name)
+        if not get_dataset_path(model_name).exists():
+            print(f"⚠️  {model_name}: dataset not found, skipping")
+            continue
+        preprocessor = Preprocessor.fit(model_name, load_model_dataset(model_name))
+        preprocessor.model_hash = file_hash(model_path)
+        path = preprocessor_path(model_path)
+        preprocessor.save(path)
+        print(f"✅ {model_name}: {len(preprocessor.features)} features ({preprocessor.strategy} imputation) -> {path.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Compact, memory-mappable artifacts for the compiled tree ensembles.
+
+A pickled model is a full Python object graph that every worker process
+unpickles into its own private memory. This module writes each compiled
+model (see tree_compiler.py) to a single versioned binary file instead:
+
+- thresholds and leaf values as float32, feature indices as int16, child
+  pointers as int32 and flags as single bytes
+- a small JSON header (format version, classes, base score, and the dtype,
+  shape and offset of every table) followed by the tables, each 64-byte
+  aligned
+
+Loading memory-maps the file and builds CompiledEnsemble tables as views
+into it, so there is nothing to deserialize and every process scoring with
+the same model shares one page-cache copy. The training cover is kept as
+float32 so explanations work from the artifact too, and the header records
+the hash of the model file it was built from, so a stale artifact is
+refused rather than served.
+
+Thresholds are rounded to float32 away from the training values they
+separate. A model whose probabilities then drift from the original
+``predict_proba`` on its bundled dataset by more than QUANTIZED_TOLERANCE
+keeps float64 thresholds instead, and is not written at all if it still
+does not match.
+
+Usage:
+    python quantized_model.py          # quantize, check parity and save every model
+"""
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from dataset_store import file_hash
+from tree_compiler import CompiledEnsemble, compile_model
+
+QUANTIZED_SUFFIX = ".qtrees"
+FORMAT_VERSION = 1
+MAGIC = b"AVQTREES"
+
+# Alignment of every table in the file, in bytes
+ALIGNMENT = 64
+
+# Largest acceptable absolute probability difference against predict_proba
+QUANTIZED_TOLERANCE = 1e-4
+
+# Storage type of each table
+TABLE_DTYPES = {
+    'feature': np.int16,
+    'threshold': np.float32,
+    'left': np.int32,
+    'right': np.int32,
+    'default_left': np.bool_,
+    'missing': np.int8,
+    'value': np.float32,
+    'is_leaf': np.bool_,
+    'roots': np.int32,
+    'tree_class': np.int16,
+    'cover': np.float32
+}
+
+
+def quantized_path(model_path):
+    """Return the quantized artifact path that sits next to a model file"""
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.stem + QUANTIZED_SUFFIX)
+
+
+def float32_thresholds(thresholds, strict):
+    """Round split thresholds to float32 away from the values they were chosen to separate.
+
+    LightGBM and scikit-learn split on ``x <= t`` with ``t`` just above a
+    training value, so rounding up keeps that value on the left; XGBoost
+    splits on ``x < t`` and is rounded down for the same reason.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    rounded = thresholds.astype(np.float32)
+    with np.errstate(invalid='ignore'):
+        moved = rounded < thresholds if not strict else rounded > thresholds
+    target = np.float32(np.inf if not strict else -np.inf)
+    rounded[moved] = np.nextafter(rounded[moved], target)
+    return rounded
+
+
+def quantize(compiled, threshold_dtype=np.float32):
+    """Return a copy of a CompiledEnsemble with its tables in the compact storage types.
+
+    ``threshold_dtype=np.float64`` keeps exact thresholds for models that split
+    between training values closer together than float32 can tell apart.
+    """
+    tables = {}
+    for name, dtype in _stored_tables(compiled).items():
+        table = compiled.tables[name]
+        if name == 'threshold':
+            tables[name] = float32_thresholds(table, compiled.strict) if threshold_dtype == np.float32 \
+                else np.ascontiguousarray(table, dtype=threshold_dtype)
+            continue
+        if np.issubdtype(dtype, np.integer) and len(table) and \
+                (table.min() < np.iinfo(dtype).min or table.max() > np.iinfo(dtype).max):
+            raise ValueError(f"Table {name} does not fit in {np.dtype(dtype).name}")
+        tables[name] = np.ascontiguousarray(table, dtype=dtype)
+    return CompiledEnsemble(
+        tables, compiled.base_score, compiled.classes_, compiled.strict, compiled.float32_inputs,
+        compiled.n_features_in_, compiled.source
+    )
+
+
+def _stored_tables(compiled):
+    """Return the storage type of every table the model has; older artifacts have no cover"""
+    return {name: dtype for name, dtype in TABLE_DTYPES.items() if name in compiled.tables}
+
+
+def build_quantized(model, X, compiled=None):
+    """Quantize a model, keeping float64 thresholds if float32 ones move its predictions on ``X``.
+
+    Returns the quantized CompiledEnsemble, the threshold dtype used and the
+    largest probability difference and changed-label share against
+    ``predict_proba``. Raises ValueError if neither matches within
+    QUANTIZED_TOLERANCE.
+    """
+    compiled = compiled if compiled is not None else compile_model(model)
+    for threshold_dtype in (np.float32, np.float64):
+        quantized = quantize(compiled, threshold_dtype)
+        difference, changed = check_quantized_parity(model, quantized, X)
+        if difference <= QUANTIZED_TOLERANCE:
+            return quantized, threshold_dtype, difference, changed
+    raise ValueError(f"max probability difference {difference:.2e} exceeds {QUANTIZED_TOLERANCE:.0e}")
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def save_quantized(compiled, path, source_hash=None):
+    """Write a CompiledEnsemble, quantized or not, to an artifact file.
+
+    ``source_hash`` is the hash of the model file it was built from, so
+    readers can tell a stale artifact from a current one.
+    """
+    stored = _stored_tables(compiled)
+    if any(compiled.tables[name].dtype != dtype for name, dtype in stored.items() if name != 'threshold'):
+        compiled = quantize(compiled)
+    header = {
+        'format_version': FORMAT_VERSION,
+        'strict': compiled.strict,
+        'float32_inputs': compiled.float32_inputs,
+        'n_features': compiled.n_features_in_,
+        'source': compiled.source,
+        'classes': compiled.classes_.tolist(),
+        'base_score': compiled.base_score.tolist(),
+        'source_hash': source_hash,
+        'tables': {}
+    }
+    # Offsets are relative to the start of the data section, which follows the header
+    offset = 0
+    for name in stored:
+        table = compiled.tables[name]
+        header['tables'][name] = {'dtype': table.dtype.str, 'shape': list(table.shape), 'offset': offset}
+        offset = _aligned(offset + table.nbytes)
+    encoded = json.dumps(header).encode('utf-8')
+    data_start = _aligned(len(MAGIC) + 8 + len(encoded))
+
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(encoded).to_bytes(8, 'little'))
+        f.write(encoded)
+        for name in stored:
+            f.seek(data_start + header['tables'][name]['offset'])
+            f.write(compiled.tables[name].tobytes())
+    tmp_path.replace(path)
+
+
+def read_header(path):
+    """Return a quantized artifact's header and the offset of its data section"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a quantized model file")
+        length = int.from_bytes(f.read(8), 'little')
+        header = json.loads(f.read(length))
+    if header['format_version'] != FORMAT_VERSION:
+        raise ValueError(f"{path} has format version {header['format_version']}, expected {FORMAT_VERSION}")
+    return header, _aligned(len(MAGIC) + 8 + length)
+
+
+def load_quantized(path):
+    """Memory-map a quantized artifact and return a CompiledEnsemble backed by it"""
+    header, data_start = read_header(path)
+    buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    tables = {
+        name: np.ndarray(spec['shape'], dtype=np.dtype(spec['dtype']), buffer=buffer, offset=data_start + spec['offset'])
+        for name, spec in header['tables'].items()
+    }
+    return CompiledEnsemble(
+        tables, header['base_score'], header['classes'], header['strict'], header['float32_inputs'],
+        header['n_features'], header['source']
+    )
+
+
+def is_current(model_path):
+    """Return whether a model's quantized artifact was built from its current file"""
+    artifact = quantized_path(model_path)
+    if not artifact.exists():
+        return False
+    try:
+        header, _ = read_header(artifact)
+    except (OSError, ValueError):
+        return False
+    return header.get('source_hash') == file_hash(model_path) and 'cover' in header['tables']
+
+
+def load_current_quantized(model_path):
+    """Memory-map a model's quantized artifact, refusing one built from an older model file"""
+    path = quantized_path(model_path)
+    if not path.exists():
+        raise FileNotFoundError(f"Quantized model not found: {path}. Run python quantized_model.py first")
+    if not is_current(model_path):
+        raise ValueError(f"{path.name} was built from an older {Path(model_path).name}. "
+                         f"Run python quantized_model.py to rebuild it")
+    return load_quantized(path)
+
+
+def check_quantized_parity(model, quantized, X):
+    """Return the largest absolute probability difference and the share of changed labels"""
+    expected, actual = model.predict_proba(X), quantized.predict_proba(X)
+    changed = np.mean(np.argmax(expected, axis=1) != np.argmax(actual, axis=1))
+    return float(np.max(np.abs(expected - actual))), float(changed)
+
+
+def main():
+    import joblib
+    from dataset_store import load_model_dataset
+    from model_registry import _current_rss_bytes
+    from scoring import MODEL_PATHS, get_model_path, get_dataset_path, build_feature_matrix
+
+    for model_name in MODEL_PATHS:
+        model_path = get_model_path(model_name)
+        model = joblib.load(model_path)
+        compiled = compile_model(model)
+        if get_dataset_path(model_name).exists():
+            X = build_feature_matrix(model_name, load_model_dataset(model_name))
+        else:
+            X = np.random.default_rng(0).normal(size=(1000, model.n_features_in_))
+
+        try:
+            quantized, threshold_dtype, difference, changed = build_quantized(model, X, compiled)
+        except ValueError as e:
+            print(f"❌ {model_name}: {e}, not saved")
+            continue
+
+        output_path = quantized_path(model_path)
+        save_quantized(quantized, output_path, source_hash=file_hash(model_path))
+        rss_before = _current_rss_bytes()
+        start = time.perf_counter()
+        loaded = load_quantized(output_path)
+        load_ms = (time.perf_counter() - start) * 1000
+        rss_after = _current_rss_bytes()
+        difference, changed = check_quantized_parity(model, loaded, X)
+
+        start = time.perf_counter()
+        joblib.load(model_path)
+        pickle_ms = (time.perf_counter() - start) * 1000
+        status = "✅" if threshold_dtype == np.float32 else "⚠️ "
+        note = "" if threshold_dtype == np.float32 else " (float64 thresholds)"
+        memory = f", +{(rss_after - rss_before) / 2**20:.1f} MB RSS" if rss_before and rss_after else ""
+        print(f"{status} {model_name}{note}: max diff {difference:.1e}, {changed * 100:.2f}% labels changed, "
+              f"{output_path.stat().st_size / 2**20:.2f} MB (pkl {model_path.stat().st_size / 2**20:.2f} MB), "
+              f"load {load_ms:.1f} ms vs {pickle_ms:.1f} ms{memory}")
+
+
+if __name__ == "__main__":
+    main()
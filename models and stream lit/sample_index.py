@@ -0,0 +1,68 @@
+"""Prebuilt index for browsing dataset samples without per-row lookups.
+
+Labels and the filterable columns are extracted once into NumPy arrays, so
+filtering, searching and paging a 10k-row dataset are a handful of
+vectorized mask operations rather than one ``iloc`` call per row.
+"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_PAGE_SIZE = 50
+
+
+class SampleIndex:
+    """Vectorized labels and filter columns for one dataset"""
+
+    def __init__(self, df, disposition_column='koi_disposition', period_column='koi_period',
+                 score_column='koi_score'):
+        n_rows = len(df)
+        self.size = n_rows
+        self.dispositions = df[disposition_column].astype(str).to_numpy()
+        self.periods = pd.to_numeric(df[period_column], errors='coerce').to_numpy(dtype=np.float64)
+        if score_column in df.columns:
+            self.scores = pd.to_numeric(df[score_column], errors='coerce').to_numpy(dtype=np.float64)
+        else:
+            self.scores = np.full(n_rows, np.nan)
+
+        numbers = pd.Series(np.arange(1, n_rows + 1)).astype(str)
+        periods = pd.Series(self.periods).map('{:.2f}'.format)
+        self.labels = ("Sample " + numbers + ": " + pd.Series(self.dispositions) + " - Period: " + periods + " days").to_numpy()
+        self._search_labels = np.char.lower(self.labels.astype(str))
+
+        self.disposition_values = sorted(set(self.dispositions))
+        self.period_range = (float(np.nanmin(self.periods)), float(np.nanmax(self.periods))) if n_rows else (0.0, 0.0)
+        self.score_range = (0.0, 1.0)
+
+    def filter(self, dispositions=None, period_range=None, score_range=None, query=None):
+        """Return the row positions matching every given filter, in dataset order"""
+        mask = np.ones(self.size, dtype=bool)
+        if dispositions:
+            mask &= np.isin(self.dispositions, list(dispositions))
+        if period_range is not None:
+            low, high = period_range
+            mask &= (self.periods >= low) & (self.periods <= high)
+        if score_range is not None and score_range != self.score_range:
+            low, high = score_range
+            mask &= (self.scores >= low) & (self.scores <= high)
+        if query:
+            query = query.strip().lower()
+            if query.isdigit():
+                # A bare number jumps to that sample
+                position = int(query) - 1
+                hit = np.zeros(self.size, dtype=bool)
+                if 0 <= position < self.size:
+                    hit[position] = True
+                mask &= hit
+            else:
+                mask &= np.char.find(self._search_labels, query) >= 0
+        return np.flatnonzero(mask)
+
+    @staticmethod
+    def page_count(positions, page_size=DEFAULT_PAGE_SIZE):
+        return max(1, -(-len(positions) // page_size))
+
+    @staticmethod
+    def page(positions, page_number, page_size=DEFAULT_PAGE_SIZE):
+        """Return the positions on a 1-based page"""
+        start = (page_number - 1) * page_size
+        return positions[start:start + page_size]
@@ -0,0 +1,221 @@
+"""Shared feature mapping and vectorized scoring for the exoplanet models.
+
+This module has no Streamlit dependency so the same column mapping and batch
+scoring can be reused by the app, scripts and services.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).parent
+
+# Model files relative to BASE_DIR
+MODEL_PATHS = {
+    "Kepler Model": "3 models for every mission/best_model_kepler.pkl",
+    "104-Input Kepler": "model kepler df new with 104 inputs/best_model.pkl",
+    "TESS Model": "3 models for every mission/best_model_tess.pkl",
+    "K2 Model": "3 models for every mission/best_model_k2.pkl"
+}
+
+# Bundled datasets each model was trained on, relative to BASE_DIR
+DATASET_PATHS = {
+    "Kepler Model": "3 models for every mission/kepler_clean.csv",
+    "104-Input Kepler": "model kepler df new with 104 inputs/df_new.csv",
+    "TESS Model": "3 models for every mission/tess_clean.csv",
+    "K2 Model": "3 models for every mission/k2_clean.csv"
+}
+
+# Results summaries written by the training notebooks, relative to BASE_DIR
+SUMMARY_PATHS = {
+    "Kepler Model": "3 models for every mission/model_results_summary_kepler.csv",
+    "104-Input Kepler": "model kepler df new with 104 inputs/model_results_summary.csv",
+    "TESS Model": "3 models for every mission/model_results_summary_tess.csv",
+    "K2 Model": "3 models for every mission/model_results_summary_k2.csv"
+}
+
+# Class names in LabelEncoder order, as encoded by the training notebooks
+CLASS_LABELS = {
+    "Kepler Model": ["CANDIDATE", "CONFIRMED", "FALSE POSITIVE"],
+    "104-Input Kepler": ["CANDIDATE", "CONFIRMED", "FALSE POSITIVE"],
+    "TESS Model": [
+        "Active Planet Candidate", "Confirmed Planet", "False Alarm",
+        "False Positive", "Known Planet", "Planet Candidate"
+    ],
+    "K2 Model": ["CANDIDATE", "CONFIRMED", "FALSE POSITIVE", "REFUTED"]
+}
+
+# Disposition column holding the true label in each bundled dataset
+TARGET_COLUMNS = {
+    "Kepler Model": "disposition",
+    "104-Input Kepler": "koi_disposition",
+    "TESS Model": "disposition",
+    "K2 Model": "disposition"
+}
+
+# Abbreviated TESS dispositions, expanded by the training notebook before encoding
+DISPOSITION_ALIASES = {
+    'APC': 'Active Planet Candidate',
+    'CP': 'Confirmed Planet',
+    'FA': 'False Alarm',
+    'FP': 'False Positive',
+    'KP': 'Known Planet',
+    'PC': 'Planet Candidate'
+}
+
+# String feature columns that were label-encoded before training
+CATEGORICAL_ENCODINGS = {
+    'discoverymethod': {'Microlensing': 0, 'Radial Velocity': 1, 'Transit': 2}
+}
+
+# Rows passed to predict_proba per call in batch mode
+DEFAULT_CHUNK_SIZE = 4096
+
+
+# Feature mapping for each model based on actual dataset columns
+def get_feature_mapping(model_name):
+    """Return the required features for each model based on actual dataset columns"""
+    feature_mappings = {
+        "TESS Model": {
+            'features': [
+                'pl_tranmid', 'orbital_period', 'transit_duration', 'transit_depth',
+                'planet_radius', 'insolation', 'equilibrium_temp', 'st_tmag',
+                'st_dist', 'stellar_temp', 'stellar_logg', 'stellar_radius'
+            ],
+            'defaults': [2459000.0, 365.0, 10.0, 1000.0, 1.0, 1.0, 300.0, 12.0, 100.0, 5778.0, 4.4, 1.0]
+        },
+        "Kepler Model": {
+            'features': [
+                'orbital_period', 'transit_duration', 'transit_depth', 'koi_ror',
+                'planet_radius', 'koi_sma', 'inclination', 'equilibrium_temp',
+                'insolation', 'koi_srho', 'stellar_temp', 'stellar_logg',
+                'stellar_radius', 'stellar_mass'
+            ],
+            'defaults': [365.0, 10.0, 1000.0, 0.01, 1.0, 1.0, 90.0, 300.0, 1.0, 1.0, 5778.0, 4.4, 1.0, 1.0]
+        },
+        "K2 Model": {
+            'features': [
+                'orbital_period', 'transit_duration', 'transit_depth', 'planet_radius',
+                'planet_radiuJ', 'pl_masse', 'pl_massj', 'insolation', 'equilibrium_temp',
+                'pl_orbeccen', 'inclination', 'stellar_temp', 'stellar_radius',
+                'stellar_mass', 'st_met', 'stellar_logg', 'discoverymethod'
+            ],
+            'defaults': [365.0, 10.0, 1000.0, 1.0, 0.1, 1.0, 0.003, 1.0, 300.0, 0.0, 90.0, 5778.0, 1.0, 1.0, 0.0, 4.4, 0.0]
+        },
+        "104-Input Kepler": {
+            'features': [
+                'koi_score', 'koi_fpflag_nt', 'koi_fpflag_ss', 'koi_fpflag_co', 'koi_fpflag_ec',
+                'koi_period', 'koi_period_err1', 'koi_period_err2', 'koi_time0bk', 'koi_time0bk_err1',
+                'koi_time0bk_err2', 'koi_time0', 'koi_time0_err1', 'koi_time0_err2', 'koi_eccen',
+                'koi_impact', 'koi_impact_err1', 'koi_impact_err2', 'koi_duration', 'koi_duration_err1',
+                'koi_duration_err2', 'koi_depth', 'koi_depth_err1', 'koi_depth_err2', 'koi_ror',
+                'koi_ror_err1', 'koi_ror_err2', 'koi_srho', 'koi_srho_err1', 'koi_srho_err2',
+                'koi_prad', 'koi_prad_err1', 'koi_prad_err2', 'koi_sma', 'koi_incl', 'koi_teq',
+                'koi_insol', 'koi_insol_err1', 'koi_insol_err2', 'koi_dor', 'koi_dor_err1', 'koi_dor_err2',
+                'koi_ldm_coeff4', 'koi_ldm_coeff3', 'koi_ldm_coeff2', 'koi_ldm_coeff1', 'koi_max_sngle_ev',
+                'koi_max_mult_ev', 'koi_model_snr', 'koi_count', 'koi_num_transits', 'koi_tce_plnt_num',
+                'koi_bin_oedp_sig', 'koi_steff', 'koi_steff_err1', 'koi_steff_err2', 'koi_slogg',
+                'koi_slogg_err1', 'koi_slogg_err2', 'koi_smet', 'koi_smet_err1', 'koi_smet_err2',
+                'koi_srad', 'koi_srad_err1', 'koi_srad_err2', 'koi_smass', 'koi_smass_err1', 'koi_smass_err2',
+                'ra', 'dec', 'koi_kepmag', 'koi_gmag', 'koi_rmag', 'koi_imag', 'koi_zmag', 'koi_jmag',
+                'koi_hmag', 'koi_kmag', 'koi_fwm_stat_sig', 'koi_fwm_sra', 'koi_fwm_sra_err', 'koi_fwm_sdec',
+                'koi_fwm_sdec_err', 'koi_fwm_srao', 'koi_fwm_srao_err', 'koi_fwm_sdeco', 'koi_fwm_sdeco_err',
+                'koi_fwm_prao', 'koi_fwm_prao_err', 'koi_fwm_pdeco', 'koi_fwm_pdeco_err', 'koi_dicco_mra',
+                'koi_dicco_mra_err', 'koi_dicco_mdec', 'koi_dicco_mdec_err', 'koi_dicco_msky', 'koi_dicco_msky_err',
+                'koi_dikco_mra', 'koi_dikco_mra_err', 'koi_dikco_mdec', 'koi_dikco_mdec_err', 'koi_dikco_msky',
+                'koi_dikco_msky_err', 'planet_star_ratio'
+            ],
+            'defaults': [0.5] * 104  # Default values for all 104 features
+        }
+    }
+    return feature_mappings.get(model_name, {'features': [], 'defaults': []})
+
+
+def get_model_path(model_name):
+    """Return the absolute model file path for a model name, or None if unknown"""
+    model_path = MODEL_PATHS.get(model_name)
+    return BASE_DIR / model_path if model_path else None
+
+
+def get_dataset_path(model_name):
+    """Return the absolute bundled dataset path for a model name, or None if unknown"""
+    dataset_path = DATASET_PATHS.get(model_name)
+    return BASE_DIR / dataset_path if dataset_path else None
+
+
+def build_input_vector(model_name, inputs):
+    """Build a 1xN float64 matrix from a dict of feature values with the model's fitted preprocessing.
+
+    Features missing from ``inputs`` get the fill value fitted on the
+    model's training data rather than an arbitrary default.
+    """
+    from preprocessing import get_preprocessor
+    return get_preprocessor(model_name).transform_inputs(inputs)
+
+
+def build_feature_matrix(model_name, data):
+    """Project a DataFrame onto the model's features as one contiguous float64 matrix.
+
+    Label-encoded string columns are mapped to their training codes, and
+    missing columns, empty cells and unparseable values are filled the way
+    the training notebook filled them, using the model's fitted preprocessor.
+    """
+    from preprocessing import get_preprocessor
+    return get_preprocessor(model_name).transform(data)
+
+
+def predict_proba_batch(model, matrix, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Score a feature matrix with one predict_proba call per chunk"""
+    n_rows = matrix.shape[0]
+    probabilities = np.empty((n_rows, len(model.classes_)), dtype=np.float64)
+    for start in range(0, n_rows, chunk_size):
+        stop = min(start + chunk_size, n_rows)
+        probabilities[start:stop] = model.predict_proba(matrix[start:stop])
+    return probabilities
+
+
+def labels_from_proba(model, probabilities):
+    """Derive predicted classes and confidence (%) from a probability matrix"""
+    best = np.argmax(probabilities, axis=1)
+    predictions = np.asarray(model.classes_)[best]
+    confidence = probabilities[np.arange(len(best)), best] * 100
+    return predictions, confidence
+
+
+def class_names(model_name, classes):
+    """Map encoded class values to readable disposition names"""
+    labels = CLASS_LABELS.get(model_name, [])
+    return [labels[int(c)] if 0 <= int(c) < len(labels) else str(c) for c in classes]
+
+
+def encode_targets(model_name, dispositions):
+    """Encode disposition strings to class values; unknown dispositions become -1"""
+    codes = {label: i for i, label in enumerate(CLASS_LABELS.get(model_name, []))}
+    names = pd.Series(dispositions).astype(object).replace(DISPOSITION_ALIASES)
+    return names.map(codes).fillna(-1).to_numpy(dtype=np.int64)
+
+
+def prediction_frame(model, model_name, probabilities, index=None):
+    """Return a DataFrame of predictions for a probability matrix.
+
+    It has the encoded class, its disposition name, the confidence and one
+    probability column per class.
+    """
+    predictions, confidence = labels_from_proba(model, probabilities)
+    names = class_names(model_name, model.classes_)
+
+    results = pd.DataFrame({
+        'predicted_class': predictions,
+        'predicted_label': np.asarray(names, dtype=object)[np.argmax(probabilities, axis=1)],
+        'confidence': confidence
+    }, index=index)
+    for i, name in enumerate(names):
+        results[f"prob_{name}"] = probabilities[:, i]
+    return results
+
+
+def score_dataframe(model, model_name, data, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Score every row of ``data`` and return a DataFrame of predictions, one row per input row"""
+    matrix = build_feature_matrix(model_name, data)
+    probabilities = predict_proba_batch(model, matrix, chunk_size)
+    return prediction_frame(model, model_name, probabilities, index=data.index)
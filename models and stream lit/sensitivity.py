@@ -0,0 +1,235 @@
+"""What-if sweeps of one candidate's prediction over one or two input features.
+
+A sweep holds every other input at its current value and varies one
+feature (a response curve) or two (a response surface) over a grid. The
+whole grid is built as a single feature matrix by repeating the candidate's
+preprocessed vector and overwriting the swept columns, then scored with one
+``predict_proba`` call, so a 200 x 200 sweep costs one model call over 40k
+rows instead of 40k single-row predictions.
+
+Given a CompiledEnsemble (see tree_compiler.py) the sweep never scores the
+grid row by row. Each leaf a tree can reach from the candidate covers a box
+of the grid, bounded by the tree's thresholds on the swept features, so
+every tree is walked once and its leaf values are added onto their boxes
+with a difference array. The cost grows with the number of reachable
+leaves rather than the grid size, and the probabilities are the ones
+``predict_proba`` returns on the full grid.
+
+By default each swept feature spans the 1st to 99th percentile of the
+model's training data, widened to include the current value. It uses log
+spacing when that range is positive and covers more than LOG_RANGE_RATIO.
+
+Usage:
+    python sensitivity.py              # time a 200 x 200 sweep for every bundled model
+"""
+import time
+
+import numpy as np
+
+from dataset_store import load_model_dataset
+from scoring import CATEGORICAL_ENCODINGS, build_input_vector, class_names, get_dataset_path, get_feature_mapping
+from tree_compiler import CompiledEnsemble, _ZERO_THRESHOLD
+
+# Grid points per swept feature
+SWEEP_POINTS = 200
+
+# Training data quantiles bounding a sweep's default range
+RANGE_QUANTILES = (0.01, 0.99)
+
+# A positive range wider than this ratio is swept on a log scale
+LOG_RANGE_RATIO = 100
+
+
+def sweep_features(model_name):
+    """Return the model's numeric features, which are the ones that can be swept"""
+    return [feature for feature in get_feature_mapping(model_name)['features'] if feature not in CATEGORICAL_ENCODINGS]
+
+
+def feature_ranges(model_name):
+    """Return the (low, high) training data range of every sweepable feature"""
+    features = sweep_features(model_name)
+    dataset_path = get_dataset_path(model_name)
+    if dataset_path is None or not dataset_path.exists():
+        return {}
+    df = load_model_dataset(model_name, columns=features)
+    ranges = {}
+    for feature in features:
+        values = np.asarray(df[feature], dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if len(values):
+            low, high = np.quantile(values, RANGE_QUANTILES)
+            ranges[feature] = (float(low), float(high))
+    return ranges
+
+
+def sweep_values(low, high, current=None, points=SWEEP_POINTS):
+    """Return ``points`` grid values from ``low`` to ``high``, widened to include ``current``"""
+    if current is not None and np.isfinite(current):
+        low, high = min(low, current), max(high, current)
+    if high <= low:
+        spread = abs(low) * 0.5 or 1.0
+        low, high = low - spread, high + spread
+    if low > 0 and high / low > LOG_RANGE_RATIO:
+        return np.geomspace(low, high, points)
+    return np.linspace(low, high, points)
+
+
+def log_spaced(values):
+    """Return whether grid values are evenly spaced on a log scale, as sweep_values spaces wide ranges"""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 3 or values[0] <= 0:
+        return False
+    steps = np.diff(np.log(values))
+    return not np.allclose(np.diff(values), values[1] - values[0]) and np.allclose(steps, steps[0])
+
+
+def _grid_raw(compiled, base, columns, values):
+    """Return the raw scores over the sweep grid, shaped (len(values_1), ..., n_outputs).
+
+    Every tree is walked once for the whole grid: splits on other features
+    follow the candidate's value, splits on a swept feature keep both
+    children and narrow that axis's index range. Each reachable leaf then
+    adds its value to a box of the grid through a difference array.
+    """
+    t = compiled.tables
+    n_axes = len(columns)
+    prepared = compiled.prepare(base)[0]
+    order = [np.argsort(axis_values, kind='stable') for axis_values in values]
+    # Sorted grid values per axis, as the original library reads them
+    axes_sorted = [compiled.prepare(axis_values[axis_order].reshape(-1, 1))[:, 0]
+                   for axis_values, axis_order in zip(values, order)]
+    axis_of = np.full(compiled.n_features_in_, -1)
+    axis_of[columns] = np.arange(n_axes)
+
+    nodes, trees = t['roots'].astype(np.int64), np.arange(compiled.n_trees)
+    low = np.zeros((len(nodes), n_axes), dtype=np.int64)
+    high = np.tile([len(axis_values) for axis_values in values], (len(nodes), 1))
+    leaves = []
+    while len(nodes):
+        is_leaf = t['is_leaf'][nodes]
+        leaves.append((nodes[is_leaf], trees[is_leaf], low[is_leaf], high[is_leaf]))
+        nodes, trees, low, high = nodes[~is_leaf], trees[~is_leaf], low[~is_leaf], high[~is_leaf]
+        axis = axis_of[t['feature'][nodes]]
+
+        fixed = axis < 0
+        go_left = compiled._go_left(prepared[t['feature'][nodes[fixed]]], nodes[fixed])
+        fixed_children = np.where(go_left, t['left'][nodes[fixed]], t['right'][nodes[fixed]])
+
+        swept = np.flatnonzero(~fixed)
+        cut = np.empty(len(swept), dtype=np.int64)
+        for a in range(n_axes):
+            on_axis = axis[swept] == a
+            cut[on_axis] = np.searchsorted(axes_sorted[a], t['threshold'][nodes[swept[on_axis]]],
+                                           side='left' if compiled.strict else 'right')
+        rows = np.arange(len(swept))
+        left_high, right_low = high[swept].copy(), low[swept].copy()
+        left_high[rows, axis[swept]] = np.minimum(left_high[rows, axis[swept]], cut)
+        right_low[rows, axis[swept]] = np.maximum(right_low[rows, axis[swept]], cut)
+
+        nodes = np.concatenate([fixed_children, t['left'][nodes[swept]], t['right'][nodes[swept]]])
+        trees = np.concatenate([trees[fixed], trees[swept], trees[swept]])
+        low = np.concatenate([low[fixed], low[swept], right_low])
+        high = np.concatenate([high[fixed], left_high, high[swept]])
+        keep = np.all(low < high, axis=1)
+        nodes, trees, low, high = nodes[keep], trees[keep], low[keep], high[keep]
+
+    nodes, trees, low, high = (np.concatenate(parts) for parts in zip(*leaves))
+    outputs = t['tree_class'][trees]
+    difference = np.zeros(tuple(len(axis_values) + 1 for axis_values in values) + (len(compiled.base_score),))
+    # Inclusion-exclusion over the box corners: +1 at low corners, alternating signs at high ones
+    for corner in np.ndindex(*(2,) * n_axes):
+        index = tuple(np.where(corner[a], high[:, a], low[:, a]) for a in range(n_axes))
+        sign = (-1.0) ** sum(corner)
+        np.add.at(difference, index + (outputs,), sign * t['value'][nodes])
+    for a in range(n_axes):
+        difference = np.cumsum(difference, axis=a)
+    raw = difference[tuple(slice(0, len(axis_values)) for axis_values in values)] + compiled.base_score
+
+    # Back to the caller's value order
+    for a, axis_order in enumerate(order):
+        restored = np.empty_like(axis_order)
+        restored[axis_order] = np.arange(len(axis_order))
+        raw = np.take(raw, restored, axis=a)
+
+    # Zeros take the default direction at some LightGBM splits, which a box can't express
+    if compiled._has_zero_missing:
+        for a, (column, axis_values) in enumerate(zip(columns, values)):
+            for i in np.flatnonzero(np.abs(axis_values) <= _ZERO_THRESHOLD):
+                mesh = np.meshgrid(*[axis_values if b != a else axis_values[i:i + 1]
+                                     for b, axis_values in enumerate(values)], indexing='ij')
+                rows = np.repeat(base, mesh[0].size, axis=0)
+                for b, axis_grid in enumerate(mesh):
+                    rows[:, columns[b]] = axis_grid.ravel()
+                exact = compiled.decision_function(rows).reshape(mesh[0].shape + (-1,))
+                raw[(slice(None),) * a + (slice(i, i + 1),)] = exact
+    return raw
+
+
+def sweep(model, model_name, inputs, axes):
+    """Score a candidate over a grid of one or two swept features.
+
+    ``axes`` is a list of one or two ``(feature, values)`` pairs. Returns the
+    probabilities with shape ``(len(values), n_classes)`` for one axis, or
+    ``(len(values_2), len(values_1), n_classes)`` for two, with the class names
+    and the scoring time.
+    """
+    if not 1 <= len(axes) <= 2:
+        raise ValueError("A sweep varies one or two features")
+    features = get_feature_mapping(model_name)['features']
+    columns = []
+    for feature, _ in axes:
+        if feature not in sweep_features(model_name):
+            raise ValueError(f"{feature} is not a numeric feature of {model_name}")
+        columns.append(features.index(feature))
+    if len(set(columns)) != len(columns):
+        raise ValueError("Sweep two different features")
+
+    values = [np.asarray(axis_values, dtype=np.float64) for _, axis_values in axes]
+    base = build_input_vector(model_name, inputs)
+    start = time.perf_counter()
+    if isinstance(model, CompiledEnsemble):
+        raw = _grid_raw(model, base, columns, values)
+        probabilities = model.proba_from_raw(raw.reshape(-1, raw.shape[-1])).reshape(raw.shape)
+        # Second feature along rows, first along columns, as with meshgrid's 'xy' indexing
+        probabilities = probabilities.transpose(1, 0, 2) if len(axes) == 2 else probabilities
+    else:
+        mesh = np.meshgrid(*values, indexing='xy')
+        grid = np.repeat(base, mesh[0].size, axis=0)
+        for column, axis_grid in zip(columns, mesh):
+            grid[:, column] = axis_grid.ravel()
+        probabilities = model.predict_proba(grid)
+        probabilities = probabilities.reshape(mesh[0].shape + (probabilities.shape[1],))
+    seconds = time.perf_counter() - start
+    return {
+        'features': [feature for feature, _ in axes],
+        'values': values,
+        'probabilities': probabilities,
+        'classes': class_names(model_name, model.classes_),
+        'seconds': seconds
+    }
+
+
+def main():
+    import joblib
+    from scoring import MODEL_PATHS, get_model_path
+    from tree_compiler import PARITY_TOLERANCE, compile_model
+
+    for model_name in MODEL_PATHS:
+        model = joblib.load(get_model_path(model_name))
+        ranges = feature_ranges(model_name)
+        features = [feature for feature in sweep_features(model_name) if feature in ranges][:2]
+        if len(features) < 2:
+            print(f"⚠️  {model_name}: dataset not found, skipping")
+            continue
+        axes = [(feature, sweep_values(*ranges[feature])) for feature in features]
+        full = sweep(model, model_name, {}, axes)
+        separable = sweep(compile_model(model), model_name, {}, axes)
+        difference = np.max(np.abs(full['probabilities'] - separable['probabilities']))
+        status = "✅" if difference <= PARITY_TOLERANCE else "❌"
+        print(f"{status} {model_name}: {SWEEP_POINTS}x{SWEEP_POINTS} sweep of {' and '.join(features)} in "
+              f"{separable['seconds'] * 1000:.0f} ms compiled vs {full['seconds'] * 1000:.0f} ms with one "
+              f"predict_proba call (max difference {difference:.1e})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Host-local sharing of the models and datasets between Streamlit worker processes.
+
+Scaled out to several Streamlit processes on one machine, every worker
+normally unpickles all four models, importing scikit-learn, LightGBM and
+XGBoost along the way, and keeps its own copy of them. With
+``ASTROVISION_SHARED_MODELS=1`` the app's model registry serves the
+quantized artifacts (see quantized_model.py) instead. Their tables are
+read-only memory maps, so the operating system keeps one copy in the page
+cache for every worker and a worker's private memory stays near the
+framework baseline. The datasets already load as memory maps over the
+columnar cache (see dataset_store.py).
+
+One loader prepares everything the workers map: a quantized artifact for
+each model, rebuilt whenever its model file's hash changes, and the
+columnar cache of each dataset. Run ``python shared_hosting.py`` before
+starting the workers. A worker that finds an artifact missing or stale
+builds it itself under a host-wide file lock, so concurrent workers build
+each one once and the others wait and map the result. A model that has no
+matching artifact (an unsupported estimator, or one that fails the parity
+check) is unpickled as before.
+
+Usage:
+    python shared_hosting.py           # prepare the shared artifacts and compare per-worker memory
+    ASTROVISION_SHARED_MODELS=1 streamlit run streamlit_app.py --server.port 8501
+"""
+import contextlib
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from dataset_store import convert, file_hash
+from model_registry import ModelRegistry, _joblib_load
+from quantized_model import build_quantized, is_current, load_quantized, quantized_path, save_quantized
+from scoring import BASE_DIR, DATASET_PATHS, MODEL_PATHS, get_dataset_path, get_model_path
+
+try:
+    import fcntl
+except ImportError:  # Windows: no lock, concurrent workers may build the same artifact
+    fcntl = None
+
+# Environment variable that switches the app to shared models
+SHARED_MODELS_ENV = "ASTROVISION_SHARED_MODELS"
+
+LOCK_PATH = BASE_DIR / ".shared_host.lock"
+
+
+def shared_models_enabled():
+    """Return whether this process should serve the shared model artifacts"""
+    return os.environ.get(SHARED_MODELS_ENV, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+@contextlib.contextmanager
+def host_lock(path=LOCK_PATH):
+    """Hold an exclusive lock shared by every process on this host"""
+    if fcntl is None:
+        yield
+        return
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def prepare_model(model_name):
+    """Build a model's quantized artifact unless a current one exists; returns its path or None.
+
+    Returns None when the model can't be quantized within tolerance.
+    """
+    from dataset_store import load_model_dataset
+    from scoring import build_feature_matrix
+
+    model_path = get_model_path(model_name)
+    with host_lock():
+        # Another worker may have built it while this one waited for the lock
+        if is_current(model_path):
+            return quantized_path(model_path)
+        model = _joblib_load(model_path)
+        dataset_path = get_dataset_path(model_name)
+        if dataset_path is None or not dataset_path.exists():
+            return None  # nothing to check parity on
+        X = build_feature_matrix(model_name, load_model_dataset(model_name))
+        try:
+            quantized = build_quantized(model, X)[0]
+        except ValueError:
+            return None
+        save_quantized(quantized, quantized_path(model_path), source_hash=file_hash(model_path))
+        return quantized_path(model_path)
+
+
+def load_shared_model(model_path):
+    """ModelRegistry loader: map the model's current quantized artifact, building it if needed"""
+    model_path = Path(model_path)
+    model_name = next((name for name in MODEL_PATHS if get_model_path(name) == model_path), None)
+    if is_current(model_path):
+        return load_quantized(quantized_path(model_path))
+    try:
+        artifact = prepare_model(model_name) if model_name is not None else None
+    except Exception:
+        artifact = None
+    return load_quantized(artifact) if artifact is not None else _joblib_load(model_path)
+
+
+def shared_registry():
+    """Return a ModelRegistry serving the shared artifacts of the bundled models"""
+    return ModelRegistry(loader=load_shared_model)
+
+
+def prepare(model_names=None):
+    """Prepare every shared artifact; returns {name: status} for models and datasets"""
+    report = {}
+    for model_name in model_names or list(MODEL_PATHS):
+        try:
+            artifact = prepare_model(model_name)
+            report[model_name] = str(artifact.name) if artifact else "not quantizable, workers unpickle it"
+        except Exception as e:
+            report[model_name] = f"failed: {e}"
+    for model_name in model_names or list(DATASET_PATHS):
+        dataset_path = get_dataset_path(model_name)
+        if dataset_path is None or not dataset_path.exists():
+            continue
+        report[dataset_path.name] = convert(dataset_path).name
+    return report
+
+
+_WORKER_PROBE = """
+import json, sys, warnings
+warnings.filterwarnings('ignore')
+
+def private_mb():
+    with open('/proc/self/smaps_rollup') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('Anonymous:')) / 1024
+
+import numpy, pandas
+from dataset_store import load_model_dataset
+from model_registry import ModelRegistry
+from scoring import MODEL_PATHS, DATASET_PATHS, build_input_vector, get_dataset_path
+from shared_hosting import shared_registry
+before = private_mb()
+registry = shared_registry() if {shared!r} else ModelRegistry()
+for name in MODEL_PATHS:
+    registry.get(name).predict_proba(build_input_vector(name, {{}}))
+for name in DATASET_PATHS:
+    if get_dataset_path(name).exists():
+        load_model_dataset(name)
+print(json.dumps({{'private_mb': private_mb() - before,
+                  'imported': [m for m in ('sklearn', 'lightgbm', 'xgboost') if m in sys.modules]}}))
+"""
+
+
+def measure_worker(shared):
+    """Return the private memory a fresh worker adds by loading every model and dataset"""
+    result = subprocess.run(
+        [sys.executable, "-c", _WORKER_PROBE.format(shared=shared)],
+        cwd=Path(__file__).parent, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    for name, status in prepare().items():
+        print(f"{'✅' if not status.startswith(('failed', 'not')) else '⚠️ '} {name}: {status}")
+    if not Path('/proc/self/smaps_rollup').exists():
+        return
+    for shared in (False, True):
+        result = measure_worker(shared)
+        imported = ", ".join(result['imported']) or "no ML libraries"
+        print(f"   {'shared' if shared else 'pickled'} worker: +{result['private_mb']:.1f} MB private memory ({imported})")
+
+
+if __name__ == "__main__":
+    main()
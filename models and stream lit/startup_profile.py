@@ -0,0 +1,80 @@
+"""Startup profile for the Streamlit app's import tiers.
+
+Each stage runs in a fresh interpreter and reports its wall time, peak RSS
+and which heavy libraries ended up imported, so the cost of a cold start and
+of an idle session can be compared before and after a change.
+
+Usage:
+    python startup_profile.py          # print a table
+    python startup_profile.py --json   # machine-readable output
+"""
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+HEAVY_MODULES = ['numpy', 'pandas', 'plotly', 'joblib', 'sklearn', 'lightgbm', 'xgboost']
+
+STAGES = [
+    ("streamlit", "import streamlit"),
+    ("numpy + pandas", "import numpy, pandas"),
+    ("plotly.express", "import plotly.express"),
+    ("joblib + scikit-learn", "import joblib, sklearn.metrics, sklearn.model_selection"),
+    ("lightgbm", "import lightgbm"),
+    ("xgboost", "import xgboost"),
+    ("app import (idle session)", "import streamlit_app"),
+    ("first paint (default tab)", (
+        "import os\n"
+        "from streamlit.testing.v1 import AppTest\n"
+        "AppTest.from_file(os.path.abspath('streamlit_app.py'), default_timeout=300).run()"
+    )),
+    ("app + first prediction", (
+        "import streamlit_app\n"
+        "from model_registry import ModelRegistry\n"
+        "from scoring import build_input_vector\n"
+        "ModelRegistry().get('Kepler Model').predict_proba(build_input_vector('Kepler Model', {}))"
+    )),
+]
+
+_PROBE = """
+import json, resource, sys, time, warnings
+warnings.filterwarnings('ignore')
+start = time.perf_counter()
+exec({code!r})
+seconds = time.perf_counter() - start
+print(json.dumps({{
+    'seconds': seconds,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'imported': [m for m in {heavy!r} if m in sys.modules]
+}}))
+"""
+
+
+def profile_stage(code, cwd=None):
+    """Run ``code`` in a fresh interpreter and return its timing and memory"""
+    probe = _PROBE.format(code=code, heavy=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-c", probe], cwd=cwd or Path(__file__).parent,
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the app's import tiers")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = [{'stage': name, **profile_stage(code)} for name, code in STAGES]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'Stage':<28} {'Time (s)':>9} {'Peak RSS (MB)':>14}  Heavy modules imported")
+    for row in results:
+        print(f"{row['stage']:<28} {row['seconds']:>9.2f} {row['max_rss_mb']:>14.1f}  {', '.join(row['imported'])}")
+
+
+if __name__ == "__main__":
+    main()
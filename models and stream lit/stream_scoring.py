@@ -0,0 +1,307 @@
+"""Score candidate files of any size in fixed-size chunks with bounded memory.
+
+Bulk scoring through pandas reads the whole file first, which fails for
+multi-GB archive dumps. This scorer runs a three-stage pipeline instead:
+
+- a reader thread parses the CSV ``chunk_size`` rows at a time, keeping only
+  the model's features and any requested pass-through columns
+- the calling thread projects each chunk onto the model's features with its
+  fitted preprocessor and scores it with one vectorized predict_proba call
+- a writer thread appends each chunk's predictions to the output as CSV, or
+  as Parquet row groups when the output ends in ``.parquet``
+
+Stages hand chunks over through queues holding at most QUEUE_DEPTH chunks,
+so memory stays flat however large the input is, and parsing, scoring and
+writing overlap. Leading ``#`` comment lines (as in NASA Exoplanet Archive
+downloads) are skipped and gzip input is read transparently. The output is
+written to a temporary file and only replaces ``output_path`` once every row
+has been scored.
+
+Usage:
+    python stream_scoring.py --model "TESS Model" --input toi_dump.csv --output toi_scores.csv
+    python stream_scoring.py --model "Kepler Model" --input koi.csv.gz --output koi.parquet --keep kepoi_name
+    python stream_scoring.py --model "K2 Model" --input k2.csv --output k2.csv --engine compiled --chunk-size 100000
+"""
+import argparse
+import gzip
+import queue
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import pandas as pd
+
+from scoring import (
+    MODEL_PATHS, get_feature_mapping, get_model_path, build_feature_matrix, predict_proba_batch, prediction_frame
+)
+
+# Rows parsed, scored and written at a time
+STREAM_CHUNK_ROWS = 50_000
+
+# Chunks buffered between two pipeline stages
+QUEUE_DEPTH = 2
+
+_DONE = object()
+
+
+def _open_text(path):
+    path = Path(path)
+    return gzip.open(path, 'rt') if path.suffix == '.gz' else open(path)
+
+
+def comment_lines(path):
+    """Return the number of leading ``#`` comment lines in a CSV file"""
+    count = 0
+    with _open_text(path) as f:
+        for line in f:
+            if not line.startswith('#'):
+                break
+            count += 1
+    return count
+
+
+def read_chunks(path, columns, chunk_size=STREAM_CHUNK_ROWS, keep_columns=()):
+    """Yield DataFrames of at most ``chunk_size`` rows holding only ``columns`` and ``keep_columns``.
+
+    Columns missing from the file are simply absent from the chunks;
+    pass-through columns are read as strings so every chunk has the same
+    types.
+    """
+    wanted = set(columns) | set(keep_columns)
+    yield from pd.read_csv(
+        path,
+        usecols=lambda column: column in wanted,
+        dtype={column: str for column in keep_columns},
+        skiprows=comment_lines(path),
+        chunksize=chunk_size
+    )
+
+
+class _CsvWriter:
+    def __init__(self, path, compress=False):
+        self._file = gzip.open(path, 'wt', newline='') if compress else open(path, 'w', newline='')
+        self._header = True
+
+    def write(self, frame):
+        frame.to_csv(self._file, header=self._header, index=False)
+        self._header = False
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet output needs pyarrow; install it or write a .csv file")
+        self._pa, self._pq = pa, pq
+        self._path = path
+        self._writer = None
+
+    def write(self, frame):
+        table = self._pa.Table.from_pandas(
+            frame, schema=self._writer.schema if self._writer else None, preserve_index=False
+        )
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _writer_for(output_path, path):
+    """Return a writer to ``path`` in the format ``output_path``'s name asks for"""
+    if output_path.name.endswith('.parquet'):
+        return _ParquetWriter(path)
+    return _CsvWriter(path, compress=output_path.name.endswith('.gz'))
+
+
+def _put(channel, item, stop):
+    """Put ``item`` on a bounded queue unless the pipeline is stopping"""
+    while not stop.is_set():
+        try:
+            channel.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+class _Stage(threading.Thread):
+    """Pipeline thread that records how long it was busy; an error stops the whole pipeline"""
+
+    def __init__(self, name, target, stop):
+        super().__init__(name=name, daemon=True)
+        self._target_fn = target
+        self._stop_event = stop
+        self.busy_seconds = 0.0
+        self.error = None
+
+    def run(self):
+        try:
+            self._target_fn(self)
+        except BaseException as e:
+            self.error = e
+            self._stop_event.set()
+
+
+def load_scoring_model(model_name, engine="native"):
+    """Load a bundled model, its NumPy tree tables (``engine='compiled'``) or its quantized artifact"""
+    model_path = get_model_path(model_name)
+    if model_path is None:
+        raise ValueError(f"Model {model_name} not found")
+    if engine == "compiled":
+        from tree_compiler import CompiledEnsemble, compiled_path
+        path = compiled_path(model_path)
+        if not path.exists():
+            raise FileNotFoundError(f"Compiled model not found: {path}. Run python tree_compiler.py first")
+        return CompiledEnsemble.load(path)
+    if engine == "quantized":
+        from quantized_model import load_current_quantized
+        return load_current_quantized(model_path)
+    import joblib
+    return joblib.load(model_path)
+
+
+def score_file(model, model_name, input_path, output_path, chunk_size=STREAM_CHUNK_ROWS, keep_columns=()):
+    """Stream ``input_path`` through the model and write one prediction row per input row.
+
+    Returns a summary with the row and chunk counts, predicted label counts
+    and the time each stage was busy.
+    """
+    start = time.perf_counter()
+    features = get_feature_mapping(model_name)['features']
+    if not features:
+        raise ValueError(f"No feature mapping found for {model_name}")
+    keep_columns = list(keep_columns)
+    output_path = Path(output_path)
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+
+    parsed = queue.Queue(maxsize=QUEUE_DEPTH)
+    scored = queue.Queue(maxsize=QUEUE_DEPTH)
+    stop = threading.Event()
+
+    def read(stage):
+        chunks = read_chunks(input_path, features, chunk_size, keep_columns)
+        while True:
+            began = time.perf_counter()
+            chunk = next(chunks, _DONE)
+            stage.busy_seconds += time.perf_counter() - began
+            if not _put(parsed, chunk, stop) or chunk is _DONE:
+                return
+
+    def write(stage):
+        writer = _writer_for(output_path, tmp_path)
+        try:
+            while True:
+                frame = scored.get()
+                if frame is _DONE:
+                    return
+                began = time.perf_counter()
+                writer.write(frame)
+                stage.busy_seconds += time.perf_counter() - began
+        finally:
+            writer.close()
+
+    reader, writer = _Stage("stream-reader", read, stop), _Stage("stream-writer", write, stop)
+    reader.start()
+    writer.start()
+
+    rows, chunks, score_seconds = 0, 0, 0.0
+    labels = Counter()
+    try:
+        while True:
+            chunk = None
+            while chunk is None:
+                try:
+                    chunk = parsed.get(timeout=0.1)
+                except queue.Empty:
+                    if reader.error is not None or writer.error is not None:
+                        raise reader.error or writer.error
+            if chunk is _DONE:
+                break
+            if not chunks and not set(features) & set(chunk.columns):
+                raise ValueError(f"{input_path} has none of the {model_name} feature columns")
+
+            began = time.perf_counter()
+            probabilities = predict_proba_batch(model, build_feature_matrix(model_name, chunk))
+            results = prediction_frame(model, model_name, probabilities)
+            for i, column in enumerate(keep_columns):
+                results.insert(i, column, chunk[column].to_numpy() if column in chunk.columns else None)
+            score_seconds += time.perf_counter() - began
+
+            rows += len(results)
+            chunks += 1
+            labels.update(results['predicted_label'].value_counts().to_dict())
+            if not _put(scored, results, stop):
+                raise writer.error or reader.error
+        _put(scored, _DONE, stop)
+        writer.join()
+        if writer.error is not None:
+            raise writer.error
+        tmp_path.replace(output_path)
+    except BaseException:
+        stop.set()
+        if writer.is_alive():
+            _put(scored, _DONE, threading.Event())
+        writer.join()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        stop.set()
+        reader.join()
+
+    seconds = time.perf_counter() - start
+    return {
+        'model': model_name,
+        'output': str(output_path),
+        'rows': rows,
+        'chunks': chunks,
+        'labels': dict(labels),
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds else 0.0,
+        'read_seconds': reader.busy_seconds,
+        'score_seconds': score_seconds,
+        'write_seconds': writer.busy_seconds
+    }
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a candidate CSV of any size in chunks with bounded memory")
+    parser.add_argument('--model', required=True, choices=list(MODEL_PATHS))
+    parser.add_argument('--input', required=True, help="CSV file to score (.csv or .csv.gz)")
+    parser.add_argument('--output', required=True, help="Predictions file (.csv, .csv.gz or .parquet)")
+    parser.add_argument('--chunk-size', type=int, default=STREAM_CHUNK_ROWS, help="Rows scored at a time")
+    parser.add_argument('--keep', nargs='+', default=[], help="Input columns copied to the output, e.g. kepoi_name")
+    parser.add_argument('--engine', choices=["native", "compiled", "quantized"], default="native",
+                        help="Score with the original library, the compiled NumPy tree tables "
+                             "or the memory-mapped quantized artifact")
+    args = parser.parse_args()
+
+    model = load_scoring_model(args.model, args.engine)
+    result = score_file(model, args.model, args.input, args.output, args.chunk_size, args.keep)
+    peak = _peak_rss_mb()
+    print(f"✅ {args.model}: {result['rows']:,} rows in {result['chunks']} chunks -> {result['output']} "
+          f"({result['seconds']:.1f}s, {result['rows_per_second']:,.0f} rows/s"
+          + (f", peak memory {peak:.0f} MB)" if peak else ")"))
+    print(f"   read {result['read_seconds']:.1f}s • score {result['score_seconds']:.1f}s • write {result['write_seconds']:.1f}s")
+    for label, count in sorted(result['labels'].items(), key=lambda item: -item[1]):
+        print(f"   {label}: {count:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,28 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import pickle
-import joblib
-import plotly.express as px
-import plotly.graph_objects as go
 from pathlib import Path
 import warnings
+import json
+from scoring import (
+    get_feature_mapping, get_model_path, get_dataset_path, build_input_vector,
+    class_names, score_dataframe, DEFAULT_CHUNK_SIZE
+)
+from model_registry import ModelRegistry
+from micro_batcher import BatchScheduler
+from dataset_store import file_hash, load_dataset, load_model_dataset
+from prediction_cache import PredictionCache
+from precompute_scores import load_current_scores, scores_path
+from preprocessing import get_preprocessor
+from sample_index import SampleIndex
+from evaluation import cached_evaluation, evaluation_key, load_cached_evaluation, reported_metrics
+from ensemble import EnsemblePredictor, ENSEMBLE_CLASSES
+from instrumentation import METRICS, summarize
+from explanations import Explainer, contributions_path, load_current_contributions
+from similar_planets import CATALOGS, NEIGHBORS_PATH, catalog_keys, load_similar_planets
+from chart_aggregates import load_aggregates
+from sensitivity import SWEEP_POINTS, feature_ranges, log_spaced, sweep, sweep_features, sweep_values
+from shared_hosting import shared_models_enabled, shared_registry
 warnings.filterwarnings('ignore')
 
 # Page configuration
@@ -254,23 +270,113 @@ def add_space_background():
     </div>
     """, unsafe_allow_html=True)
 
-# Load model function
+# Process-wide model registry: models stay resident as live objects instead of
+# being unpickled from the st.cache_data store on every hit. Models (and the
+# scikit-learn/LightGBM/XGBoost stacks behind them) load on first prediction,
+# so sessions that only browse never pay for them. With ASTROVISION_SHARED_MODELS=1
+# the registry maps the quantized artifacts instead, so every worker process on
+# the host shares one copy of each model (see shared_hosting.py)
+@st.cache_resource
+def get_model_registry():
+    return shared_registry() if shared_models_enabled() else ModelRegistry()
+
+# Shared scheduler that coalesces concurrent sessions' single-row predictions
+@st.cache_resource
+def get_batch_scheduler():
+    return BatchScheduler(get_model_registry())
+
+# Shared cache of single-row predictions, keyed by model file hash and feature vector
+@st.cache_resource
+def get_prediction_cache():
+    cache = PredictionCache()
+    METRICS.add_collector('prediction_cache', cache.stats)
+    return cache
+
+# Precomputed scores for the bundled dataset rows; the cache key changes whenever
+# the model, the dataset or the sidecar itself changes
+@st.cache_resource
+def _load_precomputed_scores(model_name, model_hash, dataset_hash, sidecar_mtime, preprocessing):
+    return load_current_scores(model_name)
+
+def get_precomputed_scores(model_name):
+    """Return the up-to-date precomputed scores for a model, or None"""
+    try:
+        model_path, dataset_path = get_model_path(model_name), get_dataset_path(model_name)
+        sidecar = scores_path(model_path)
+        if not sidecar.exists() or not dataset_path.exists():
+            return None
+        return _load_precomputed_scores(
+            model_name, file_hash(model_path), file_hash(dataset_path), sidecar.stat().st_mtime_ns,
+            get_preprocessor(model_name).fingerprint()
+        )
+    except Exception:
+        return None
+
+# Shared ensemble that scores every model concurrently through the batch scheduler
+@st.cache_resource
+def get_ensemble_predictor():
+    return EnsemblePredictor(get_model_registry(), scheduler=get_batch_scheduler())
+
+# Feature contribution explainers; rebuilt when the model, its stored
+# contributions or its preprocessing change
+@st.cache_resource
+def _load_explainer(model_name, model_hash, sidecar_mtime, preprocessing):
+    return Explainer(load_model(model_name), model_name, stored=load_current_contributions(model_name))
+
+def get_explainer(model_name):
+    """Return the explainer for a model's predictions"""
+    model_path = get_model_path(model_name)
+    sidecar = contributions_path(model_path)
+    return _load_explainer(
+        model_name, file_hash(model_path), sidecar.stat().st_mtime_ns if sidecar.exists() else None,
+        get_preprocessor(model_name).fingerprint()
+    )
+
+# Nearest-neighbour index over the mission catalogs; rebuilt when a catalog changes
+@st.cache_resource
+def _load_similar_planets(catalog_hashes, sidecar_mtime):
+    return load_similar_planets()
+
+def get_similar_planets():
+    """Return the similar known objects index"""
+    return _load_similar_planets(
+        catalog_keys(), NEIGHBORS_PATH.stat().st_mtime_ns if NEIGHBORS_PATH.exists() else None
+    )
+
+# Compiled trees for what-if sweeps, which score a whole grid by walking each tree once
+@st.cache_resource
+def _load_sweep_model(model_name, model_hash):
+    from tree_compiler import compile_model
+    model = load_model(model_name)
+    try:
+        return compile_model(model)
+    except Exception:
+        return model  # not a supported tree ensemble; sweeps fall back to one predict_proba call
+
+# Training data range of every sweepable feature, per dataset version
 @st.cache_data
-def load_model(model_path):
+def _feature_ranges(model_name, dataset_hash):
+    return feature_ranges(model_name)
+
+# Load model function
+def load_model(model_name):
     try:
-        model = joblib.load(model_path)   
-        return model
+        with METRICS.timer('stage_seconds', stage='load_model', model=model_name):
+            return get_model_registry().get(model_name)
     except Exception as e:
-        st.error(f"Error loading model from {model_path}: {str(e)}")
+        st.error(f"Error loading model {model_name}: {str(e)}")
         return None
 
 # Load 104-input dataset function
-@st.cache_data
+# cache_resource shares one memory-mapped frame across sessions instead of
+# unpickling a private copy for each one
+@st.cache_resource
 def load_104_input_data():
     try:
         data_path = Path(__file__).parent / "model kepler df new with 104 inputs/df_new.csv"
         if data_path.exists():
-            df = pd.read_csv(data_path)
+            with METRICS.timer('stage_seconds', stage='load_dataset', model="104-Input Kepler"):
+                df = load_dataset(data_path)
             # Remove the target column (last column) for prediction
             feature_columns = df.columns[:-1].tolist()  # All columns except the last one (koi_disposition_encoded)
             return df, feature_columns
@@ -281,116 +387,62 @@ def load_104_input_data():
         st.error(f"Error loading 104-input dataset: {str(e)}")
         return None, None
 
-# Feature mapping for each model based on actual dataset columns
-def get_feature_mapping(model_name):
-    """Return the required features for each model based on actual dataset columns"""
-    feature_mappings = {
-        "TESS Model": {
-            'features': [
-                'pl_tranmid', 'orbital_period', 'transit_duration', 'transit_depth',
-                'planet_radius', 'insolation', 'equilibrium_temp', 'st_tmag',
-                'st_dist', 'stellar_temp', 'stellar_logg', 'stellar_radius'
-            ],
-            'defaults': [2459000.0, 365.0, 10.0, 1000.0, 1.0, 1.0, 300.0, 12.0, 100.0, 5778.0, 4.4, 1.0]
-        },
-        "Kepler Model": {
-            'features': [
-                'orbital_period', 'transit_duration', 'transit_depth', 'koi_ror',
-                'planet_radius', 'koi_sma', 'inclination', 'equilibrium_temp',
-                'insolation', 'koi_srho', 'stellar_temp', 'stellar_logg',
-                'stellar_radius', 'stellar_mass'
-            ],
-            'defaults': [365.0, 10.0, 1000.0, 0.01, 1.0, 1.0, 90.0, 300.0, 1.0, 1.0, 5778.0, 4.4, 1.0, 1.0]
-        },
-        "K2 Model": {
-            'features': [
-                'orbital_period', 'transit_duration', 'transit_depth', 'planet_radius',
-                'planet_radiuJ', 'pl_masse', 'pl_massj', 'insolation', 'equilibrium_temp',
-                'pl_orbeccen', 'inclination', 'stellar_temp', 'stellar_radius',
-                'stellar_mass', 'st_met', 'stellar_logg', 'discoverymethod'
-            ],
-            'defaults': [365.0, 10.0, 1000.0, 1.0, 0.1, 1.0, 0.003, 1.0, 300.0, 0.0, 90.0, 5778.0, 1.0, 1.0, 0.0, 4.4, 0.0]
-        },
-        "104-Input Kepler": {
-            'features': [
-                'koi_score', 'koi_fpflag_nt', 'koi_fpflag_ss', 'koi_fpflag_co', 'koi_fpflag_ec',
-                'koi_period', 'koi_period_err1', 'koi_period_err2', 'koi_time0bk', 'koi_time0bk_err1',
-                'koi_time0bk_err2', 'koi_time0', 'koi_time0_err1', 'koi_time0_err2', 'koi_eccen',
-                'koi_impact', 'koi_impact_err1', 'koi_impact_err2', 'koi_duration', 'koi_duration_err1',
-                'koi_duration_err2', 'koi_depth', 'koi_depth_err1', 'koi_depth_err2', 'koi_ror',
-                'koi_ror_err1', 'koi_ror_err2', 'koi_srho', 'koi_srho_err1', 'koi_srho_err2',
-                'koi_prad', 'koi_prad_err1', 'koi_prad_err2', 'koi_sma', 'koi_incl', 'koi_teq',
-                'koi_insol', 'koi_insol_err1', 'koi_insol_err2', 'koi_dor', 'koi_dor_err1', 'koi_dor_err2',
-                'koi_ldm_coeff4', 'koi_ldm_coeff3', 'koi_ldm_coeff2', 'koi_ldm_coeff1', 'koi_max_sngle_ev',
-                'koi_max_mult_ev', 'koi_model_snr', 'koi_count', 'koi_num_transits', 'koi_tce_plnt_num',
-                'koi_bin_oedp_sig', 'koi_steff', 'koi_steff_err1', 'koi_steff_err2', 'koi_slogg',
-                'koi_slogg_err1', 'koi_slogg_err2', 'koi_smet', 'koi_smet_err1', 'koi_smet_err2',
-                'koi_srad', 'koi_srad_err1', 'koi_srad_err2', 'koi_smass', 'koi_smass_err1', 'koi_smass_err2',
-                'ra', 'dec', 'koi_kepmag', 'koi_gmag', 'koi_rmag', 'koi_imag', 'koi_zmag', 'koi_jmag',
-                'koi_hmag', 'koi_kmag', 'koi_fwm_stat_sig', 'koi_fwm_sra', 'koi_fwm_sra_err', 'koi_fwm_sdec',
-                'koi_fwm_sdec_err', 'koi_fwm_srao', 'koi_fwm_srao_err', 'koi_fwm_sdeco', 'koi_fwm_sdeco_err',
-                'koi_fwm_prao', 'koi_fwm_prao_err', 'koi_fwm_pdeco', 'koi_fwm_pdeco_err', 'koi_dicco_mra',
-                'koi_dicco_mra_err', 'koi_dicco_mdec', 'koi_dicco_mdec_err', 'koi_dicco_msky', 'koi_dicco_msky_err',
-                'koi_dikco_mra', 'koi_dikco_mra_err', 'koi_dikco_mdec', 'koi_dikco_mdec_err', 'koi_dikco_msky',
-                'koi_dikco_msky_err', 'planet_star_ratio'
-            ],
-            'defaults': [0.5] * 104  # Default values for all 104 features
-        }
-    }
-    return feature_mappings.get(model_name, {'features': [], 'defaults': []})
-
 # Prediction function
 def predict_with_model(model_name, inputs):
     """Make prediction using the selected model"""
-    model_paths = {
-        "Kepler Model": "3 models for every mission/best_model_kepler.pkl",
-        "104-Input Kepler": "model kepler df new with 104 inputs/best_model.pkl",
-        "TESS Model": "3 models for every mission/best_model_tess.pkl",
-        "K2 Model": "3 models for every mission/best_model_k2.pkl"
-    }
-    
-    model_path = model_paths.get(model_name)
-    if not model_path:
+    with METRICS.timer('stage_seconds', stage='predict_with_model', model=model_name):
+        return _predict_with_model(model_name, inputs)
+
+def _predict_with_model(model_name, inputs):
+    full_path = get_model_path(model_name)
+    if full_path is None:
         return None, None, f"Model {model_name} not found"
     
-    # Construct full path
-    full_path = Path(__file__).parent / model_path
-    
     if not full_path.exists():
         return None, None, f"Model file not found: {full_path}"
     
+    # Bundled dataset rows are answered from the precomputed sidecar without loading the model
+    scores = get_precomputed_scores(model_name)
+    if scores is not None and get_feature_mapping(model_name)['features']:
+        try:
+            with METRICS.timer('stage_seconds', stage='feature_vector', model=model_name):
+                vector = build_input_vector(model_name, inputs)[0]
+            probabilities = scores.lookup(vector)
+        except Exception:
+            probabilities = None
+        METRICS.increment('events_total', event='precomputed_miss' if probabilities is None else 'precomputed_hit')
+        if probabilities is not None:
+            best = int(np.argmax(probabilities))
+            return scores.classes[best], float(probabilities[best] * 100), None
+    
     # Load model
-    model = load_model(full_path)
+    model = load_model(model_name)
     if model is None:
         return None, None, "Failed to load model"
     
     try:
-        # Get feature mapping for the model
-        feature_mapping = get_feature_mapping(model_name)
-        required_features = feature_mapping['features']
-        
-        if not required_features:
+        if not get_feature_mapping(model_name)['features']:
             return None, None, f"No feature mapping found for {model_name}"
         
         # Create input vector with correct features
-        input_vector = []
-        for feature, default_value in zip(required_features, feature_mapping['defaults']):
-            if feature in inputs:
-                input_vector.append(inputs[feature])
-            else:
-                input_vector.append(default_value)
-        
-        # Convert to numpy array and ensure proper data types
-        input_data = np.array(input_vector, dtype=np.float64).reshape(1, -1)
-        
-        # Make prediction
-        prediction = model.predict(input_data)[0]
+        with METRICS.timer('stage_seconds', stage='feature_vector', model=model_name):
+            input_data = build_input_vector(model_name, inputs)
         
-        # Get probabilities if available
+        # Derive the label from the probabilities so the model is only called once
         if hasattr(model, 'predict_proba'):
-            probabilities = model.predict_proba(input_data)[0]
-            confidence = float(max(probabilities) * 100)  # Convert to regular float
+            model_hash = file_hash(get_model_registry().get_entry(model_name).path)
+            
+            def compute():
+                with METRICS.timer('stage_seconds', stage='predict_proba', model=model_name):
+                    return get_batch_scheduler().predict(model_name, input_data[0])
+            
+            probabilities = get_prediction_cache().get_or_compute(model_hash, input_data[0], compute)
+            best = int(np.argmax(probabilities))
+            prediction = model.classes_[best]
+            confidence = float(probabilities[best] * 100)  # Convert to regular float
         else:
+            with METRICS.timer('stage_seconds', stage='predict', model=model_name):
+                prediction = model.predict(input_data)[0]
             confidence = 100.0 if prediction == 1 else 0.0
         
         return prediction, confidence, None
@@ -398,13 +450,67 @@ def predict_with_model(model_name, inputs):
     except Exception as e:
         return None, None, f"Prediction error: {str(e)}"
 
+# Ensemble prediction function
+def predict_ensemble(inputs):
+    """Score the inputs with all models at once and combine their calibrated probabilities"""
+    try:
+        return get_ensemble_predictor().predict(inputs), None
+    except Exception as e:
+        return None, f"Ensemble prediction error: {str(e)}"
+
+# Batch prediction function
+def predict_batch(model_name, data, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Score every row of a DataFrame with the selected model in vectorized chunks"""
+    full_path = get_model_path(model_name)
+    if full_path is None:
+        return None, f"Model {model_name} not found"
+    
+    if not full_path.exists():
+        return None, f"Model file not found: {full_path}"
+    
+    model = load_model(model_name)
+    if model is None:
+        return None, "Failed to load model"
+    
+    if not hasattr(model, 'predict_proba'):
+        return None, f"{model_name} does not provide class probabilities"
+    
+    try:
+        with METRICS.timer('stage_seconds', stage='batch_scoring', model=model_name):
+            return score_dataframe(model, model_name, data, chunk_size), None
+    except Exception as e:
+        return None, f"Batch prediction error: {str(e)}"
+
+# Whole-dataset evaluation, cached on disk by model and dataset file hash
+@st.cache_data(show_spinner="🧪 Evaluating model over its full dataset...")
+def _cached_model_evaluation(model_name, key):
+    return cached_evaluation(model_name, model=load_model(model_name))
+
+def get_model_evaluation(model_name):
+    """Return the measured evaluation for a model, or None if its files are missing"""
+    try:
+        return _cached_model_evaluation(model_name, evaluation_key(model_name))
+    except Exception:
+        return None
+
+# Measured held-out accuracy if an evaluation is already cached, falling back to
+# the notebook's recorded test accuracy; never loads a model on its own
+def get_model_accuracy(model_name):
+    try:
+        evaluation = load_cached_evaluation(model_name)
+    except Exception:
+        evaluation = None
+    if evaluation is not None:
+        return evaluation['holdout']['accuracy']
+    reported = reported_metrics(model_name)
+    return reported['accuracy'] if reported else None
+
 # Model information based on actual performance results
 def get_model_info(model_name):
     """Get information about each model based on actual performance results"""
     model_info = {
         "Kepler Model": {
             "description": "LightGBM model trained on Kepler mission dataset with 14 core features",
-            "accuracy": "74.3%",
             "features": "14 features including orbital and stellar parameters",
             "mission": "Kepler",
             "algorithm": "LightGBM",
@@ -413,7 +519,6 @@ def get_model_info(model_name):
         },
         "104-Input Kepler": {
             "description": "Advanced HistGradientBoosting model with comprehensive 104 features",
-            "accuracy": "94.5%",
             "features": "104 comprehensive features including all Kepler parameters",
             "mission": "Kepler Extended",
             "algorithm": "HistGradientBoosting",
@@ -422,7 +527,6 @@ def get_model_info(model_name):
         },
         "TESS Model": {
             "description": "XGBoost model trained on TESS mission dataset",
-            "accuracy": "69.2%",
             "features": "12 features including transit and stellar parameters",
             "mission": "TESS",
             "algorithm": "XGBoost",
@@ -431,7 +535,6 @@ def get_model_info(model_name):
         },
         "K2 Model": {
             "description": "LightGBM model trained on K2 mission dataset",
-            "accuracy": "78.8%",
             "features": "17 features including planetary and stellar characteristics",
             "mission": "K2",
             "algorithm": "LightGBM",
@@ -439,7 +542,56 @@ def get_model_info(model_name):
             "samples": "4,005 exoplanet candidates"
         }
     }
-    return model_info.get(model_name, {})
+    info = dict(model_info.get(model_name, {}))
+    accuracy = get_model_accuracy(model_name)
+    if info and accuracy is not None:
+        info['accuracy'] = f"{accuracy * 100:.1f}%"
+    return info
+
+# Prebuilt index over the 104-input samples, shared by all sessions
+@st.cache_resource
+def get_sample_index():
+    df_data, _ = load_104_input_data()
+    return SampleIndex(df_data)
+
+# Search and filter controls for the sample browser
+def render_sample_filters(index):
+    """Render the sample filters and return the matching row positions"""
+    with st.expander("🔎 Search & Filter Samples"):
+        query = st.text_input(
+            "Search",
+            key="sample_query",
+            help="Sample number, or text such as a disposition or period"
+        )
+        dispositions = st.multiselect(
+            "Disposition",
+            index.disposition_values,
+            key="sample_dispositions"
+        )
+        col1, col2 = st.columns(2)
+        with col1:
+            period_low = st.number_input(
+                "Min Orbital Period (days)",
+                min_value=0.0,
+                value=float(np.floor(index.period_range[0])),
+                key="sample_period_min"
+            )
+            period_high = st.number_input(
+                "Max Orbital Period (days)",
+                min_value=0.0,
+                value=float(np.ceil(index.period_range[1])),
+                key="sample_period_max"
+            )
+        with col2:
+            score_range = st.slider(
+                "KOI Score",
+                min_value=0.0,
+                max_value=1.0,
+                value=index.score_range,
+                step=0.01,
+                key="sample_score"
+            )
+    return index.filter(dispositions, (period_low, period_high), score_range, query)
 
 # Create input form based on selected model
 def create_input_form(model_name):
@@ -462,17 +614,37 @@ def create_input_form(model_name):
             </div>
             """, unsafe_allow_html=True)
             
+            # Search and filter the prebuilt sample index
+            index = get_sample_index()
+            matches = render_sample_filters(index)
+            
+            if len(matches) == 0:
+                st.warning("⚠️ No samples match the current filters.")
+                # Every feature is left to the model's fitted fill values
+                return inputs, None
+            
             # Data selection interface
             col1, col2 = st.columns([2, 1])
             
             with col1:
-                # Sample selection
+                # Sample selection from the current page only
+                page_count = SampleIndex.page_count(matches)
+                page_number = st.number_input(
+                    f"Page (1-{page_count})",
+                    min_value=1,
+                    max_value=page_count,
+                    value=1,
+                    step=1,
+                    key="sample_page"
+                ) if page_count > 1 else 1
+                page_positions = SampleIndex.page(matches, int(page_number))
                 sample_index = st.selectbox(
                     "Select a data sample:",
-                    range(len(df_data)),
-                    format_func=lambda x: f"Sample {x+1}: {df_data.iloc[x]['koi_disposition']} - Period: {df_data.iloc[x]['koi_period']:.2f} days",
+                    page_positions,
+                    format_func=lambda x: index.labels[x],
                     help="Choose from real Kepler data samples"
                 )
+                st.caption(f"{len(matches):,} of {index.size:,} samples match • page {int(page_number)} of {page_count}")
             
             with col2:
                 # Show sample info
@@ -514,9 +686,7 @@ def create_input_form(model_name):
             
         else:
             st.error("❌ Could not load the 104-input dataset. Please check the file path.")
-            # Fallback to default values
-            for feature, default_value in zip(feature_mapping['features'], feature_mapping['defaults']):
-                inputs[feature] = default_value
+            # Fall back to the model's fitted fill values for every feature
             return inputs, None
         
     else:
@@ -620,15 +790,513 @@ def create_input_form(model_name):
             )
         
         # Map common inputs to model-specific features
-        for feature, default_value in zip(feature_mapping['features'], feature_mapping['defaults']):
+        for feature in feature_mapping['features']:
             if feature in common_inputs:
                 inputs[feature] = common_inputs[feature]
-            else:
-                # Use default value for features not in common inputs
-                inputs[feature] = default_value
+        # Features not in common inputs are filled by the model's fitted preprocessing
         
         return inputs, None
 
+# Ensemble results section
+def render_ensemble_result(result):
+    """Show the combined disposition and how each model contributed to it"""
+    st.markdown("### 🔗 Ensemble Prediction")
+    
+    if result['prediction'] == "Confirmed":
+        st.success("🪐 **EXOPLANET DETECTED!**")
+    elif result['prediction'] == "Candidate":
+        st.info("🔭 **PLANET CANDIDATE**")
+    else:
+        st.warning("⚠️ **FALSE POSITIVE DETECTED**")
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Combined Disposition", result['prediction'])
+    col2.metric("Ensemble Confidence", f"{result['confidence']:.1f}%")
+    col3.metric("Models Scored", f"{len(result['models'])} in {result['latency_ms']:.0f} ms")
+    
+    rows = [
+        {'Model': m['model'], 'Prediction': m['label'],
+         **{f"{c} (%)": round(m['probabilities'][c] * 100, 1) for c in ENSEMBLE_CLASSES},
+         'Weight (%)': round(m['weight'] * 100, 1), 'Temperature': round(m['temperature'], 2),
+         'Latency (ms)': round(m['latency_ms'], 1)}
+        for m in result['models']
+    ]
+    rows.append({'Model': 'Ensemble', 'Prediction': result['prediction'],
+                 **{f"{c} (%)": round(result['probabilities'][c] * 100, 1) for c in ENSEMBLE_CLASSES}})
+    df_models = pd.DataFrame(rows)
+    
+    import plotly.express as px
+    with METRICS.timer('stage_seconds', stage='chart', chart='ensemble_models'):
+        fig_models = px.bar(
+            df_models.melt(id_vars='Model', value_vars=[f"{c} (%)" for c in ENSEMBLE_CLASSES],
+                           var_name='Disposition', value_name='Probability (%)'),
+            x='Model',
+            y='Probability (%)',
+            color='Disposition',
+            title="Calibrated Probabilities per Model",
+            color_discrete_sequence=['#00ff00', '#ffff00', '#ff6b6b']
+        )
+        fig_models.update_layout(
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font_color='white',
+            title_font_color='white'
+        )
+        st.plotly_chart(fig_models, use_container_width=True)
+    
+    st.dataframe(df_models, use_container_width=True, hide_index=True)
+    st.caption("Inputs are mapped to each model's features by name; models are weighted by the share of their features you supplied.")
+    for model_name, error in result['errors'].items():
+        st.warning(f"⚠️ {model_name} was skipped: {error}")
+
+# Number of features shown in the contribution chart
+EXPLANATION_TOP_FEATURES = 10
+
+# Per-prediction explanation section
+def render_explanation(model_name, inputs, prediction):
+    """Show which inputs pushed the prediction towards or away from its class"""
+    try:
+        with METRICS.timer('stage_seconds', stage='explain', model=model_name):
+            explainer = get_explainer(model_name)
+            contributions, expected = explainer.explanation_frame(build_input_vector(model_name, inputs)[0], prediction)
+    except Exception as e:
+        st.warning(f"⚠️ Explanation unavailable: {str(e)}")
+        return
+    
+    label = class_names(model_name, [prediction])[0]
+    st.markdown("### 🔍 Why This Prediction?")
+    st.caption(f"SHAP contributions to the {label} score (log-odds). Starting from the baseline of {expected:.2f}, "
+               "green inputs pushed the candidate towards this class and red ones away from it.")
+    
+    top = contributions.head(EXPLANATION_TOP_FEATURES).iloc[::-1].copy()
+    top['Effect'] = np.where(top['Contribution'] >= 0, 'Towards', 'Away')
+    import plotly.express as px
+    with METRICS.timer('stage_seconds', stage='chart', chart='explanation'):
+        fig_explanation = px.bar(
+            top,
+            x='Contribution',
+            y='Feature',
+            orientation='h',
+            color='Effect',
+            color_discrete_map={'Towards': '#00ff00', 'Away': '#ff6b6b'},
+            hover_data={'Value': ':.4g'},
+            title=f"Top {len(top)} Feature Contributions"
+        )
+        fig_explanation.update_layout(
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font_color='white',
+            title_font_color='white'
+        )
+        st.plotly_chart(fig_explanation, use_container_width=True)
+    
+    with st.expander("All feature contributions"):
+        st.dataframe(contributions, use_container_width=True, hide_index=True)
+
+# Number of similar known objects listed under a prediction
+SIMILAR_PLANETS_SHOWN = 5
+
+# Similar known objects section
+def render_similar_planets(model_name, inputs):
+    """List the catalog objects closest to the entered candidate"""
+    try:
+        with METRICS.timer('stage_seconds', stage='similar_planets'):
+            similar = get_similar_planets().similar(inputs, k=SIMILAR_PLANETS_SHOWN)
+    except Exception as e:
+        st.warning(f"⚠️ Similar objects unavailable: {str(e)}")
+        return
+    st.markdown("### 🪐 Similar Known Objects")
+    if similar.empty:
+        st.info("No catalog object shares enough of these inputs to compare.")
+        return
+    st.caption(f"Closest {' / '.join(CATALOGS)} catalog objects by period, radius, insolation, temperatures "
+               "and stellar properties, compared on standardized (log for heavy-tailed values) scales.")
+    st.dataframe(similar.round(4), use_container_width=True, hide_index=True)
+
+# Colours of the dataset overview charts, one per disposition
+DISPOSITION_COLORS = ['#00ffff', '#ff00ff', '#ffff00', '#00ff00', '#ff6b6b', '#ffa500']
+
+def _style_figure(fig):
+    fig.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font_color='white',
+        title_font_color='white'
+    )
+    return fig
+
+# Dataset overview figures, built from fixed-size aggregates once per dataset
+# version and shared by every session
+@st.cache_resource(show_spinner="📊 Summarizing dataset...")
+def _dataset_figures(model_name, dataset_hash):
+    import plotly.graph_objects as go
+    aggregates = load_aggregates(model_name)
+    dispositions = list(aggregates['dispositions'])
+    colors = {label: DISPOSITION_COLORS[i % len(DISPOSITION_COLORS)] for i, label in enumerate(dispositions)}
+    figures = {}
+
+    figures['dispositions'] = _style_figure(go.Figure(
+        go.Bar(x=dispositions, y=list(aggregates['dispositions'].values()),
+               marker_color=[colors[label] for label in dispositions]),
+        layout=dict(title=f"Dispositions ({aggregates['rows']:,} rows)")
+    ))
+
+    for column, histogram in aggregates['histograms'].items():
+        edges = np.asarray(histogram['edges'])
+        centers = np.sqrt(edges[:-1] * edges[1:]) if histogram['log'] else (edges[:-1] + edges[1:]) / 2
+        fig = go.Figure(
+            [go.Bar(x=centers, y=counts, width=np.diff(edges), name=label, marker_color=colors[label])
+             for label, counts in histogram['counts'].items()],
+            layout=dict(title=histogram['title'], barmode='stack', bargap=0)
+        )
+        fig.update_xaxes(type='log' if histogram['log'] else 'linear', title=histogram['title'])
+        figures[f"histogram:{column}"] = _style_figure(fig)
+
+    density = aggregates['density']
+    fig = go.Figure(
+        go.Heatmap(x=density['x_edges'], y=density['y_edges'], z=np.log10(np.asarray(density['counts']) + 1),
+                   colorscale='viridis', colorbar=dict(title="log10(rows+1)")),
+        layout=dict(title=f"{density['y_title']} vs {density['x_title']} (density)")
+    )
+    fig.update_xaxes(type='log' if density['x_log'] else 'linear', title=density['x_title'])
+    fig.update_yaxes(type='log' if density['y_log'] else 'linear', title=density['y_title'])
+    figures['density'] = _style_figure(fig)
+
+    scatter = aggregates['scatter']
+    points = pd.DataFrame(scatter).drop(columns='rows')
+    fig = go.Figure(
+        [go.Scattergl(x=group['x'], y=group['y'], mode='markers', name=label,
+                      marker=dict(size=np.clip(3 + 2 * np.log2(group['weight']), 3, 14), color=colors[label], opacity=0.7),
+                      customdata=group['weight'], hovertemplate="%{x:.4g}, %{y:.4g}<br>%{customdata} rows")
+         for label, group in points.groupby('disposition')],
+        layout=dict(title=f"{density['y_title']} vs {density['x_title']} "
+                          f"({len(points):,} of {scatter['rows']:,} rows shown)")
+    )
+    fig.update_xaxes(type='log' if density['x_log'] else 'linear', title=density['x_title'])
+    fig.update_yaxes(type='log' if density['y_log'] else 'linear', title=density['y_title'])
+    figures['scatter'] = _style_figure(fig)
+    return figures
+
+# Dataset overview section
+def render_dataset_overview(model_name):
+    """Chart the selected model's training dataset from its precomputed aggregates"""
+    try:
+        dataset_path = get_dataset_path(model_name)
+        with METRICS.timer('stage_seconds', stage='chart', chart='dataset_overview'):
+            figures = _dataset_figures(model_name, file_hash(dataset_path))
+    except Exception as e:
+        st.warning(f"⚠️ Dataset overview unavailable: {str(e)}")
+        return
+
+    st.markdown("### 🗂️ Dataset Overview")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(figures['dispositions'], use_container_width=True)
+    with col2:
+        histograms = {figure.layout.title.text: key for key, figure in figures.items() if key.startswith('histogram:')}
+        column = st.selectbox("Distribution", list(histograms), key=f"overview_histogram_{model_name}")
+        st.plotly_chart(figures[histograms[column]], use_container_width=True)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(figures['density'], use_container_width=True)
+    with col2:
+        st.plotly_chart(figures['scatter'], use_container_width=True)
+    st.caption("Scatter points stand for every row in their grid cell and disposition; larger markers represent more rows.")
+
+# Batch scoring section
+def render_batch_scoring(model_name):
+    """Score an uploaded CSV or the model's bundled dataset in one vectorized pass"""
+    st.markdown("---")
+    st.markdown("### 📂 Batch Scoring")
+    st.markdown("Score thousands of KOI/TOI rows at once. Columns are matched by name to the model's features; missing columns use the model defaults.")
+    
+    source = st.radio(
+        "Data source:",
+        ["Upload CSV", "Bundled dataset"],
+        horizontal=True,
+        key="batch_source",
+        help="Upload a candidate file or score the dataset the model was trained on"
+    )
+    
+    data = None
+    if source == "Upload CSV":
+        uploaded_file = st.file_uploader("Candidate CSV file", type=["csv"], key="batch_upload")
+        if uploaded_file is not None:
+            data = pd.read_csv(uploaded_file)
+    else:
+        dataset_path = get_dataset_path(model_name)
+        if dataset_path is not None and dataset_path.exists():
+            data = load_model_dataset(model_name)
+        else:
+            st.error(f"Dataset file not found: {dataset_path}")
+    
+    if data is None:
+        return
+    
+    st.caption(f"{len(data):,} rows loaded")
+    
+    if st.button("🚀 RUN BATCH SCORING", key="batch_run"):
+        with st.spinner(f"🔍 Scoring {len(data):,} candidates..."):
+            results, error = predict_batch(model_name, data)
+        if error:
+            st.error(f"❌ {error}")
+            return
+        st.session_state['batch_results'] = (model_name, data.join(results, rsuffix='_pred'))
+    
+    stored = st.session_state.get('batch_results')
+    if stored is None or stored[0] != model_name:
+        return
+    scored = stored[1]
+    
+    label_counts = scored['predicted_label'].value_counts()
+    cols = st.columns(min(len(label_counts), 4) or 1)
+    for i, (label, count) in enumerate(label_counts.items()):
+        cols[i % len(cols)].metric(label, f"{count:,}", f"{count / len(scored) * 100:.1f}%")
+    
+    st.dataframe(scored.head(1000), use_container_width=True)
+    if len(scored) > 1000:
+        st.caption(f"Showing the first 1,000 of {len(scored):,} rows. Download for the full results.")
+    
+    st.download_button(
+        "⬇️ Download predictions (CSV)",
+        data=scored.to_csv(index=False).encode('utf-8'),
+        file_name=f"{model_name.lower().replace(' ', '_')}_predictions.csv",
+        mime="text/csv",
+        key="batch_download"
+    )
+
+# What-if sensitivity sweep section
+def render_sensitivity_sweep(model_name, inputs):
+    """Chart how the prediction responds to one or two inputs swept over their training range"""
+    st.markdown("---")
+    st.markdown("### 🎚️ What-If Sweep")
+    st.markdown("Vary one or two inputs over their training range while the others keep their current values.")
+    
+    features = sweep_features(model_name)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        first = st.selectbox("Sweep feature", features, key=f"sweep_first_{model_name}")
+    with col2:
+        second = st.selectbox("Second feature (optional)", ["None"] + [f for f in features if f != first],
+                              key=f"sweep_second_{model_name}")
+    with col3:
+        points = st.slider("Grid points per feature", 20, 400, SWEEP_POINTS, step=20, key=f"sweep_points_{model_name}")
+    
+    if st.button("🎚️ RUN SWEEP", key="sweep_run"):
+        try:
+            dataset_path = get_dataset_path(model_name)
+            ranges = _feature_ranges(model_name, file_hash(dataset_path)) if dataset_path.exists() else {}
+            axes = []
+            for feature in [first] + ([second] if second != "None" else []):
+                current = pd.to_numeric(inputs.get(feature), errors='coerce')
+                low, high = ranges.get(feature, (current * 0.5, current * 2) if pd.notna(current) else (0.0, 1.0))
+                axes.append((feature, sweep_values(low, high, current, points)))
+            with METRICS.timer('stage_seconds', stage='sweep', model=model_name, axes=len(axes)):
+                model = _load_sweep_model(model_name, file_hash(get_model_path(model_name)))
+                result = sweep(model, model_name, inputs, axes)
+        except Exception as e:
+            st.error(f"❌ Sweep error: {str(e)}")
+            return
+        st.session_state['sweep_results'] = (model_name, result, {f: inputs.get(f) for f in result['features']})
+    
+    stored = st.session_state.get('sweep_results')
+    if stored is None or stored[0] != model_name:
+        return
+    result, current = stored[1], stored[2]
+    values, probabilities, classes = result['values'], result['probabilities'], result['classes']
+    log_axes = [log_spaced(v) for v in values]
+    st.caption(f"{probabilities[..., 0].size:,} grid points scored in {result['seconds'] * 1000:.0f} ms")
+    
+    import plotly.graph_objects as go
+    if len(values) == 1:
+        feature = result['features'][0]
+        with METRICS.timer('stage_seconds', stage='chart', chart='sweep_curve'):
+            fig = go.Figure(
+                [go.Scatter(x=values[0], y=probabilities[:, i] * 100, mode='lines', name=name)
+                 for i, name in enumerate(classes)],
+                layout=dict(title=f"Class probability vs {feature}", yaxis_title="Probability (%)", xaxis_title=feature)
+            )
+            current_value = pd.to_numeric(current.get(feature), errors='coerce')
+            if pd.notna(current_value):
+                fig.add_vline(x=float(current_value), line_dash='dash', line_color='white')
+    else:
+        target = st.selectbox("Class shown", classes, key=f"sweep_class_{model_name}")
+        index = classes.index(target)
+        with METRICS.timer('stage_seconds', stage='chart', chart='sweep_surface'):
+            fig = go.Figure(
+                go.Heatmap(x=values[0], y=values[1], z=probabilities[:, :, index] * 100, colorscale='viridis',
+                           colorbar=dict(title="%")),
+                layout=dict(title=f"{target} probability", xaxis_title=result['features'][0],
+                            yaxis_title=result['features'][1])
+            )
+            marker = [pd.to_numeric(current.get(f), errors='coerce') for f in result['features']]
+            if all(pd.notna(marker)):
+                fig.add_trace(go.Scatter(x=[marker[0]], y=[marker[1]], mode='markers', name="Current input",
+                                         marker=dict(color='white', size=12, symbol='x')))
+    fig.update_xaxes(type='log' if log_axes[0] else 'linear')
+    if len(values) == 2:
+        fig.update_yaxes(type='log' if log_axes[1] else 'linear')
+    st.plotly_chart(_style_figure(fig), use_container_width=True)
+
+# Whole-dataset evaluation section
+def render_model_evaluation(model_name):
+    """Show measured metrics for the selected model over its entire dataset"""
+    st.markdown(f"### 🧪 Whole-Dataset Evaluation - {model_name}")
+    
+    evaluation = get_model_evaluation(model_name)
+    if evaluation is None:
+        st.info(f"ℹ️ Dataset for {model_name} is not available, so it cannot be evaluated here.")
+        return
+    
+    split = st.radio(
+        "Evaluation set:",
+        ["Held-out split", "Full dataset"],
+        horizontal=True,
+        key="evaluation_split",
+        help="The held-out split matches the notebook's 30% test set; the full dataset includes training rows"
+    )
+    metrics = evaluation['holdout'] if split == "Held-out split" else evaluation['full']
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Accuracy", f"{metrics['accuracy'] * 100:.1f}%")
+    col2.metric("ROC-AUC (OvR)", f"{metrics['auc']:.3f}" if metrics['auc'] is not None else "N/A")
+    col3.metric("Samples Scored", f"{metrics['rows']:,}")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        import plotly.express as px
+        with METRICS.timer('stage_seconds', stage='chart', chart='confusion_matrix'):
+            fig_confusion = px.imshow(
+                metrics['confusion_matrix'],
+                x=evaluation['classes'],
+                y=evaluation['classes'],
+                labels={'x': 'Predicted', 'y': 'Actual', 'color': 'Samples'},
+                text_auto=True,
+                color_continuous_scale='viridis',
+                title="Confusion Matrix"
+            )
+            fig_confusion.update_layout(
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font_color='white',
+                title_font_color='white'
+            )
+            st.plotly_chart(fig_confusion, use_container_width=True)
+    
+    with col2:
+        per_class = pd.DataFrame(metrics['per_class'])
+        per_class['recall'] = (per_class['recall'] * 100).round(1)
+        per_class['precision'] = (per_class['precision'] * 100).round(1)
+        st.markdown("#### Per-Disposition Breakdown")
+        st.dataframe(
+            per_class.rename(columns={
+                'disposition': 'Disposition', 'support': 'Actual', 'predicted': 'Predicted',
+                'recall': 'Recall (%)', 'precision': 'Precision (%)'
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+    
+    st.caption(f"Scored in {evaluation['seconds'] * 1000:.0f} ms • recomputed automatically when the model or dataset file changes")
+
+# Rolling window choices for the live performance tab, in seconds
+PERFORMANCE_WINDOWS = {"Last 5 minutes": 300, "Last 15 minutes": 900, "Last hour": 3600, "All recent samples": None}
+
+def _hit_rate(hits, misses):
+    lookups = hits + misses
+    return f"{hits / lookups * 100:.1f}%" if lookups else "N/A"
+
+# Live performance section
+def render_performance_panel():
+    """Show rolling latency histograms per hot-path stage and cache hit rates for this server process"""
+    st.markdown("### ⏱️ Live Performance")
+    st.markdown("Latency of every instrumented stage in this server process, across all sessions: model and dataset loads, feature vector assembly, model calls and chart rendering.")
+    
+    col1, col2 = st.columns([3, 1])
+    window = col1.selectbox("Window:", list(PERFORMANCE_WINDOWS), key="performance_window")
+    auto_refresh = col2.toggle("Auto-refresh (5 s)", key="performance_refresh")
+    
+    @st.fragment(run_every=5 if auto_refresh else None)
+    def live_metrics():
+        # Cache hit rates
+        cache_stats = get_prediction_cache().stats()
+        events = {dict(pairs).get('event'): value for pairs, value in METRICS.counters('events_total').items()}
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("⚡ Prediction Cache Hit Rate", _hit_rate(cache_stats['hits'], cache_stats['misses']))
+        col2.metric("📦 Precomputed Score Hit Rate", _hit_rate(events.get('precomputed_hit', 0), events.get('precomputed_miss', 0)))
+        col3.metric("Cached Predictions", f"{cache_stats['entries']:,} / {cache_stats['max_entries']:,}")
+        col4.metric("Cache Evictions", f"{cache_stats['evictions'] + cache_stats['expirations']:,}")
+        
+        series = METRICS.recent('stage_seconds', window_seconds=PERFORMANCE_WINDOWS[window])
+        rows = []
+        samples = []
+        for pairs, seconds in series.items():
+            if not len(seconds):
+                continue
+            labels = dict(pairs)
+            stage = labels.pop('stage', '')
+            target = ', '.join(labels.values())
+            rows.append({'Stage': stage, 'Model / Chart': target, **summarize(seconds)})
+            samples.append(pd.DataFrame({'Stage': stage, 'Latency (ms)': seconds * 1000}))
+        if not rows:
+            st.info("ℹ️ No samples in this window yet. Run a prediction or open a chart to record some.")
+            return
+        
+        summary = pd.DataFrame(rows).sort_values(['Stage', 'Model / Chart'])
+        st.dataframe(
+            summary.rename(columns={
+                'count': 'Calls', 'mean_ms': 'Mean (ms)', 'p50_ms': 'p50 (ms)', 'p95_ms': 'p95 (ms)', 'p99_ms': 'p99 (ms)'
+            }).round(3),
+            use_container_width=True,
+            hide_index=True
+        )
+        
+        # Rolling latency histogram (log scale: cache hits and cold loads differ by orders of magnitude)
+        import plotly.express as px
+        stages = sorted(summary['Stage'].unique())
+        selected = st.multiselect("Stages:", stages, default=stages, key="performance_stages")
+        latencies = pd.concat(samples, ignore_index=True)
+        latencies = latencies[latencies['Stage'].isin(selected)]
+        if latencies.empty:
+            return
+        latencies['log10 Latency (ms)'] = np.log10(latencies['Latency (ms)'].clip(lower=1e-3))
+        fig_latency = px.histogram(
+            latencies,
+            x='log10 Latency (ms)',
+            color='Stage',
+            nbins=60,
+            barmode='overlay',
+            opacity=0.7,
+            title="Latency Distribution by Stage (log10 ms)"
+        )
+        fig_latency.update_layout(
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font_color='white',
+            title_font_color='white'
+        )
+        st.plotly_chart(fig_latency, use_container_width=True)
+    
+    live_metrics()
+    
+    # Exports for dashboards and offline analysis
+    col1, col2 = st.columns(2)
+    col1.download_button(
+        "⬇️ Download metrics (Prometheus text)",
+        data=METRICS.to_prometheus().encode('utf-8'),
+        file_name="astrovision_metrics.prom",
+        mime="text/plain",
+        key="metrics_prometheus"
+    )
+    col2.download_button(
+        "⬇️ Download metrics (JSON)",
+        data=json.dumps(METRICS.snapshot(), indent=2).encode('utf-8'),
+        file_name="astrovision_metrics.json",
+        mime="application/json",
+        key="metrics_json"
+    )
+
 # Main app
 def main():
     # Add space theme and background
@@ -684,254 +1352,319 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
-    # Main content tabs
-    tab1, tab2, tab3 = st.tabs(["🚀 AI Prediction", "📚 Model Information", "📊 Performance Analytics"])
+    # Main content tabs; only the open tab runs, so charts and evaluations in
+    # hidden tabs don't load plotly or the models
+    tab1, tab2, tab3, tab4 = st.tabs(
+        ["🚀 AI Prediction", "📚 Model Information", "📊 Performance Analytics", "⏱️ Live Performance"],
+        key="active_tab",
+        on_change="rerun"
+    )
     
     with tab1:
-        # Create dynamic input form based on selected model
-        inputs, selected_sample = create_input_form(selected_model)
-        
-        # Prediction button
-        if st.button("🚀 LAUNCH AI PREDICTION", type="primary"):
-            # Make prediction
-            with st.spinner("🔍 AI Neural Networks Processing... Scanning Stellar Data... Analyzing Transit Patterns..."):
-                prediction, confidence, error = predict_with_model(selected_model, inputs)
+        if tab1.open:
+            # Create dynamic input form based on selected model
+            inputs, selected_sample = create_input_form(selected_model)
+        
+            ensemble_mode = st.toggle(
+                "🔗 Ensemble mode - score these inputs with all four models",
+                key="ensemble_mode",
+                help="Maps the inputs onto every model's features and combines their calibrated probabilities"
+            )
             
-            if error:
-                st.error(f"❌ {error}")
-            else:
-                # Display results
-                st.markdown("""
-                <div class="prediction-result">
-                """, unsafe_allow_html=True)
+            # Prediction button
+            launched = st.button("🚀 LAUNCH AI PREDICTION", type="primary")
+            if launched and ensemble_mode:
+                with st.spinner("🔍 Running every mission model on your inputs..."):
+                    ensemble_result, error = predict_ensemble(inputs)
+                
+                if error:
+                    st.error(f"❌ {error}")
+                else:
+                    render_ensemble_result(ensemble_result)
+            elif launched:
+                # Make prediction
+                with st.spinner("🔍 AI Neural Networks Processing... Scanning Stellar Data... Analyzing Transit Patterns..."):
+                    prediction, confidence, error = predict_with_model(selected_model, inputs)
+            
+                if error:
+                    st.error(f"❌ {error}")
+                else:
+                    # Display results
+                    st.markdown("""
+                    <div class="prediction-result">
+                    """, unsafe_allow_html=True)
                 
-                # Status indicator
-                st.markdown("""
-                <div style="text-align: center; margin-bottom: 1rem;">
-                    <div style="display: inline-block; padding: 0.5rem 1rem; background: rgba(0, 255, 0, 0.2); border: 1px solid #00ff00; border-radius: 20px; color: #00ff00; font-weight: bold;">
-                        ✅ ANALYSIS COMPLETE
+                    # Status indicator
+                    st.markdown("""
+                    <div style="text-align: center; margin-bottom: 1rem;">
+                        <div style="display: inline-block; padding: 0.5rem 1rem; background: rgba(0, 255, 0, 0.2); border: 1px solid #00ff00; border-radius: 20px; color: #00ff00; font-weight: bold;">
+                            ✅ ANALYSIS COMPLETE
+                        </div>
                     </div>
-                </div>
-                """, unsafe_allow_html=True)
+                    """, unsafe_allow_html=True)
                 
-                # Show actual vs predicted comparison for 104-input model
-                if selected_model == "104-Input Kepler" and selected_sample is not None:
-                    st.markdown("### 🔍 Actual vs Predicted Comparison")
-                    col1, col2 = st.columns(2)
+                    # Show actual vs predicted comparison for 104-input model
+                    if selected_model == "104-Input Kepler" and selected_sample is not None:
+                        st.markdown("### 🔍 Actual vs Predicted Comparison")
+                        col1, col2 = st.columns(2)
                     
-                    with col1:
-                        actual_disposition = selected_sample['koi_disposition']
-                        st.metric("Actual Disposition", actual_disposition, help="Real classification from Kepler data")
+                        with col1:
+                            actual_disposition = selected_sample['koi_disposition']
+                            st.metric("Actual Disposition", actual_disposition, help="Real classification from Kepler data")
                     
-                    with col2:
-                        predicted_text = "EXOPLANET DETECTED" if prediction == 1 else "FALSE POSITIVE DETECTED"
-                        st.metric("AI Prediction", predicted_text, help="Model's prediction")
+                        with col2:
+                            predicted_text = "EXOPLANET DETECTED" if prediction == 1 else "FALSE POSITIVE DETECTED"
+                            st.metric("AI Prediction", predicted_text, help="Model's prediction")
                     
-                    # Show if prediction matches actual
-                    if (prediction == 1 and actual_disposition == "CONFIRMED") or (prediction == 0 and actual_disposition in ["FALSE POSITIVE", "CANDIDATE"]):
-                        st.success("🎯 Prediction matches actual classification!")
-                    else:
-                        st.warning("⚠️ Prediction differs from actual classification")
+                        # Show if prediction matches actual
+                        if (prediction == 1 and actual_disposition == "CONFIRMED") or (prediction == 0 and actual_disposition in ["FALSE POSITIVE", "CANDIDATE"]):
+                            st.success("🎯 Prediction matches actual classification!")
+                        else:
+                            st.warning("⚠️ Prediction differs from actual classification")
                 
-                # Prediction result
-                if prediction == 1:
-                    st.success("🪐 **EXOPLANET DETECTED!**")
-                    result_text = "🎉 This appears to be a genuine exoplanet candidate!"
-                    result_color = "#00ff00"
-                else:
-                    st.warning("⚠️ **FALSE POSITIVE DETECTED**")
-                    result_text = "🔍 This appears to be a false positive signal."
-                    result_color = "#ff6b6b"
-                
-                st.markdown(f"<p style='font-size: 1.2rem; color: {result_color};'>{result_text}</p>", unsafe_allow_html=True)
+                    # Prediction result
+                    if prediction == 1:
+                        st.success("🪐 **EXOPLANET DETECTED!**")
+                        result_text = "🎉 This appears to be a genuine exoplanet candidate!"
+                        result_color = "#00ff00"
+                    else:
+                        st.warning("⚠️ **FALSE POSITIVE DETECTED**")
+                        result_text = "🔍 This appears to be a false positive signal."
+                        result_color = "#ff6b6b"
                 
-                # Confidence score - convert to regular float for st.progress()
-                confidence_float = float(confidence)  # Ensure it's regular float
-                st.markdown(f"""
-                <div style="text-align: center; margin: 1.5rem 0;">
-                    <h3 style="color: #ffffff; font-family: 'Orbitron', sans-serif; margin-bottom: 0.5rem;">
-                        🎯 AI Confidence Score
-                    </h3>
-                    <h2 style="color: #ffffff; font-size: 2.5rem; margin: 0; text-shadow: 0 0 10px rgba(255, 255, 255, 0.5);">
-                        {confidence_float:.1f}%
-                    </h2>
-                </div>
-                """, unsafe_allow_html=True)
+                    st.markdown(f"<p style='font-size: 1.2rem; color: {result_color};'>{result_text}</p>", unsafe_allow_html=True)
                 
-                # Enhanced progress bar
-                progress_container = st.container()
-                with progress_container:
+                    # Confidence score - convert to regular float for st.progress()
+                    confidence_float = float(confidence)  # Ensure it's regular float
                     st.markdown(f"""
-                    <div style="background: rgba(255, 255, 255, 0.1); border-radius: 25px; padding: 0.3rem; margin: 1rem 0;">
-                        <div style="background: #ffffff; border-radius: 20px; height: 20px; width: {confidence_float}%; transition: width 2s ease;"></div>
+                    <div style="text-align: center; margin: 1.5rem 0;">
+                        <h3 style="color: #ffffff; font-family: 'Orbitron', sans-serif; margin-bottom: 0.5rem;">
+                            🎯 AI Confidence Score
+                        </h3>
+                        <h2 style="color: #ffffff; font-size: 2.5rem; margin: 0; text-shadow: 0 0 10px rgba(255, 255, 255, 0.5);">
+                            {confidence_float:.1f}%
+                        </h2>
                     </div>
                     """, unsafe_allow_html=True)
                 
-                st.markdown("""
-                </div>
-                """, unsafe_allow_html=True)
+                    # Enhanced progress bar
+                    progress_container = st.container()
+                    with progress_container:
+                        st.markdown(f"""
+                        <div style="background: rgba(255, 255, 255, 0.1); border-radius: 25px; padding: 0.3rem; margin: 1rem 0;">
+                            <div style="background: #ffffff; border-radius: 20px; height: 20px; width: {confidence_float}%; transition: width 2s ease;"></div>
+                        </div>
+                        """, unsafe_allow_html=True)
                 
-                # Probability chart
-                col1, col2 = st.columns(2)
+                    st.markdown("""
+                    </div>
+                    """, unsafe_allow_html=True)
+                
+                    # Probability chart (plotly is only imported once a chart is drawn)
+                    import plotly.express as px
+                    col1, col2 = st.columns(2)
                 
-                with col1:
-                    # Bar chart
-                    prob_data = pd.DataFrame({
-                        'Category': ['False Positive', 'Exoplanet'],
-                        'Probability': [100-confidence_float, confidence_float]
-                    })
+                    with col1:
+                        # Bar chart
+                        prob_data = pd.DataFrame({
+                            'Category': ['False Positive', 'Exoplanet'],
+                            'Probability': [100-confidence_float, confidence_float]
+                        })
                     
-                    fig_bar = px.bar(
-                        prob_data, 
-                        x='Category', 
-                        y='Probability',
-                        color='Category',
-                        color_discrete_map={'False Positive': '#ff6b6b', 'Exoplanet': '#00ff00'},
-                        title="Prediction Probabilities"
-                    )
-                    fig_bar.update_layout(
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        font_color='white',
-                        title_font_color='white'
-                    )
-                    st.plotly_chart(fig_bar, use_container_width=True)
+                        with METRICS.timer('stage_seconds', stage='chart', chart='prediction_bar'):
+                            fig_bar = px.bar(
+                                prob_data, 
+                                x='Category', 
+                                y='Probability',
+                                color='Category',
+                                color_discrete_map={'False Positive': '#ff6b6b', 'Exoplanet': '#00ff00'},
+                                title="Prediction Probabilities"
+                            )
+                            fig_bar.update_layout(
+                                plot_bgcolor='rgba(0,0,0,0)',
+                                paper_bgcolor='rgba(0,0,0,0)',
+                                font_color='white',
+                                title_font_color='white'
+                            )
+                            st.plotly_chart(fig_bar, use_container_width=True)
                 
-                with col2:
-                    # Pie chart
-                    fig_pie = px.pie(
-                        prob_data,
-                        values='Probability',
-                        names='Category',
-                        color_discrete_map={'False Positive': '#ff6b6b', 'Exoplanet': '#00ff00'},
-                        title="Probability Distribution"
-                    )
-                    fig_pie.update_layout(
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        font_color='white',
-                        title_font_color='white'
-                    )
-                    st.plotly_chart(fig_pie, use_container_width=True)
+                    with col2:
+                        # Pie chart
+                        with METRICS.timer('stage_seconds', stage='chart', chart='prediction_pie'):
+                            fig_pie = px.pie(
+                                prob_data,
+                                values='Probability',
+                                names='Category',
+                                color_discrete_map={'False Positive': '#ff6b6b', 'Exoplanet': '#00ff00'},
+                                title="Probability Distribution"
+                            )
+                            fig_pie.update_layout(
+                                plot_bgcolor='rgba(0,0,0,0)',
+                                paper_bgcolor='rgba(0,0,0,0)',
+                                font_color='white',
+                                title_font_color='white'
+                            )
+                            st.plotly_chart(fig_pie, use_container_width=True)
+                    
+                    render_explanation(selected_model, inputs, prediction)
+                    render_similar_planets(selected_model, inputs)
+        
+            render_sensitivity_sweep(selected_model, inputs)
+            render_batch_scoring(selected_model)
     
     with tab2:
-        st.markdown("### 📚 About the AI Models")
-        
-        models = ["104-Input Kepler", "Kepler Model", "K2 Model", "TESS Model"]
-        
-        for model in models:
-            info = get_model_info(model)
-            feature_mapping = get_feature_mapping(model)
-            st.markdown(f"""
-            <div class="model-info">
-                <h3>🛸 {model}</h3>
-                <p><strong>Description:</strong> {info.get('description', 'N/A')}</p>
-                <p><strong>Mission:</strong> {info.get('mission', 'N/A')}</p>
-                <p><strong>Algorithm:</strong> {info.get('algorithm', 'N/A')}</p>
-                <p><strong>Accuracy:</strong> {info.get('accuracy', 'N/A')}</p>
-                <p><strong>Dataset:</strong> {info.get('dataset', 'N/A')}</p>
-                <p><strong>Training Samples:</strong> {info.get('samples', 'N/A')}</p>
-                <p><strong>Features:</strong> {len(feature_mapping['features'])} features - {info.get('features', 'N/A')}</p>
-                <p><strong>Feature Names:</strong> {', '.join(feature_mapping['features'][:5])}...</p>
-            </div>
-            """, unsafe_allow_html=True)
+        if tab2.open:
+            st.markdown("### 📚 About the AI Models")
         
-        st.markdown("""
-        ### 🌟 Mission Information
+            models = ["104-Input Kepler", "Kepler Model", "K2 Model", "TESS Model"]
         
-        **Kepler Mission**: Launched in 2009, Kepler was NASA's first mission capable of finding Earth-size planets around other stars.
+            for model in models:
+                info = get_model_info(model)
+                feature_mapping = get_feature_mapping(model)
+                st.markdown(f"""
+                <div class="model-info">
+                    <h3>🛸 {model}</h3>
+                    <p><strong>Description:</strong> {info.get('description', 'N/A')}</p>
+                    <p><strong>Mission:</strong> {info.get('mission', 'N/A')}</p>
+                    <p><strong>Algorithm:</strong> {info.get('algorithm', 'N/A')}</p>
+                    <p><strong>Accuracy:</strong> {info.get('accuracy', 'N/A')}</p>
+                    <p><strong>Dataset:</strong> {info.get('dataset', 'N/A')}</p>
+                    <p><strong>Training Samples:</strong> {info.get('samples', 'N/A')}</p>
+                    <p><strong>Features:</strong> {len(feature_mapping['features'])} features - {info.get('features', 'N/A')}</p>
+                    <p><strong>Feature Names:</strong> {', '.join(feature_mapping['features'][:5])}...</p>
+                </div>
+                """, unsafe_allow_html=True)
         
-        **TESS Mission**: The Transiting Exoplanet Survey Satellite, launched in 2018, is designed to find thousands of exoplanets around nearby bright stars.
+            # Model residency and load statistics from the process-wide registry
+            st.markdown("### 🧠 Loaded Models")
+            registry_stats = pd.DataFrame(get_model_registry().stats())
+            st.dataframe(
+                registry_stats.rename(columns={
+                    'model': 'Model', 'loaded': 'Resident', 'load_ms': 'Load Time (ms)',
+                    'rss_delta_mb': 'Memory (MB)', 'file_size_mb': 'File Size (MB)',
+                    'reloads': 'Reloads', 'loaded_at': 'Loaded At'
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+            
+            # Hit/miss statistics of the shared prediction cache
+            cache_stats = get_prediction_cache().stats()
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("⚡ Cache Hit Rate", f"{cache_stats['hit_rate'] * 100:.1f}%" if cache_stats['hit_rate'] is not None else "N/A")
+            col2.metric("Cache Hits", f"{cache_stats['hits']:,}")
+            col3.metric("Cache Misses", f"{cache_stats['misses']:,}")
+            col4.metric("Cached Predictions", f"{cache_stats['entries']:,} / {cache_stats['max_entries']:,}")
+        
+            st.markdown("""
+            ### 🌟 Mission Information
         
-        **K2 Mission**: The extended Kepler mission, which continued the search for exoplanets after the primary mission ended.
+            **Kepler Mission**: Launched in 2009, Kepler was NASA's first mission capable of finding Earth-size planets around other stars.
         
-        ### 🔬 How It Works
+            **TESS Mission**: The Transiting Exoplanet Survey Satellite, launched in 2018, is designed to find thousands of exoplanets around nearby bright stars.
         
-        These AI models analyze transit photometry data to distinguish between genuine exoplanets and false positive signals. They use machine learning algorithms trained on thousands of confirmed exoplanets and false positives from NASA's missions.
-        """)
+            **K2 Mission**: The extended Kepler mission, which continued the search for exoplanets after the primary mission ended.
+        
+            ### 🔬 How It Works
+        
+            These AI models analyze transit photometry data to distinguish between genuine exoplanets and false positive signals. They use machine learning algorithms trained on thousands of confirmed exoplanets and false positives from NASA's missions.
+            """)
     
     with tab3:
-        st.markdown("### 📊 Model Performance Visualization")
-        
-        # Model performance data based on actual results
-        performance_data = {
-            'Model': ['104-Input Kepler', 'Kepler Model', 'K2 Model', 'TESS Model'],
-            'Accuracy (%)': [94.5, 74.3, 78.8, 69.2],
-            'Features Count': [104, 14, 17, 12],
-            'Mission': ['Kepler Extended', 'Kepler', 'K2', 'TESS'],
-            'Algorithm': ['HistGradientBoosting', 'LightGBM', 'LightGBM', 'XGBoost']
-        }
+        if tab3.open:
+            st.markdown("### 📊 Model Performance Visualization")
         
-        df_performance = pd.DataFrame(performance_data)
+            # Model performance data based on actual results
+            performance_models = ['104-Input Kepler', 'Kepler Model', 'K2 Model', 'TESS Model']
+            performance_data = {
+                'Model': performance_models,
+                'Accuracy (%)': [round((get_model_accuracy(m) or 0) * 100, 1) for m in performance_models],
+                'Features Count': [104, 14, 17, 12],
+                'Mission': ['Kepler Extended', 'Kepler', 'K2', 'TESS'],
+                'Algorithm': ['HistGradientBoosting', 'LightGBM', 'LightGBM', 'XGBoost']
+            }
         
-        col1, col2 = st.columns(2)
+            df_performance = pd.DataFrame(performance_data)
         
-        with col1:
-            # Accuracy comparison
-            fig_accuracy = px.bar(
-                df_performance,
-                x='Model',
-                y='Accuracy (%)',
-                color='Mission',
-                title="Model Accuracy Comparison",
-                color_discrete_sequence=['#00ffff', '#ff00ff', '#ffff00', '#00ff00']
-            )
-            fig_accuracy.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font_color='white',
-                title_font_color='white',
-                xaxis_tickangle=-45
-            )
-            st.plotly_chart(fig_accuracy, use_container_width=True)
+            import plotly.express as px
+            col1, col2 = st.columns(2)
         
-        with col2:
-            # Features count comparison
-            fig_features = px.bar(
-                df_performance,
-                x='Model',
-                y='Features Count',
-                color='Mission',
-                title="Number of Features per Model",
-                color_discrete_sequence=['#00ffff', '#ff00ff', '#ffff00', '#00ff00']
-            )
-            fig_features.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font_color='white',
-                title_font_color='white',
-                xaxis_tickangle=-45
-            )
-            st.plotly_chart(fig_features, use_container_width=True)
+            with col1:
+                # Accuracy comparison
+                with METRICS.timer('stage_seconds', stage='chart', chart='accuracy_comparison'):
+                    fig_accuracy = px.bar(
+                        df_performance,
+                        x='Model',
+                        y='Accuracy (%)',
+                        color='Mission',
+                        title="Model Accuracy Comparison",
+                        color_discrete_sequence=['#00ffff', '#ff00ff', '#ffff00', '#00ff00']
+                    )
+                    fig_accuracy.update_layout(
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        font_color='white',
+                        title_font_color='white',
+                        xaxis_tickangle=-45
+                    )
+                    st.plotly_chart(fig_accuracy, use_container_width=True)
+        
+            with col2:
+                # Features count comparison
+                with METRICS.timer('stage_seconds', stage='chart', chart='feature_counts'):
+                    fig_features = px.bar(
+                        df_performance,
+                        x='Model',
+                        y='Features Count',
+                        color='Mission',
+                        title="Number of Features per Model",
+                        color_discrete_sequence=['#00ffff', '#ff00ff', '#ffff00', '#00ff00']
+                    )
+                    fig_features.update_layout(
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        font_color='white',
+                        title_font_color='white',
+                        xaxis_tickangle=-45
+                    )
+                    st.plotly_chart(fig_features, use_container_width=True)
         
-        # Feature importance explanation
-        st.markdown("### 🔍 Feature Importance Analysis")
+            render_model_evaluation(selected_model)
+            render_dataset_overview(selected_model)
         
-        feature_importance = {
-            'Feature': ['Transit Depth', 'Orbital Period', 'Stellar Temperature', 'Insolation', 
-                       'Planet Radius', 'Transit Duration', 'Equilibrium Temperature', 
-                       'Stellar Gravity', 'Inclination'],
-            'Importance': [0.25, 0.20, 0.18, 0.15, 0.08, 0.06, 0.04, 0.03, 0.01]
-        }
+            # Feature importance explanation
+            st.markdown("### 🔍 Feature Importance Analysis")
         
-        df_features = pd.DataFrame(feature_importance)
+            feature_importance = {
+                'Feature': ['Transit Depth', 'Orbital Period', 'Stellar Temperature', 'Insolation', 
+                           'Planet Radius', 'Transit Duration', 'Equilibrium Temperature', 
+                           'Stellar Gravity', 'Inclination'],
+                'Importance': [0.25, 0.20, 0.18, 0.15, 0.08, 0.06, 0.04, 0.03, 0.01]
+            }
         
-        fig_features_imp = px.bar(
-            df_features,
-            x='Importance',
-            y='Feature',
-            orientation='h',
-            title="Typical Feature Importance in Exoplanet Detection",
-            color='Importance',
-            color_continuous_scale='viridis'
-        )
-        fig_features_imp.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font_color='white',
-            title_font_color='white'
-        )
-        st.plotly_chart(fig_features_imp, use_container_width=True)
+            df_features = pd.DataFrame(feature_importance)
+        
+            with METRICS.timer('stage_seconds', stage='chart', chart='feature_importance'):
+                fig_features_imp = px.bar(
+                    df_features,
+                    x='Importance',
+                    y='Feature',
+                    orientation='h',
+                    title="Typical Feature Importance in Exoplanet Detection",
+                    color='Importance',
+                    color_continuous_scale='viridis'
+                )
+                fig_features_imp.update_layout(
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font_color='white',
+                    title_font_color='white'
+                )
+                st.plotly_chart(fig_features_imp, use_container_width=True)
+    
+    with tab4:
+        if tab4.open:
+            render_performance_panel()
 
     # Footer
     st.markdown("---")
@@ -0,0 +1,423 @@
+"""Scriptable training pipeline replacing the notebooks' candidate search loop.
+
+Every (model, candidate estimator) pair is an independent task on a process
+pool, so the three missions and the 104-input set train concurrently instead
+of one notebook cell at a time. Each dataset is preprocessed once in the
+parent with a fitted Preprocessor, which is saved next to the model it
+trained, and its feature matrix and labels are placed in shared memory that
+the workers attach to instead of receiving a pickled copy per task.
+
+Candidates and search spaces match the notebooks (``idk.ipynb``,
+``help.ipynb``), as does the held-out split, the ``roc_auc_ovr`` scoring and
+the summary CSV schema. The default search is successive halving: every
+sampled configuration is first scored on a stratified subsample and only
+the best third advance to the next round, which triples the rows, so poor
+configurations are dropped after training on a fraction of the data. ``--search random`` reproduces the
+notebooks' RandomizedSearchCV.
+
+Results go to a staging directory that mirrors the bundled layout unless
+``--install`` is given, which overwrites the bundled models and summaries.
+
+Usage:
+    python train_pipeline.py                                   # all models, all candidates
+    python train_pipeline.py --models "TESS Model" --candidates LightGBM XGBoost
+    python train_pipeline.py --search random --install         # notebook search, replace bundled models
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import load_model_dataset
+from evaluation import TEST_SIZE, SPLIT_RANDOM_STATE
+from preprocessing import Preprocessor, preprocessor_path
+from scoring import BASE_DIR, MODEL_PATHS, SUMMARY_PATHS, TARGET_COLUMNS, get_dataset_path, encode_targets
+
+STAGING_DIR = BASE_DIR / "training_runs"
+
+# Columns of the notebooks' model_results_summary CSVs, in order
+SUMMARY_COLUMNS = ['model', 'best_cv_score', 'best_params', 'test_auc', 'test_accuracy', 'estimator', 'cv_std']
+
+# Search settings used by the notebooks
+N_ITER = 12
+CV_FOLDS = 3
+SCORING = "roc_auc_ovr"
+RANDOM_STATE = 42
+
+# Fraction of configurations kept after each successive-halving round is 1 / HALVING_FACTOR
+HALVING_FACTOR = 3
+
+# Arrays attached in this worker process, keyed by shared memory block name
+_attached = {}
+
+
+def build_candidates():
+    """Return {name: (estimator, param_distributions)} for every candidate the notebooks searched.
+
+    XGBoost and LightGBM are included only when installed. The notebooks'
+    SGD and CalibratedSVC entries are left out because they never produced
+    a result (an invalid penalty value, and no predict_proba).
+    """
+    from scipy.stats import randint as sp_randint, uniform as sp_uniform, loguniform as sp_loguniform
+    from sklearn.discriminant_analysis import LinearDiscriminantAnalysis, QuadraticDiscriminantAnalysis
+    from sklearn.ensemble import (
+        AdaBoostClassifier, ExtraTreesClassifier, GradientBoostingClassifier,
+        HistGradientBoostingClassifier, RandomForestClassifier
+    )
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.naive_bayes import GaussianNB
+    from sklearn.neighbors import KNeighborsClassifier
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.svm import SVC
+    from sklearn.tree import DecisionTreeClassifier
+
+    candidates = {
+        # liblinear is one-vs-rest already; the notebooks' multi_class="ovr" is deprecated
+        "LogisticRegression": (
+            Pipeline([("scaler", StandardScaler()), ("clf", LogisticRegression(solver="liblinear", max_iter=500))]),
+            {"clf__C": sp_loguniform(1e-3, 1e3), "clf__penalty": ["l2"]},
+        ),
+        "SVC": (
+            Pipeline([("scaler", StandardScaler()), ("clf", SVC(probability=True))]),
+            {
+                "clf__C": sp_loguniform(1e-2, 1e2),
+                "clf__gamma": ["scale", "auto", 0.001, 0.01, 0.1],
+                "clf__kernel": ["rbf", "linear", "poly"],
+                "clf__degree": [2, 3],
+            },
+        ),
+        "KNN": (
+            Pipeline([("scaler", StandardScaler()), ("clf", KNeighborsClassifier())]),
+            {"clf__n_neighbors": sp_randint(1, 21), "clf__weights": ["uniform", "distance"], "clf__p": [1, 2]},
+        ),
+        "GaussianNB": (GaussianNB(), {}),
+        "LDA": (LinearDiscriminantAnalysis(), {}),
+        "QDA": (QuadraticDiscriminantAnalysis(), {}),
+        "DecisionTree": (
+            DecisionTreeClassifier(random_state=RANDOM_STATE),
+            {"max_depth": [3, 5, 10], "min_samples_split": sp_randint(2, 11), "max_features": [None, "sqrt"]},
+        ),
+        "RandomForest": (
+            RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=-1),
+            {
+                "n_estimators": sp_randint(50, 301),
+                "max_depth": [None, 10, 20],
+                "min_samples_split": sp_randint(2, 11),
+                "max_features": ["sqrt", None],
+            },
+        ),
+        "ExtraTrees": (
+            ExtraTreesClassifier(random_state=RANDOM_STATE, n_jobs=-1),
+            {"n_estimators": sp_randint(50, 301), "max_depth": [None, 10, 20], "max_features": ["sqrt", None]},
+        ),
+        "GradientBoosting": (
+            GradientBoostingClassifier(random_state=RANDOM_STATE),
+            {
+                "n_estimators": sp_randint(50, 201),
+                "learning_rate": sp_loguniform(1e-3, 1e-1),
+                "max_depth": sp_randint(3, 8),
+                "subsample": sp_uniform(0.6, 0.3),
+            },
+        ),
+        "HistGradientBoosting": (
+            HistGradientBoostingClassifier(random_state=RANDOM_STATE),
+            {"max_iter": sp_randint(100, 201), "learning_rate": sp_loguniform(1e-3, 1e-1), "max_depth": [None, 3, 5]},
+        ),
+        "AdaBoost": (
+            AdaBoostClassifier(random_state=RANDOM_STATE),
+            {"n_estimators": sp_randint(50, 201), "learning_rate": sp_uniform(0.01, 1.0)},
+        ),
+        "MLP": (
+            Pipeline([("scaler", StandardScaler()), ("clf", MLPClassifier(max_iter=500, random_state=RANDOM_STATE))]),
+            {
+                "clf__hidden_layer_sizes": [(50,), (100,), (50, 50)],
+                "clf__alpha": [1e-5, 1e-4, 1e-3],
+                "clf__learning_rate_init": [1e-4, 1e-3],
+            },
+        ),
+    }
+
+    try:
+        from xgboost import XGBClassifier
+        candidates["XGBoost"] = (
+            XGBClassifier(eval_metric="logloss", random_state=RANDOM_STATE, n_jobs=-1),
+            {
+                "n_estimators": sp_randint(50, 301),
+                "max_depth": sp_randint(3, 8),
+                "learning_rate": sp_loguniform(1e-3, 1e-1),
+                "colsample_bytree": sp_uniform(0.6, 0.3),
+            },
+        )
+    except ImportError:
+        pass
+
+    try:
+        from lightgbm import LGBMClassifier
+        candidates["LightGBM"] = (
+            LGBMClassifier(random_state=RANDOM_STATE, n_jobs=-1, verbose=-1),
+            {
+                "n_estimators": sp_randint(50, 301),
+                "num_leaves": sp_randint(20, 64),
+                "learning_rate": sp_loguniform(1e-3, 1e-1),
+                "feature_fraction": sp_uniform(0.6, 0.3),
+            },
+        )
+    except ImportError:
+        pass
+
+    return candidates
+
+
+def preprocess(model_name, data, preprocessor=None):
+    """Return the float64 feature matrix, int64 labels and preprocessor for every row of ``data``.
+
+    A preprocessor is fitted on ``data`` unless one is given. Rows with an
+    unknown disposition get the label -1.
+    """
+    if preprocessor is None:
+        preprocessor = Preprocessor.fit(model_name, data)
+    return preprocessor.transform(data), encode_targets(model_name, data[TARGET_COLUMNS[model_name]]), preprocessor
+
+
+def prepare_dataset(model_name):
+    """Return the feature matrix and labels of a model's labelled rows, plus the fitted preprocessor"""
+    X, y, preprocessor = preprocess(model_name, load_model_dataset(model_name))
+    labelled = y >= 0
+    return np.ascontiguousarray(X[labelled]), np.ascontiguousarray(y[labelled]), preprocessor
+
+
+def share_array(array):
+    """Copy an array into a new shared memory block and return (block, spec) for workers to attach"""
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def attach_array(spec):
+    """Return a read-only view of a shared array, attaching once per worker process"""
+    name, shape, dtype = spec
+    if name not in _attached:
+        block = shared_memory.SharedMemory(name=name)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        array.setflags(write=False)
+        _attached[name] = (block, array)
+    return _attached[name][1]
+
+
+def _split(y):
+    """Return the notebooks' train and test row positions"""
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(
+        np.arange(len(y)), test_size=TEST_SIZE, stratify=y, random_state=SPLIT_RANDOM_STATE
+    )
+
+
+def min_halving_resources(y, cv, n_candidates):
+    """Return the first-round subsample size for successive halving.
+
+    Sized so the final round trains the survivors on the whole training
+    split, and so each early-round fold still expects a couple of rows of
+    the rarest class.
+    """
+    rounds = 1
+    while HALVING_FACTOR ** rounds <= n_candidates:
+        rounds += 1
+    counts = np.bincount(y)
+    rarest = counts[counts > 0].min() / len(y)
+    return int(min(len(y), max(len(y) // HALVING_FACTOR ** (rounds - 1), np.ceil(2 * cv / rarest))))
+
+
+def present_class_auc(estimator, X, y):
+    """Scorer: one-vs-rest macro AUC over the classes present in ``y``.
+
+    Equal to ``roc_auc_ovr`` whenever every class is present. Halving
+    subsamples each fold without stratifying, so a small early-round fold
+    can miss a rare class, where ``roc_auc_ovr`` would fail the whole
+    configuration.
+    """
+    from sklearn.metrics import roc_auc_score
+
+    probabilities = estimator.predict_proba(X)
+    columns = {c: j for j, c in enumerate(estimator.classes_.tolist())}
+    scores = [roc_auc_score(y == c, probabilities[:, columns[c]]) for c in np.unique(y).tolist() if c in columns]
+    return float(np.mean(scores)) if len(scores) > 1 else np.nan
+
+
+def _search(estimator, param_distributions, search, n_iter, cv, y_train):
+    if search == 'halving':
+        # Imported only to register HalvingRandomSearchCV in sklearn.model_selection
+        importlib.import_module('sklearn.experimental.enable_halving_search_cv')
+        from sklearn.model_selection import HalvingRandomSearchCV
+
+        return HalvingRandomSearchCV(
+            estimator, param_distributions, n_candidates=n_iter, factor=HALVING_FACTOR,
+            min_resources=min_halving_resources(y_train, cv, n_iter), scoring=present_class_auc, cv=cv,
+            n_jobs=1, refit=True, random_state=RANDOM_STATE
+        )
+    from sklearn.model_selection import RandomizedSearchCV
+
+    return RandomizedSearchCV(
+        estimator, param_distributions, n_iter=n_iter, scoring=SCORING, cv=cv, n_jobs=1,
+        refit=True, random_state=RANDOM_STATE
+    )
+
+
+def train_candidate(model_name, candidate, X_spec, y_spec, search='halving', n_iter=N_ITER, cv=CV_FOLDS):
+    """Search one candidate's hyperparameters on a model's training split and score it on the test split.
+
+    Runs in a pool worker: the data is read from shared memory and every
+    estimator runs single-threaded, since the pool already occupies the cores.
+    """
+    from sklearn.base import clone
+    from sklearn.metrics import accuracy_score, roc_auc_score
+    from sklearn.model_selection import cross_val_score
+
+    start = time.perf_counter()
+    X, y = attach_array(X_spec), attach_array(y_spec)
+    train, test = _split(y)
+
+    estimator, param_distributions = build_candidates()[candidate]
+    parallel = {k: v for k, v in estimator.get_params().items() if k.endswith('n_jobs')}
+    estimator.set_params(**{k: 1 for k in parallel})
+
+    if param_distributions:
+        searcher = _search(estimator, param_distributions, search, n_iter, cv, y[train])
+        searcher.fit(X[train], y[train])
+        best = searcher.best_estimator_
+        best_cv_score, best_params = searcher.best_score_, searcher.best_params_
+        cv_std = float(np.mean(searcher.cv_results_['std_test_score']))
+    else:
+        scores = cross_val_score(estimator, X[train], y[train], scoring=SCORING, cv=cv, n_jobs=1)
+        best = clone(estimator).fit(X[train], y[train])
+        best_cv_score, best_params, cv_std = float(scores.mean()), {}, float(scores.std())
+
+    # Saved models keep the notebooks' n_jobs=-1 for inference
+    best.set_params(**parallel)
+    probabilities = best.predict_proba(X[test])
+    return {
+        'model': candidate,
+        'best_cv_score': best_cv_score,
+        'best_params': best_params,
+        'test_auc': roc_auc_score(y[test], probabilities, multi_class='ovr'),
+        'test_accuracy': accuracy_score(y[test], best.classes_[np.argmax(probabilities, axis=1)]),
+        'estimator': best,
+        'cv_std': cv_std,
+        'seconds': time.perf_counter() - start
+    }
+
+
+def write_results(model_name, rows, preprocessor, output_dir):
+    """Write the model's summary CSV, best estimator and preprocessor, mirroring the bundled layout"""
+    import joblib
+    from dataset_store import file_hash
+
+    summary = pd.DataFrame(rows)[SUMMARY_COLUMNS].sort_values('test_auc', ascending=False).reset_index(drop=True)
+    summary_path = Path(output_dir) / SUMMARY_PATHS[model_name]
+    model_path = Path(output_dir) / MODEL_PATHS[model_name]
+    summary_path.parent.mkdir(parents=True, exist_ok=True)
+
+    summary.to_csv(summary_path, index=False)
+    tmp_path = model_path.with_name(model_path.name + ".tmp")
+    joblib.dump(summary.loc[0, 'estimator'], tmp_path)
+    tmp_path.replace(model_path)
+    preprocessor.model_hash = file_hash(model_path)
+    preprocessor.save(preprocessor_path(model_path))
+    return summary, model_path
+
+
+def run_pipeline(model_names=None, candidate_names=None, search='halving', n_iter=N_ITER, cv=CV_FOLDS,
+                 workers=None, output_dir=STAGING_DIR):
+    """Train every requested model concurrently and return {model_name: summary DataFrame}"""
+    requested, model_names = list(model_names or MODEL_PATHS), []
+    for name in requested:
+        if get_dataset_path(name).exists():
+            model_names.append(name)
+        else:
+            print(f"⚠️  {name}: dataset not found, skipping", file=sys.stderr)
+    candidate_names = list(candidate_names or build_candidates())
+
+    blocks, specs, preprocessors = [], {}, {}
+    try:
+        for model_name in model_names:
+            X, y, preprocessors[model_name] = prepare_dataset(model_name)
+            X_block, X_spec = share_array(X)
+            y_block, y_spec = share_array(y)
+            blocks += [X_block, y_block]
+            specs[model_name] = (X_spec, y_spec, X.size)
+
+        # Largest datasets first so the longest tasks don't start last
+        tasks = sorted(
+            ((model_name, candidate) for model_name in model_names for candidate in candidate_names),
+            key=lambda task: -specs[task[0]][2]
+        )
+        results = {model_name: [] for model_name in model_names}
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            futures = {
+                pool.submit(train_candidate, model_name, candidate, *specs[model_name][:2], search, n_iter, cv):
+                (model_name, candidate)
+                for model_name, candidate in tasks
+            }
+            for future in as_completed(futures):
+                model_name, candidate = futures[future]
+                try:
+                    row = future.result()
+                except Exception as e:
+                    print(f"⚠️  {model_name} / {candidate}: failed ({e})", file=sys.stderr)
+                    continue
+                results[model_name].append(row)
+                print(f"✅ {model_name} / {candidate}: test AUC {row['test_auc']:.4f}, "
+                      f"accuracy {row['test_accuracy']:.4f} ({row['seconds']:.1f}s)", file=sys.stderr)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    summaries = {}
+    for model_name, rows in results.items():
+        if not rows:
+            print(f"⚠️  {model_name}: no candidate finished, nothing written", file=sys.stderr)
+            continue
+        summary, model_path = write_results(model_name, rows, preprocessors[model_name], output_dir)
+        summaries[model_name] = summary
+        print(f"✅ {model_name}: best {summary.loc[0, 'model']} (test AUC {summary.loc[0, 'test_auc']:.4f}) -> {model_path}")
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrain the bundled models with a parallel hyperparameter search")
+    parser.add_argument('--models', nargs='+', choices=list(MODEL_PATHS), help="Models to train (default: all)")
+    parser.add_argument('--candidates', nargs='+', help="Candidate estimators to search (default: all)")
+    parser.add_argument('--search', choices=['halving', 'random'], default='halving',
+                        help="Successive halving (default) or the notebooks' randomized search")
+    parser.add_argument('--n-iter', type=int, default=N_ITER, help="Configurations sampled per candidate")
+    parser.add_argument('--cv', type=int, default=CV_FOLDS, help="Cross-validation folds")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per core)")
+    parser.add_argument('--output-dir', type=Path, default=STAGING_DIR, help="Where to write models and summaries")
+    parser.add_argument('--install', action='store_true', help="Overwrite the bundled models and summaries")
+    args = parser.parse_args()
+
+    if args.candidates:
+        unknown = set(args.candidates) - set(build_candidates())
+        if unknown:
+            parser.error(f"unknown candidates: {', '.join(sorted(unknown))}")
+
+    start = time.perf_counter()
+    run_pipeline(
+        args.models, args.candidates, args.search, args.n_iter, args.cv, args.workers,
+        BASE_DIR if args.install else args.output_dir
+    )
+    print(f"⏱️  Finished in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""Compile the bundled tree ensembles into array-backed tables with a NumPy evaluator.
+
+LightGBM, XGBoost and scikit-learn HistGradientBoosting models are flattened
+into one set of node arrays (feature index, threshold, child pointers,
+missing-value direction, leaf value and training cover) covering every
+tree. CompiledEnsemble walks all trees for a whole batch at once with
+vectorized NumPy indexing, so scoring needs neither the original library nor
+its per-call Python overhead.
+
+Each compiled model is saved as ``<model>.trees.npz`` next to its ``.pkl``
+after its probabilities are checked against the original ``predict_proba``
+on the bundled dataset.
+
+Usage:
+    python tree_compiler.py            # compile, check parity and save every model
+"""
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+# How a node treats missing values, following LightGBM's missing_type
+MISSING_AS_ZERO = 0     # NaN is replaced by 0.0 before comparing
+MISSING_ZERO = 1        # 0.0 and NaN both take the default direction
+MISSING_NAN = 2         # NaN takes the default direction
+
+# Values LightGBM treats as zero for MISSING_ZERO splits
+_ZERO_THRESHOLD = 1e-35
+
+# Largest acceptable absolute probability difference against predict_proba
+PARITY_TOLERANCE = 1e-6
+
+COMPILED_SUFFIX = ".trees.npz"
+
+
+class _TreeTableBuilder:
+    """Accumulate nodes from many trees into flat arrays"""
+
+    def __init__(self):
+        self.feature = []
+        self.threshold = []
+        self.left = []
+        self.right = []
+        self.default_left = []
+        self.missing = []
+        self.value = []
+        self.is_leaf = []
+        self.cover = []
+        self.roots = []
+        self.tree_class = []
+
+    def add_node(self, feature=-1, threshold=0.0, default_left=True, missing=MISSING_NAN, value=0.0, is_leaf=False,
+                 cover=0.0):
+        index = len(self.feature)
+        self.feature.append(feature)
+        self.threshold.append(threshold)
+        self.left.append(index)
+        self.right.append(index)
+        self.default_left.append(default_left)
+        self.missing.append(missing)
+        self.value.append(value)
+        self.is_leaf.append(is_leaf)
+        self.cover.append(cover)
+        return index
+
+    def set_children(self, index, left, right):
+        self.left[index] = left
+        self.right[index] = right
+
+    def start_tree(self, class_index):
+        self.roots.append(len(self.feature))
+        self.tree_class.append(class_index)
+
+    def arrays(self):
+        return {
+            'feature': np.asarray(self.feature, dtype=np.int32),
+            'threshold': np.asarray(self.threshold, dtype=np.float64),
+            'left': np.asarray(self.left, dtype=np.int32),
+            'right': np.asarray(self.right, dtype=np.int32),
+            'default_left': np.asarray(self.default_left, dtype=bool),
+            'missing': np.asarray(self.missing, dtype=np.int8),
+            'value': np.asarray(self.value, dtype=np.float64),
+            'is_leaf': np.asarray(self.is_leaf, dtype=bool),
+            'cover': np.asarray(self.cover, dtype=np.float64),
+            'roots': np.asarray(self.roots, dtype=np.int32),
+            'tree_class': np.asarray(self.tree_class, dtype=np.int32)
+        }
+
+
+def _compile_lightgbm(model):
+    dump = model.booster_.dump_model()
+    missing_kinds = {'None': MISSING_AS_ZERO, 'Zero': MISSING_ZERO, 'NaN': MISSING_NAN}
+    builder = _TreeTableBuilder()
+
+    def add(node):
+        if 'split_index' not in node:
+            return builder.add_node(value=node['leaf_value'], is_leaf=True, cover=node['leaf_count'])
+        if node['decision_type'] != '<=':
+            raise ValueError(f"Unsupported LightGBM split type {node['decision_type']}")
+        index = builder.add_node(
+            feature=node['split_feature'],
+            threshold=node['threshold'],
+            default_left=node['default_left'],
+            missing=missing_kinds[node['missing_type']],
+            cover=node['internal_count']
+        )
+        builder.set_children(index, add(node['left_child']), add(node['right_child']))
+        return index
+
+    n_classes = dump['num_tree_per_iteration']
+    for tree in dump['tree_info']:
+        builder.start_tree(tree['tree_index'] % n_classes)
+        add(tree['tree_structure'])
+
+    return builder.arrays(), {
+        'strict': False,
+        'base_score': np.zeros(n_classes),
+        'float32_inputs': False
+    }
+
+
+def _compile_xgboost(model):
+    raw = json.loads(model.get_booster().save_raw(raw_format='json'))
+    learner = raw['learner']
+    booster = learner['gradient_booster']
+    if booster['name'] != 'gbtree':
+        raise ValueError(f"Unsupported XGBoost booster {booster['name']}")
+
+    n_classes = max(int(learner['learner_model_param']['num_class']), 1)
+    base_score = np.asarray(
+        json.loads(learner['learner_model_param']['base_score'].replace('E', 'e')), dtype=np.float64
+    ).reshape(-1)
+    base_score = np.broadcast_to(base_score, (n_classes,)).copy()
+    if learner['objective']['name'] in ('binary:logistic', 'reg:logistic'):
+        # Stored as a probability; the tree sum is added in logit space
+        base_score = np.log(base_score / (1 - base_score))
+
+    builder = _TreeTableBuilder()
+    for tree, class_index in zip(booster['model']['trees'], booster['model']['tree_info']):
+        builder.start_tree(class_index)
+        offset = len(builder.feature)
+        left_children = tree['left_children']
+        for node in range(len(left_children)):
+            leaf = left_children[node] == -1
+            index = builder.add_node(
+                feature=-1 if leaf else tree['split_indices'][node],
+                threshold=np.float32(tree['split_conditions'][node]),
+                default_left=bool(tree['default_left'][node]),
+                missing=MISSING_NAN,
+                value=tree['split_conditions'][node] if leaf else 0.0,
+                is_leaf=leaf,
+                cover=tree['sum_hessian'][node]
+            )
+            if not leaf:
+                builder.set_children(index, offset + left_children[node], offset + tree['right_children'][node])
+
+    return builder.arrays(), {
+        'strict': True,
+        'base_score': base_score,
+        'float32_inputs': True
+    }
+
+
+def _compile_hist_gradient_boosting(model):
+    if any(node_is_categorical for predictors in model._predictors for predictor in predictors
+           for node_is_categorical in predictor.nodes['is_categorical']):
+        raise ValueError("Categorical splits are not supported")
+
+    builder = _TreeTableBuilder()
+    for predictors in model._predictors:
+        for class_index, predictor in enumerate(predictors):
+            nodes = predictor.nodes
+            builder.start_tree(class_index)
+            offset = len(builder.feature)
+            for node in nodes:
+                leaf = bool(node['is_leaf'])
+                index = builder.add_node(
+                    feature=-1 if leaf else int(node['feature_idx']),
+                    threshold=float(node['num_threshold']),
+                    default_left=bool(node['missing_go_to_left']),
+                    missing=MISSING_NAN,
+                    value=float(node['value']) if leaf else 0.0,
+                    is_leaf=leaf,
+                    cover=float(node['count'])
+                )
+                if not leaf:
+                    builder.set_children(index, offset + int(node['left']), offset + int(node['right']))
+
+    return builder.arrays(), {
+        'strict': False,
+        'base_score': np.asarray(model._baseline_prediction, dtype=np.float64).reshape(-1),
+        'float32_inputs': False
+    }
+
+
+class CompiledEnsemble:
+    """A tree ensemble evaluated with NumPy from flat node tables"""
+
+    def __init__(self, tables, base_score, classes, strict, float32_inputs, n_features, source=""):
+        self.tables = tables
+        self.base_score = np.asarray(base_score, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+        self.strict = bool(strict)
+        self.float32_inputs = bool(float32_inputs)
+        self.n_features_in_ = int(n_features)
+        self.source = source
+
+        # One-hot map from tree to class, so leaf sums per class are one matmul
+        n_trees = len(tables['roots'])
+        n_outputs = len(self.base_score)
+        self._tree_to_class = np.zeros((n_trees, n_outputs), dtype=np.float64)
+        self._tree_to_class[np.arange(n_trees), tables['tree_class']] = 1.0
+
+        self.max_depth = self._max_depth()
+        self._has_zero_missing = bool(np.any(tables['missing'] == MISSING_ZERO))
+
+    @property
+    def n_trees(self):
+        return len(self.tables['roots'])
+
+    def _max_depth(self):
+        t = self.tables
+        frontier = t['roots']
+        depth = 0
+        while True:
+            internal = frontier[~t['is_leaf'][frontier]]
+            if len(internal) == 0:
+                return depth
+            frontier = np.concatenate([t['left'][internal], t['right'][internal]])
+            depth += 1
+
+    def _go_left(self, values, nodes, missing_aware=True):
+        """Return whether each value goes to the left child of the matching node"""
+        t = self.tables
+        thresholds = t['threshold'][nodes]
+        go_left = values < thresholds if self.strict else values <= thresholds
+        if missing_aware:
+            kind = t['missing'][nodes]
+            is_nan = np.isnan(values)
+            zero_left = 0.0 < thresholds if self.strict else 0.0 <= thresholds
+            go_left = np.where(is_nan & (kind == MISSING_AS_ZERO), zero_left, go_left)
+            go_default = ((kind == MISSING_NAN) & is_nan) | \
+                         ((kind == MISSING_ZERO) & (is_nan | (np.abs(values) <= _ZERO_THRESHOLD)))
+            go_left = np.where(go_default, t['default_left'][nodes], go_left)
+        return go_left
+
+    def prepare(self, X):
+        """Return X as a 2-D float64 matrix rounded the way the original library reads it"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if self.float32_inputs:
+            X = X.astype(np.float32).astype(np.float64)
+        return X
+
+    def route_left(self, X):
+        """Return an (n_rows, n_nodes) mask of which rows go left at every node; X must be prepared"""
+        nodes = np.flatnonzero(~self.tables['is_leaf'])
+        go_left = np.zeros((X.shape[0], len(self.tables['feature'])), dtype=bool)
+        go_left[:, nodes] = self._go_left(X[:, self.tables['feature'][nodes]], nodes)
+        return go_left
+
+    def _leaf_indices(self, X):
+        t = self.tables
+        feature, left, right, is_leaf = t['feature'], t['left'], t['right'], t['is_leaf']
+
+        n_rows, n_trees = X.shape[0], len(t['roots'])
+        # Walk every (row, tree) pair as one flat array, dropping pairs once they reach a leaf
+        nodes = np.tile(t['roots'], n_rows)
+        X_flat = X.reshape(-1)
+        offsets = np.repeat(np.arange(n_rows) * X.shape[1], n_trees)
+        active = np.flatnonzero(~is_leaf[nodes])
+        # Missing-value routing is only needed when the batch can hit it
+        missing_aware = self._has_zero_missing or bool(np.isnan(X).any())
+        while len(active):
+            current = nodes[active]
+            go_left = self._go_left(X_flat[offsets[active] + feature[current]], current, missing_aware)
+            current = np.where(go_left, left[current], right[current])
+            nodes[active] = current
+            active = active[~is_leaf[current]]
+        return nodes.reshape(n_rows, n_trees)
+
+    def decision_function(self, X):
+        """Return raw per-class scores: base score plus the summed leaf values"""
+        X = self.prepare(X)
+        leaves = self._leaf_indices(X)
+        return self.tables['value'][leaves] @ self._tree_to_class + self.base_score
+
+    def predict_proba(self, X):
+        return self.proba_from_raw(self.decision_function(X))
+
+    @staticmethod
+    def proba_from_raw(raw):
+        """Return class probabilities from an (n_rows, n_outputs) matrix of raw scores"""
+        if raw.shape[1] == 1:
+            positive = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        raw = raw - raw.max(axis=1, keepdims=True)
+        exp = np.exp(raw)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def save(self, path):
+        np.savez(
+            path,
+            base_score=self.base_score,
+            classes=self.classes_,
+            meta=np.array(json.dumps({
+                'strict': self.strict,
+                'float32_inputs': self.float32_inputs,
+                'n_features': self.n_features_in_,
+                'source': self.source
+            })),
+            **self.tables
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            tables = {key: data[key] for key in data.files if key not in ('base_score', 'classes', 'meta')}
+            return cls(
+                tables, data['base_score'], data['classes'], meta['strict'],
+                meta['float32_inputs'], meta['n_features'], meta.get('source', "")
+            )
+
+
+def compile_model(model):
+    """Flatten a fitted LightGBM, XGBoost or HistGradientBoosting classifier"""
+    kind = type(model).__name__
+    if kind == 'LGBMClassifier':
+        tables, params = _compile_lightgbm(model)
+    elif kind == 'XGBClassifier':
+        tables, params = _compile_xgboost(model)
+    elif kind == 'HistGradientBoostingClassifier':
+        tables, params = _compile_hist_gradient_boosting(model)
+    else:
+        raise ValueError(f"Cannot compile {kind}")
+    return CompiledEnsemble(tables, classes=model.classes_, n_features=model.n_features_in_, source=kind, **params)
+
+
+def compiled_path(model_path):
+    """Return the compiled artifact path that sits next to a model file"""
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.stem + COMPILED_SUFFIX)
+
+
+def check_parity(model, compiled, X):
+    """Return the largest absolute probability difference between the two models"""
+    return float(np.max(np.abs(model.predict_proba(X) - compiled.predict_proba(X))))
+
+
+def main():
+    import joblib
+    from dataset_store import load_model_dataset
+    from scoring import MODEL_PATHS, get_model_path, get_dataset_path, build_feature_matrix
+
+    for model_name in MODEL_PATHS:
+        model_path = get_model_path(model_name)
+        model = joblib.load(model_path)
+        compiled = compile_model(model)
+
+        if get_dataset_path(model_name).exists():
+            X = build_feature_matrix(model_name, load_model_dataset(model_name))
+        else:
+            X = np.random.default_rng(0).normal(size=(1000, model.n_features_in_))
+        difference = check_parity(model, compiled, X)
+        if difference > PARITY_TOLERANCE:
+            print(f"❌ {model_name}: max probability difference {difference:.2e} exceeds {PARITY_TOLERANCE:.0e}, not saved")
+            continue
+
+        output_path = compiled_path(model_path)
+        compiled.save(output_path)
+
+        row = X[:1]
+        start = time.perf_counter()
+        for _ in range(200):
+            model.predict_proba(row)
+        native_ms = (time.perf_counter() - start) / 200 * 1000
+        start = time.perf_counter()
+        for _ in range(200):
+            compiled.predict_proba(row)
+        compiled_ms = (time.perf_counter() - start) / 200 * 1000
+
+        print(f"✅ {model_name}: {compiled.n_trees} trees, max diff {difference:.1e}, "
+              f"{output_path.stat().st_size / 2**20:.2f} MB (pkl {model_path.stat().st_size / 2**20:.2f} MB), "
+              f"1-row latency {compiled_ms:.2f} ms vs {native_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()